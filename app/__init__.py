@@ -1,61 +1,481 @@
+import os
+import csv
+import copy
+import time
+import threading
+import importlib.util
+from collections import OrderedDict
 from flask import Flask
-from app.quantum.recommender import ClassicalRecommender
 
-# Check if quantum modules are available
-try:
-    import pennylane as qml
-    from app.quantum.recommender import QuantumRecommender
-    using_quantum = True
-except ImportError:
-    using_quantum = False
+# Check if quantum modules are available, without importing them: PennyLane,
+# pandas and the models are only imported by the background warm-up
+using_quantum = importlib.util.find_spec('pennylane') is not None
 
 # Define Recommender class using the available recommenders
 class Recommender:
-    def __init__(self):
-        # Define paths to data files
-        data_dir = 'data'
-        user_data_path = f'{data_dir}/user_viewing.csv'
-        movie_data_path = f'{data_dir}/movies.csv'
-        user_profile_path = f'{data_dir}/user_profiles.csv'
-        
-        # Initialize the appropriate recommender
-        if using_quantum:
-            try:
-                self.recommender = QuantumRecommender(
-                    user_data_path=user_data_path,
-                    movie_data_path=movie_data_path,
-                    user_profile_path=user_profile_path
-                )
-                print("Initialized quantum recommender")
-            except Exception as e:
-                print(f"Failed to initialize quantum recommender: {e}")
+    def __init__(self, data_dir='data'):
+        # Imported here so that importing the app stays fast
+        from app.quantum.recommender import ClassicalRecommender, movie_metadata
+        from app.quantum.reranking import Reranker
+        from app.quantum.dataset import Dataset, data_paths
+        from app.quantum.materialize import MaterializedRecommendations, data_version
+        from app.quantum.snapshot import open_snapshot
+        
+        # Define paths to data files; viewing records and profiles are read
+        # from the profile store once it exists
+        paths = data_paths(data_dir)
+        user_data_path = paths['user_data_path']
+        movie_data_path = paths['movie_data_path']
+        user_profile_path = paths['user_profile_path']
+        
+        # A snapshot from `python -m app.quantum.snapshot` restores the
+        # preprocessed model without reading the CSVs. Its arrays are
+        # memory-mapped, so all workers share one copy of them.
+        self.recommender = None
+        try:
+            self.recommender = open_snapshot(
+                f'{data_dir}/cache/snapshot.npz', user_data_path, movie_data_path, user_profile_path
+            )
+        except Exception as e:
+            print(f"Failed to load snapshot: {e}")
+        
+        if self.recommender is not None:
+            print(f"Loaded {type(self.recommender).__name__} from snapshot")
+        else:
+            # Typed tables loaded once and shared by whichever recommender is used
+            dataset = Dataset.load(movie_data_path, user_data_path, user_profile_path)
+        
+            # Initialize the appropriate recommender
+            if using_quantum:
+                try:
+                    from app.quantum.recommender import QuantumRecommender
+                    self.recommender = QuantumRecommender(
+                        user_data_path=user_data_path,
+                        movie_data_path=movie_data_path,
+                        user_profile_path=user_profile_path,
+                        dataset=dataset
+                    )
+                    print("Initialized quantum recommender")
+                except Exception as e:
+                    print(f"Failed to initialize quantum recommender: {e}")
+                    self.recommender = ClassicalRecommender(
+                        user_data_path=user_data_path,
+                        movie_data_path=movie_data_path,
+                        user_profile_path=user_profile_path,
+                        dataset=dataset
+                    )
+                    print("Fell back to classical recommender")
+            else:
                 self.recommender = ClassicalRecommender(
                     user_data_path=user_data_path,
                     movie_data_path=movie_data_path,
-                    user_profile_path=user_profile_path
+                    user_profile_path=user_profile_path,
+                    dataset=dataset
                 )
-                print("Fell back to classical recommender")
-        else:
-            self.recommender = ClassicalRecommender(
-                user_data_path=user_data_path,
-                movie_data_path=movie_data_path,
-                user_profile_path=user_profile_path
-            )
-            print("Initialized classical recommender")
+                print("Initialized classical recommender")
         
-        # Store dataframes from the recommender for easy access
+        # Store the movies from the recommender for easy access
         self.movies_df = self.recommender.movies_df
-        self.user_viewing_df = self.recommender.user_viewing_df
-        self.user_profiles_df = self.recommender.user_profiles_df
+        
+        # Personalization rules applied on top of the model's recommendations
+        self.reranker = Reranker(movie_metadata(self.movies_df))
+        
+        # Precomputed recommendations from `python -m app.quantum.materialize`,
+        # used only if they were built from the current data and model
+        self.materialized = MaterializedRecommendations.load(
+            f'{data_dir}/cache/recommendations.npz', data_version(self.recommender)
+        )
+        if self.materialized is not None:
+            print("Serving materialized recommendations")
+        
+        # Assigned when ModelWarmup swaps this recommender in
+        self.version = 0
+    
+    @property
+    def user_viewing_df(self):
+        """All viewing records, concatenated on first access after an update."""
+        return self.recommender.user_viewing_df
+    
+    @property
+    def user_profiles_df(self):
+        """All user profiles, concatenated on first access after an update."""
+        return self.recommender.user_profiles_df
+    
+    def has_profile(self, user_id):
+        """Whether a user has a profile, without reading the whole profiles table."""
+        return self.recommender.has_profile(user_id)
     
     def generate_recommendations(self, user_id, top_n=10):
         """Generate recommendations for a user"""
+        if self.materialized is not None:
+            recs_df = self.materialized.get(user_id, top_n, self.recommender)
+            if recs_df is not None:
+                return recs_df
         return self.recommender.generate_recommendations(user_id, top_n=top_n)
+    
+    def personalized_recommendations(self, user_id, extended_profile=None, viewing_time=None, watch_habit=None,
+                                     top_n=10, n_retrieved=15):
+        """
+        Generate recommendations re-ranked by the user's extended profile and session preferences.
+        
+        Args:
+            user_id: ID of the user
+            extended_profile: Extended profile dict with optional 'themes' and 'genre_ratings'
+            viewing_time: Preferred viewing time from the session
+            watch_habit: Watching habit from the session
+            top_n: Number of recommendations returned
+            n_retrieved: Number of recommendations re-ranked (more than top_n leaves room for re-ranking)
+            
+        Returns:
+            List of recommendation dicts
+        """
+        recs_df = self.generate_recommendations(user_id, top_n=n_retrieved)
+        return self.reranker.rerank(
+            recs_df, extended_profile=extended_profile, viewing_time=viewing_time, watch_habit=watch_habit, top_n=top_n
+        )
+    
+    def generate_item_recommendations(self, user_id, top_n=10):
+        """Generate item-based recommendations from the movies a user watched"""
+        return self.recommender.generate_item_recommendations(user_id, top_n=top_n)
+    
+    def similar_movies(self, movie_id, top_n=10):
+        """Get the movies most similar to a movie"""
+        return self.recommender.similar_movies(movie_id, top_n=top_n)
+    
+    def updated(self, new_viewing_rows=None, new_profile_rows=None):
+        """
+        A new version of the recommender with new profile and viewing records added.
+        
+        This recommender is left unchanged, so requests that are using it
+        finish on the data they started with.
+        """
+        recommender = copy.copy(self)
+        recommender.recommender = self.recommender.copy()
+        recommender.recommender.update(new_viewing_rows=new_viewing_rows, new_profile_rows=new_profile_rows)
+        
+        # Precomputed recommendations of these users are out of date
+        if self.materialized is not None:
+            recommender.materialized = copy.copy(self.materialized)
+            for rows in (new_viewing_rows, new_profile_rows):
+                if rows is not None:
+                    recommender.materialized.invalidate(rows['user_id'].unique())
+        return recommender
+    
+    def compacted(self):
+        """A new version with the work the model defers in update() done, see its compacted()."""
+        recommender = copy.copy(self)
+        recommender.recommender = self.recommender.compacted()
+        return recommender
+
+def loaded_weights_version(recommender):
+    """Circuit weights version a Recommender was built with, None for the classical model."""
+    return getattr(recommender.recommender, 'weights_version', None)
+
+class ResponseCache:
+    """
+    LRU cache of computed responses that expire `ttl` seconds after they are stored.
+    
+    Keys are tuples starting with the user ID, so that all responses of a
+    user can be invalidated when their profile changes.
+    """
+    
+    def __init__(self, max_entries=10000, ttl=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """A cached response, or None if there is none or it has expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, response):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id):
+        """Drop the cached responses of a user."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def info(self):
+        """Hit and miss counts and the number of cached responses."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
 
-# Initialize recommender as a global variable
-recommender = Recommender()
+class ModelWarmup:
+    """
+    Builds the Recommender in a background thread and swaps in new versions.
+    
+    The app serves requests while the data is loaded and the model is
+    built; until then `recommender` is None and routes answer from
+    popular_movies(), which only reads the movie CSV.
+    
+    Recommenders are never modified once they are served. Routes read
+    `recommender` once per request, and new records or changed data files
+    produce a new version that replaces it with a single assignment, so
+    requests in flight finish on the version they started with. A full
+    rebuild happens in the background next to the served version and
+    holds no lock; only the swap itself is serialized with updates.
+    """
+    
+    # Data files watched for changes, besides the profile store
+    DATA_FILES = ['movies.csv', 'user_viewing.csv', 'user_profiles.csv']
+    # Files imported into the profile store when it is created and not
+    # read once it exists, so they are only watched until then
+    STORE_SOURCES = ['user_viewing.csv', 'user_profiles.csv']
+    
+    def __init__(self, data_dir='data'):
+        self.data_dir = data_dir
+        self.recommender = None
+        self.store = None
+        # Responses computed from the served recommender version
+        self.responses = ResponseCache()
+        self.status = 'pending'
+        self.error = None
+        self.started_at = None
+        self.ready_at = None
+        self._popular = None
+        self._lock = threading.Lock()
+        # Held while the data files are written and new versions are swapped in
+        self.write_lock = threading.RLock()
+        self._signature = None
+        self._thread = None
+        self._watcher = None
+        self._done = threading.Event()
+    
+    def start(self):
+        """Start building the recommender, once."""
+        with self._lock:
+            if self._thread is None:
+                self.started_at = time.time()
+                self._thread = threading.Thread(target=self._build, name='model-warmup', daemon=True)
+                self._thread.start()
+        return self
+    
+    def _build(self):
+        self.status = 'loading'
+        try:
+            # Profiles and viewing records are kept in the store, created
+            # from the CSV files and extended profile JSON files on first start
+            from app.quantum.store import ProfileStore, STORE_NAME
+            self.store = ProfileStore.open(
+                os.path.join(self.data_dir, STORE_NAME),
+                user_profile_path=os.path.join(self.data_dir, 'user_profiles.csv'),
+                user_data_path=os.path.join(self.data_dir, 'user_viewing.csv'),
+                extended_profile_dir=os.path.join(self.data_dir, 'profiles')
+            )
+            signature = self.data_signature()
+            recommender = Recommender(self.data_dir)
+            signature['weights'] = loaded_weights_version(recommender)
+            with self.write_lock:
+                self._swap(recommender, signature)
+            self.ready_at = time.time()
+            self.status = 'ready'
+            print(f"Recommender ready after {self.ready_at - self.started_at:.1f}s")
+        except Exception as e:
+            self.error = str(e)
+            self.status = 'failed'
+            print(f"Failed to build recommender: {e}")
+        finally:
+            self._done.set()
+    
+    def _swap(self, recommender, signature):
+        """Serve a new recommender version; the caller holds the write lock."""
+        recommender.version = self.recommender.version + 1 if self.recommender is not None else 1
+        self._signature = signature
+        self.recommender = recommender
+        # Response keys include the version, so this only frees memory
+        self.responses.clear()
+    
+    def data_signature(self):
+        """
+        Modification time and size of each data file, None for missing
+        files, the store revision and the newest circuit weights version.
+        The profile and viewing CSV files only count while there is no
+        store.
+        
+        The weights entry is the latest version trained for the served
+        quantum model's qubit count, so `python -m app.quantum.train`
+        triggers a reload. It is None for the classical model.
+        """
+        signature = {}
+        for name in self.DATA_FILES:
+            if self.store is not None and name in self.STORE_SOURCES:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.data_dir, name))
+                signature[name] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                signature[name] = None
+        if self.store is not None:
+            signature['store'] = self.store.revision()
+        signature['weights'] = None
+        recommender = self.recommender
+        if recommender is not None and loaded_weights_version(recommender) is not None:
+            model = recommender.recommender
+            versions = model.weight_registry.versions(model.n_qubits)
+            signature['weights'] = versions[-1] if versions else None
+        return signature
+    
+    def update(self, new_viewing_rows=None, new_profile_rows=None, revision=None):
+        """
+        Serve a new version of the recommender with new profile and viewing records added.
+        
+        The records are expected to be in the store already. Callers write
+        them while holding `write_lock` and pass the store revision of
+        their write: if no other process wrote to the store since this
+        version was loaded, the watcher does not rebuild for the write.
+        
+        Returns:
+            The new Recommender
+        """
+        with self.write_lock:
+            recommender = self.recommender.updated(new_viewing_rows=new_viewing_rows, new_profile_rows=new_profile_rows)
+            signature = dict(self._signature)
+            if revision is not None and revision == signature.get('store', 0) + 1:
+                signature['store'] = revision
+            self._swap(recommender, signature)
+        return recommender
+    
+    def reload(self):
+        """
+        Rebuild the recommender if the data files changed since it was built.
+        
+        The new version is built while the current one keeps serving, then
+        swapped in. If the files changed again during the rebuild, e.g. by
+        a new profile, the result is dropped and the next reload starts over.
+        
+        Returns:
+            Whether a new version was swapped in
+        """
+        with self.write_lock:
+            signature = self.data_signature()
+            if not self.ready or signature == self._signature:
+                return False
+        print("Data files changed, rebuilding the recommender")
+        recommender = Recommender(self.data_dir)
+        with self.write_lock:
+            if self.data_signature() != signature:
+                print("Data files changed during the rebuild, retrying")
+                return False
+            # Compared with the newest version on disk by the next reload
+            signature['weights'] = loaded_weights_version(recommender)
+            self._swap(recommender, signature)
+        print(f"Serving recommender version {recommender.version}")
+        return True
+    
+    def compact(self):
+        """
+        Do the work the served model deferred when records were added by update().
+        
+        The compacted version is built next to the served one without a
+        lock. Records added in the meantime are then added to it under the
+        write lock before it is swapped in; if the served version was
+        rebuilt in the meantime, the result is dropped.
+        
+        Returns:
+            Whether a new version was swapped in
+        """
+        from app.quantum.recommender import records_since, has_appended_records
+        source = self.recommender
+        if source is None or not has_appended_records(source.recommender):
+            return False
+        recommender = source.compacted()
+        with self.write_lock:
+            records = records_since(self.recommender.recommender, source.recommender)
+            if records is None:
+                return False
+            new_viewing_rows, new_profile_rows = records
+            if len(new_viewing_rows) or len(new_profile_rows):
+                recommender = recommender.updated(new_viewing_rows=new_viewing_rows, new_profile_rows=new_profile_rows)
+            self._swap(recommender, self._signature)
+        return True
+    
+    def watch(self, interval=5.0):
+        """
+        Start polling the data files every `interval` seconds, once,
+        reloading on changes and otherwise compacting the served version.
+        """
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, args=(interval,), name='model-reloader', daemon=True)
+                self._watcher.start()
+        return self
+    
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.reload() or self.compact()
+            except Exception as e:
+                print(f"Failed to reload recommender: {e}")
+    
+    @property
+    def ready(self):
+        return self.recommender is not None
+    
+    def wait(self, timeout=None):
+        """Block until warm-up has finished, returning whether the recommender is ready."""
+        self.start()
+        self._done.wait(timeout)
+        return self.ready
+    
+    def state(self):
+        """Warm-up status and served version for the health endpoints."""
+        recommender = self.recommender
+        state = {'status': self.status, 'ready': recommender is not None}
+        if recommender is not None:
+            state['version'] = recommender.version
+        if self.started_at is not None:
+            state['seconds'] = round((self.ready_at or time.time()) - self.started_at, 3)
+        if self.error is not None:
+            state['error'] = self.error
+        return state
+    
+    def popular_movies(self, top_n=10):
+        """Most popular movies read with the csv module, for requests served before the model is ready."""
+        if self._popular is None:
+            with open(f'{self.data_dir}/movies.csv', newline='') as f:
+                movies = list(csv.DictReader(f))
+            movies.sort(key=lambda movie: float(movie['popularity']), reverse=True)
+            self._popular = [
+                {
+                    'id': int(movie['movie_id']),
+                    'title': movie['title'],
+                    'genre': movie['genre'],
+                    'rating': float(movie['rating']),
+                    # A popularity score in the same range as similarity
+                    'similarity': float(movie['popularity']) / 100
+                }
+                for movie in movies
+            ]
+        return self._popular[:top_n]
 
-def create_app():
+# The recommender is built in the background once the app is created
+model = ModelWarmup()
+
+def create_app(warm_up=True, reload_interval=5.0):
     app = Flask(__name__)
     app.secret_key = 'quantum_recommender_secret_key'  # Add a secret key for sessions
     
@@ -63,4 +483,10 @@ def create_app():
     from app.routes import main_bp
     app.register_blueprint(main_bp)
     
+    if warm_up:
+        model.start()
+        # Pick up changed data files without a restart
+        if reload_interval:
+            model.watch(reload_interval)
+    
     return app 
\ No newline at end of file
@@ -1 +1,6 @@
-from app.quantum.recommender import QuantumRecommender, ClassicalRecommender 
\ No newline at end of file
+def __getattr__(name):
+    # The recommenders import PennyLane, so they are only loaded on first use
+    if name in ('QuantumRecommender', 'ClassicalRecommender'):
+        from app.quantum import recommender
+        return getattr(recommender, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
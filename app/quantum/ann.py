@@ -0,0 +1,218 @@
+import numpy as np
+from scipy.sparse import csr_matrix, issparse
+from app.quantum.arrays import top_k_indices
+from app.quantum.neighbours import normalize_rows
+
+
+def _normalize(vectors):
+    """Unit-norm rows of a dense or sparse matrix, so inner products are cosines."""
+    if issparse(vectors):
+        return normalize_rows(vectors)
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=float))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def _dense(matrix):
+    return matrix.toarray() if issparse(matrix) else np.asarray(matrix)
+
+
+def _top_k(rows, scores, k):
+    """Best k (rows, scores) of one query, padded with -1 and -inf."""
+    top = top_k_indices(scores, k)
+    result_rows = np.full(k, -1, dtype=np.int64)
+    result_scores = np.full(k, -np.inf)
+    result_rows[:len(top)] = rows[top]
+    result_scores[:len(top)] = scores[top]
+    return result_rows, result_scores
+
+
+class ExactIndex:
+    """
+    Brute-force cosine search, the reference for the approximate indexes.
+
+    All indexes share the same interface: build(vectors) once, then
+    search(queries, k) for the rows of the k most cosine-similar vectors.
+    Vectors may be dense arrays or SciPy sparse matrices.
+    """
+
+    def build(self, vectors):
+        self.vectors = _normalize(vectors)
+        return self
+
+    def search(self, queries, k):
+        """
+        Find the k most similar vectors of every query.
+
+        Args:
+            queries: Query vectors of shape (n_queries, dim)
+            k: Number of results per query
+
+        Returns:
+            Tuple of (rows, cosine similarities) of shape (n_queries, k),
+            best first and padded with -1 and -inf
+        """
+        scores = _dense(_normalize(queries) @ self.vectors.T)
+        rows = top_k_indices(scores, k)
+        result_rows = np.full((len(scores), k), -1, dtype=np.int64)
+        result_scores = np.full((len(scores), k), -np.inf)
+        result_rows[:, :rows.shape[1]] = rows
+        result_scores[:, :rows.shape[1]] = np.take_along_axis(scores, rows, axis=1)
+        return result_rows, result_scores
+
+
+class IVFIndex(ExactIndex):
+    """
+    Inverted-file index with a spherical k-means coarse quantizer.
+
+    Vectors are grouped into n_lists clusters. A query only scores the
+    vectors of its n_probe closest clusters, so n_probe trades recall for
+    latency: n_probe == n_lists is exact search.
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, n_iter=10, sample_size=100000, seed=0):
+        """
+        Args:
+            n_lists: Number of clusters (defaults to about sqrt(n_vectors))
+            n_probe: Number of clusters searched per query
+            n_iter: k-means iterations
+            sample_size: Number of vectors the quantizer is trained on
+            seed: Seed of the k-means initialization and sample
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.sample_size = sample_size
+        self.seed = seed
+
+    def _assign(self, vectors):
+        return np.argmax(_dense(vectors @ self.centroids.T), axis=1)
+
+    def build(self, vectors):
+        self.vectors = _normalize(vectors)
+        n_vectors = self.vectors.shape[0]
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(n_vectors))), n_vectors)
+        rng = np.random.default_rng(self.seed)
+
+        # Spherical k-means on a sample: centroids are normalized cluster means
+        sample = self.vectors[rng.choice(n_vectors, size=min(self.sample_size, n_vectors), replace=False)]
+        self.centroids = _dense(sample[rng.choice(sample.shape[0], size=n_lists, replace=False)])
+        for _ in range(self.n_iter):
+            labels = self._assign(sample)
+            members = csr_matrix(
+                (np.ones(len(labels)), (labels, np.arange(len(labels)))), shape=(n_lists, len(labels))
+            )
+            sums = _dense(members @ sample)
+            empty = np.asarray(members.sum(axis=1)).ravel() == 0
+            self.centroids = np.where(empty[:, None], self.centroids, _normalize(sums))
+
+        # Inverted lists as one row array sorted by cluster plus offsets
+        labels = self._assign(self.vectors)
+        self.list_rows = np.argsort(labels, kind='stable')
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))])
+        return self
+
+    def search(self, queries, k):
+        queries = _normalize(queries)
+        probes = top_k_indices(_dense(queries @ self.centroids.T), self.n_probe)
+
+        result_rows = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        result_scores = np.full((queries.shape[0], k), -np.inf)
+        for i, lists in enumerate(probes):
+            rows = np.concatenate([self.list_rows[self.list_offsets[l]:self.list_offsets[l + 1]] for l in lists])
+            scores = _dense(self.vectors[rows] @ queries[i].T).ravel()
+            result_rows[i], result_scores[i] = _top_k(rows, scores, k)
+        return result_rows, result_scores
+
+
+class RandomProjectionLSH(ExactIndex):
+    """
+    Locality-sensitive hashing with random hyperplanes.
+
+    Each of n_tables hash tables keys a vector by the signs of its
+    projections on n_bits random hyperplanes through the mean vector;
+    vectors with a small angle tend to share keys. A query scores the vectors sharing its key in any
+    table. More tables raise recall and latency, more bits lower both.
+    """
+
+    def __init__(self, n_bits=12, n_tables=8, seed=0):
+        """
+        Args:
+            n_bits: Hyperplanes per table (at most 62)
+            n_tables: Number of hash tables
+            seed: Seed of the random hyperplanes
+        """
+        self.n_bits = n_bits
+        self.n_tables = n_tables
+        self.seed = seed
+
+    def _keys(self, vectors):
+        bits = _dense(vectors @ self.planes) - self.offsets > 0
+        bits = bits.reshape(bits.shape[0], self.n_tables, self.n_bits)
+        return bits @ (1 << np.arange(self.n_bits, dtype=np.int64))
+
+    def build(self, vectors):
+        self.vectors = _normalize(vectors)
+        rng = np.random.default_rng(self.seed)
+        self.planes = rng.standard_normal((self.vectors.shape[1], self.n_tables * self.n_bits))
+        # Hyperplanes through the mean vector rather than the origin, so that
+        # embeddings clustered in one direction still spread over the buckets
+        mean = np.asarray(self.vectors.mean(axis=0)).ravel()
+        self.offsets = mean @ self.planes
+
+        # Per table: rows sorted by key, so a bucket is a searchsorted range
+        keys = self._keys(self.vectors)
+        self.table_rows = np.argsort(keys, axis=0, kind='stable')
+        self.table_keys = np.take_along_axis(keys, self.table_rows, axis=0)
+        return self
+
+    def search(self, queries, k):
+        queries = _normalize(queries)
+        query_keys = self._keys(queries)
+
+        result_rows = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        result_scores = np.full((queries.shape[0], k), -np.inf)
+        for i, keys in enumerate(query_keys):
+            buckets = []
+            for table, key in enumerate(keys):
+                start, end = np.searchsorted(self.table_keys[:, table], [key, key + 1])
+                buckets.append(self.table_rows[start:end, table])
+            rows = np.unique(np.concatenate(buckets))
+            scores = _dense(self.vectors[rows] @ queries[i].T).ravel()
+            result_rows[i], result_scores[i] = _top_k(rows, scores, k)
+        return result_rows, result_scores
+
+
+def approximate_neighbours(index, matrix, k, block_size=1024):
+    """
+    Top-k most cosine-similar users of each user from an ANN index.
+
+    The approximate counterpart of neighbours.top_k_neighbours, with the
+    same output: users are never their own neighbours and only positive
+    similarities are kept.
+
+    Args:
+        index: Unbuilt index (ExactIndex, IVFIndex or RandomProjectionLSH)
+        matrix: Sparse or dense (n_users, dim) user vectors
+        k: Number of neighbours per user
+        block_size: Number of users searched together
+
+    Returns:
+        Tuple of (neighbour rows, similarities) arrays of shape (n_users, k),
+        ordered by descending similarity and padded with -1 and 0
+    """
+    index.build(matrix)
+    n_users = matrix.shape[0]
+    neighbours = np.full((n_users, k), -1, dtype=np.int32)
+    similarities = np.zeros((n_users, k), dtype=np.float32)
+    for start in range(0, n_users, block_size):
+        block = np.arange(start, min(start + block_size, n_users))
+        rows, scores = index.search(matrix[block], k + 1)
+
+        # Move the kept results to the front of each row, preserving their order
+        keep = (rows >= 0) & (rows != block[:, None]) & (scores > 0)
+        order = np.argsort(~keep, axis=1, kind='stable')[:, :k]
+        kept = np.take_along_axis(keep, order, axis=1)
+        neighbours[block] = np.where(kept, np.take_along_axis(rows, order, axis=1), -1)
+        similarities[block] = np.where(kept, np.take_along_axis(scores, order, axis=1), 0)
+    return neighbours, similarities
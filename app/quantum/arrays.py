@@ -0,0 +1,111 @@
+import threading
+import numpy as np
+
+
+def lookup_rows(index, ids):
+    """Map IDs to rows through an ID-indexed array, returning -1 for unknown IDs."""
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(index):
+        return np.full(ids.shape, -1, dtype=np.int64)
+    in_range = (ids >= 0) & (ids < len(index))
+    return np.where(in_range, index[np.where(in_range, ids, 0)], -1)
+
+
+def top_k_indices(scores, k):
+    """Indices of the k largest scores along the last axis, ordered by descending score."""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    top = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=-1), axis=-1, kind='stable')
+    return np.take_along_axis(top, order, axis=-1)
+
+
+def extend_index(index, ids, rows):
+    """Return a copy of an ID-indexed row array with ids mapped to rows."""
+    ids = np.asarray(ids, dtype=np.int64)
+    size = max(len(index), int(ids.max()) + 1) if len(ids) else len(index)
+    extended = np.full(size, -1, dtype=np.int64)
+    extended[:len(index)] = index
+    extended[ids] = rows
+    return extended
+
+
+class RowBuffer:
+    """
+    Backing array with spare rows that successive versions of an array append into.
+
+    Versions are views of the first rows of `data`. The version holding
+    all rows used so far appends in place after them, where older and
+    shorter views never look; appending to any other version copies it
+    into a new buffer. Capacity grows by a quarter, so appending is
+    amortized O(new rows) with little memory left unused.
+    """
+
+    def __init__(self, array, n_rows):
+        self.data = np.empty((n_rows + n_rows // 4 + 16,) + array.shape[1:], dtype=array.dtype)
+        self.data[:len(array)] = array
+        self.size = len(array)
+        self.lock = threading.Lock()
+
+
+def append_rows(buffers, name, array, rows):
+    """
+    Return array with rows appended, as a view of a buffer shared with array where possible.
+
+    Args:
+        buffers: Dict of name -> RowBuffer owned by the caller, updated in place
+        name: Key of the array in buffers
+        array: Array to append to, left unchanged
+        rows: Rows to append, cast to the dtype of array
+    """
+    if not len(rows):
+        return array
+    n_rows = len(array) + len(rows)
+    buffer = buffers.get(name)
+    if buffer is not None:
+        with buffer.lock:
+            if array.base is buffer.data and len(array) == buffer.size and n_rows <= len(buffer.data):
+                buffer.data[len(array):n_rows] = rows
+                buffer.size = n_rows
+                return buffer.data[:n_rows]
+    buffer = RowBuffer(array, n_rows)
+    buffer.data[len(array):n_rows] = rows
+    buffer.size = n_rows
+    buffers[name] = buffer
+    return buffer.data[:n_rows]
+
+
+def assign_rows(buffers, name, array, rows, values, n_rows, fill=0):
+    """
+    Return array grown to n_rows rows, filled with fill, with rows set to values.
+
+    Only rows past the end of array, e.g. of new users, are written in
+    place through append_rows(); setting an existing row copies the array.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    existing = rows < len(array)
+    tail = np.full((n_rows - len(array),) + array.shape[1:], fill, dtype=array.dtype)
+    tail[rows[~existing] - len(array)] = values[~existing]
+    if existing.any():
+        array = np.concatenate([array, tail])
+        array[rows[existing]] = values[existing]
+        return array
+    return append_rows(buffers, name, array, tail)
+
+
+def append_index(buffers, name, index, ids, rows):
+    """
+    Like extend_index(), appending to a buffered index when all ids are past its end.
+
+    New IDs handed out in increasing order, like those of the profile
+    store, then cost O(new IDs) instead of a copy of the index.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(ids):
+        return index
+    if ids.min() < len(index):
+        return extend_index(index, ids, rows)
+    tail = np.full(int(ids.max()) + 1 - len(index), -1, dtype=index.dtype)
+    tail[ids - len(index)] = rows
+    return append_rows(buffers, name, index, tail)
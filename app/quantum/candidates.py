@@ -0,0 +1,119 @@
+import time
+import threading
+import numpy as np
+from app.quantum.arrays import top_k_indices
+
+DEFAULT_WEIGHTS = {'genre': 0.1, 'popularity': 0.1, 'coviewing': 0.25, 'content': 1.0}
+
+
+class CandidateGenerator:
+    """
+    Cheap first retrieval stage that picks the movies worth scoring with the circuit.
+
+    Every catalog movie gets a weighted sum of signals that need no circuit
+    execution: a preferred-genre match, popularity, its item-item
+    similarity to the movies the user watched and the cosine similarity of
+    its circuit inputs to the user's circuit inputs, which the circuit
+    embeds wire by wire. The best n_candidates movies go on to quantum
+    scoring.
+
+    Latency and candidate counts are accumulated in `metrics`, recall
+    against full-catalog scoring is added with record_recall(). Requests
+    served from several threads update the metrics under a lock.
+    """
+
+    def __init__(self, movie_features, movie_genres, popularity, item_index, n_candidates=200, weights=None):
+        """
+        Args:
+            movie_features: Circuit inputs of the catalog, shape (n_movies, n_features)
+            movie_genres: Genre code of every catalog movie
+            popularity: Popularity of every catalog movie, scaled to [0, 1]
+            item_index: ItemNeighbourIndex over the catalog
+            n_candidates: Number of candidates returned per user
+            weights: Weights of the 'genre', 'popularity', 'coviewing' and
+                'content' signals (defaults to DEFAULT_WEIGHTS)
+        """
+        norms = np.linalg.norm(movie_features, axis=1, keepdims=True)
+        self.movie_features = movie_features / np.where(norms > 0, norms, 1)
+        self.movie_genres = np.asarray(movie_genres)
+        self.popularity = np.asarray(popularity, dtype=float)
+        self.item_index = item_index
+        self.n_candidates = n_candidates
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.metrics = {'requests': 0, 'seconds': 0.0, 'candidates': 0, 'recall_users': 0, 'recall_sum': 0.0}
+        self._metrics_lock = threading.Lock()
+
+    def generate(self, watched_rows, user_features=None, preferred_genre=-1, exclude_watched=True,
+                 n_candidates=None):
+        """
+        Pick the candidate movies of one user.
+
+        Args:
+            watched_rows: Catalog rows of the movies the user watched
+            user_features: Circuit inputs of the user, if known
+            preferred_genre: Genre code of the user's preferred genre, -1 if none
+            exclude_watched: Whether watched movies can not be candidates
+            n_candidates: Overrides the configured number of candidates
+
+        Returns:
+            Catalog rows of the candidates, best first
+        """
+        start = time.perf_counter()
+        watched_rows = np.asarray(watched_rows, dtype=np.int64)
+        n_movies = len(self.popularity)
+
+        scores = self.weights['popularity'] * self.popularity
+        if preferred_genre >= 0:
+            scores = scores + self.weights['genre'] * (self.movie_genres == preferred_genre)
+        if len(watched_rows):
+            # Mean item-item similarity to the watched movies
+            neighbours = self.item_index.neighbours[watched_rows].ravel()
+            similarities = self.item_index.similarities[watched_rows].ravel()
+            known = neighbours >= 0
+            coviewing = np.bincount(neighbours[known], weights=similarities[known], minlength=n_movies)
+            scores = scores + self.weights['coviewing'] * coviewing / len(watched_rows)
+        if user_features is not None and np.linalg.norm(user_features) > 0:
+            # Cosine similarity of the circuit inputs
+            user_features = np.asarray(user_features, dtype=float)
+            content = self.movie_features @ (user_features / np.linalg.norm(user_features))
+            scores = scores + self.weights['content'] * content
+        if exclude_watched:
+            scores = np.array(scores, dtype=float)
+            scores[watched_rows] = -np.inf
+
+        rows = top_k_indices(scores, n_candidates or self.n_candidates)
+        rows = rows[np.isfinite(scores[rows])]
+
+        seconds = time.perf_counter() - start
+        with self._metrics_lock:
+            self.metrics['requests'] += 1
+            self.metrics['seconds'] += seconds
+            self.metrics['candidates'] += len(rows)
+        return rows
+
+    def record_recall(self, candidate_rows, exact_rows):
+        """
+        Record the share of the exact top movies that were among the candidates.
+
+        Returns:
+            Recall of this user, or None if exact_rows is empty
+        """
+        if not len(exact_rows):
+            return None
+        recall = float(np.isin(exact_rows, candidate_rows).mean())
+        with self._metrics_lock:
+            self.metrics['recall_users'] += 1
+            self.metrics['recall_sum'] += recall
+        return recall
+
+    def summary(self):
+        """Mean latency, candidate count and recall over the recorded requests."""
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+        requests = max(metrics['requests'], 1)
+        return {
+            'requests': metrics['requests'],
+            'mean_latency_ms': 1000 * metrics['seconds'] / requests,
+            'mean_candidates': metrics['candidates'] / requests,
+            'recall': metrics['recall_sum'] / metrics['recall_users'] if metrics['recall_users'] else None
+        }
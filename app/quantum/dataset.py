@@ -0,0 +1,278 @@
+import os
+import copy
+import threading
+import numpy as np
+import pandas as pd
+from app.quantum.embedding_store import file_digest
+from app.quantum.store import ProfileStore, STORE_NAME, STORE_SUFFIX
+
+# Column dtypes of the three tables. Ratings shown to clients stay float64
+# so that values like 8.7 are returned exactly.
+MOVIE_DTYPES = {
+    'movie_id': 'int32',
+    'genre': 'category',
+    'release_year': 'int32',
+    'rating': 'float64',
+    'popularity': 'float32',
+    'runtime': 'float32',
+    'is_original': 'int8'
+}
+VIEWING_DTYPES = {
+    'user_id': 'int32',
+    'movie_id': 'int32',
+    'watch_duration': 'float32',
+    'rating': 'float32',
+    'completed': 'float32'
+}
+PROFILE_DTYPES = {
+    'user_id': 'int32',
+    'age': 'float32',
+    'gender': 'category',
+    'location': 'category',
+    'country': 'category',
+    'preferred_genre': 'category',
+    'subscription_type': 'category'
+}
+VIEWING_DATES = ['date_watched']
+PROFILE_DATES = ['last_active']
+
+
+def read_table(path, dtypes, date_columns=(), table=None, offset=0):
+    """
+    Read a CSV or Parquet table, or a table of a profile store, with explicit column dtypes.
+
+    Columns missing from the file are skipped, columns not listed in
+    dtypes keep the reader's default type.
+
+    Args:
+        path: Path to a .csv, .parquet or profile store .db file
+        dtypes: Column name -> dtype
+        date_columns: Columns parsed as datetime64
+        table: Table read from a profile store
+        offset: Number of leading rows of the profile store table to skip
+    """
+    extension = os.path.splitext(path)[1]
+    if extension == '.parquet':
+        frame = pd.read_parquet(path)
+    elif extension == STORE_SUFFIX:
+        frame = ProfileStore(path).read_frame(table, offset)
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        frame = pd.read_csv(
+            path,
+            dtype={column: dtype for column, dtype in dtypes.items() if column in header},
+            parse_dates=[column for column in date_columns if column in header]
+        )
+    return cast_columns(frame, dtypes, date_columns)
+
+
+def source_digest(path):
+    """Digest of a data source: the data revision of a profile store, the contents of any other file."""
+    if os.path.splitext(path)[1] == STORE_SUFFIX:
+        return ProfileStore(path).digest()
+    return file_digest(path)
+
+
+def data_paths(data_dir):
+    """
+    Paths of the movie, viewing and profile data in a data directory.
+
+    Viewing records and profiles are read from the profile store the app
+    creates on first start, or from the CSV files while there is none.
+    """
+    store_path = os.path.join(data_dir, STORE_NAME)
+    has_store = os.path.exists(store_path)
+    return {
+        'user_data_path': store_path if has_store else os.path.join(data_dir, 'user_viewing.csv'),
+        'movie_data_path': os.path.join(data_dir, 'movies.csv'),
+        'user_profile_path': store_path if has_store else os.path.join(data_dir, 'user_profiles.csv')
+    }
+
+
+def cast_columns(frame, dtypes, date_columns=()):
+    """Convert the listed columns of a frame that do not have their dtype yet."""
+    for column, dtype in dtypes.items():
+        if column in frame and str(frame[column].dtype) != dtype:
+            frame[column] = frame[column].astype(dtype)
+    for column in date_columns:
+        if column in frame and not pd.api.types.is_datetime64_any_dtype(frame[column]):
+            frame[column] = pd.to_datetime(frame[column], errors='coerce')
+    return frame
+
+
+def concat_rows(frame, rows, dtypes, date_columns=()):
+    """Append new records to a loaded table, keeping its column dtypes."""
+    return cast_columns(pd.concat([frame, rows], ignore_index=True), dtypes, date_columns)
+
+
+class AppendedTable:
+    """
+    A loaded table plus the records appended to it since, concatenated
+    only when the whole table is read.
+
+    append() returns a new table in O(new rows): versions derived from one
+    another share one list of appended chunks and each knows how many of
+    them it holds, like the row buffers of app.quantum.arrays. The
+    concatenated frame is computed once per version, on first read.
+    """
+
+    def __init__(self, frame, dtypes, date_columns=()):
+        self.base = frame
+        self.dtypes = dtypes
+        self.date_columns = date_columns
+        self.n_rows = len(frame)
+        self._chunks = []
+        self._n_chunks = 0
+        self._chunks_lock = threading.Lock()
+        self._frame = frame
+        self._frame_lock = threading.Lock()
+
+    def __len__(self):
+        return self.n_rows
+
+    def append(self, rows):
+        """A new table with rows appended; this one is left unchanged."""
+        rows = cast_columns(rows.reset_index(drop=True), self.dtypes, self.date_columns)
+        table = copy.copy(self)
+        table._frame_lock = threading.Lock()
+        with self._chunks_lock:
+            if len(self._chunks) != self._n_chunks:
+                # Another version appended to the shared list already
+                table._chunks = self._chunks[:self._n_chunks]
+                table._chunks_lock = threading.Lock()
+            table._chunks.append(rows)
+        table._n_chunks += 1
+        table.n_rows += len(rows)
+        table._frame = None
+        return table
+
+    def frame(self):
+        """The table with all appended records, keeping its column dtypes."""
+        with self._frame_lock:
+            if self._frame is None:
+                self._frame = concat_rows(self.base, pd.concat(self._chunks[:self._n_chunks]), self.dtypes,
+                                          self.date_columns)
+            return self._frame
+
+    def appended_since(self, table):
+        """
+        Records appended after an earlier version of this table.
+
+        Returns:
+            DataFrame of the records, or None if table is not an earlier
+            version of this one
+        """
+        if table.base is not self.base or table._n_chunks > self._n_chunks:
+            return None
+        if any(a is not b for a, b in zip(table._chunks[:table._n_chunks], self._chunks)):
+            return None
+        chunks = self._chunks[table._n_chunks:self._n_chunks]
+        return pd.concat(chunks, ignore_index=True) if chunks else self.base[:0]
+
+    def contains(self, column, value):
+        """Whether any record has value in column, without concatenating the table."""
+        chunks = self._chunks[:self._n_chunks]
+        return any((frame[column].to_numpy() == value).any() for frame in [self.base] + chunks)
+
+
+def frame_arrays(prefix, frame):
+    """
+    The columns of a table as plain arrays keyed by prefix, for a snapshot.
+
+    Numeric and datetime columns are stored as they are, categorical and
+    string columns as int32 codes plus their categories, so that no array
+    holds Python objects and all of them can be memory-mapped.
+    """
+    arrays = {f'{prefix}/columns': np.array(frame.columns, dtype=str)}
+    kinds = []
+    for column in frame.columns:
+        values = frame[column]
+        key = f'{prefix}/{column}'
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+            kinds.append('values')
+            arrays[key] = values.to_numpy()
+            continue
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            kinds.append('category')
+        else:
+            kinds.append('string')
+            values = values.astype('category')
+        arrays[key] = values.cat.codes.to_numpy().astype(np.int32)
+        arrays[f'{key}/categories'] = np.asarray(values.cat.categories, dtype=str)
+    arrays[f'{prefix}/kinds'] = np.array(kinds)
+    return arrays
+
+
+def array_frame(arrays, prefix):
+    """Rebuild a table from frame_arrays() output, without copying numeric columns."""
+    columns = {}
+    for column, kind in zip(arrays[f'{prefix}/columns'], arrays[f'{prefix}/kinds']):
+        column, key = str(column), f'{prefix}/{column}'
+        if kind == 'values':
+            columns[column] = arrays[key]
+            continue
+        values = pd.Categorical.from_codes(arrays[key], arrays[f'{key}/categories'])
+        columns[column] = values if kind == 'category' else np.asarray(values, dtype=object)
+    return pd.DataFrame(columns, copy=False)
+
+
+def table_arrays(movies_df, user_viewing_df, user_profiles_df):
+    """The arrays of the movies, viewing and profiles tables, for a snapshot."""
+    arrays = frame_arrays('movies', movies_df)
+    arrays.update(frame_arrays('viewing', user_viewing_df))
+    arrays.update(frame_arrays('profiles', user_profiles_df))
+    return arrays
+
+
+class Dataset:
+    """
+    Movies, viewing records and user profiles loaded once with compact dtypes.
+
+    Recommenders built from the same Dataset share its DataFrames and never
+    modify them. Genres are a categorical column whose categories keep the
+    order of first appearance in the catalog, with the one-hot encoding
+    stored as a packed uint8 bitset per movie.
+    """
+
+    def __init__(self, movies_df, user_viewing_df, user_profiles_df):
+        self.movies_df = movies_df
+        self.user_viewing_df = user_viewing_df
+        self.user_profiles_df = user_profiles_df
+
+        # Categories in order of first appearance, the layout of the genre
+        # part of the circuit inputs
+        genre = movies_df['genre']
+        self.movies_df['genre'] = genre.cat.set_categories(list(pd.unique(genre.dropna().astype(object))))
+        self.genres = np.asarray(self.movies_df['genre'].cat.categories, dtype=object)
+        self.movie_genres = self.movies_df['genre'].cat.codes.to_numpy()
+        self.genre_bits = np.packbits(self.movie_genres[:, None] == np.arange(len(self.genres)), axis=1)
+
+    @classmethod
+    def load(cls, movie_data_path, user_data_path, user_profile_path):
+        """Load the three tables from CSV or Parquet files or a profile store."""
+        return cls(
+            read_table(movie_data_path, MOVIE_DTYPES),
+            read_table(user_data_path, VIEWING_DTYPES, VIEWING_DATES, table='user_viewing'),
+            read_table(user_profile_path, PROFILE_DTYPES, PROFILE_DATES, table='user_profiles')
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a dataset from to_arrays() output."""
+        return cls(array_frame(arrays, 'movies'), array_frame(arrays, 'viewing'), array_frame(arrays, 'profiles'))
+
+    def to_arrays(self):
+        """The three tables as plain arrays, for a snapshot."""
+        return table_arrays(self.movies_df, self.user_viewing_df, self.user_profiles_df)
+
+    def genre_onehot(self):
+        """Unpacked (n_movies, n_genres) uint8 one-hot genre matrix."""
+        return np.unpackbits(self.genre_bits, axis=1, count=len(self.genres))
+
+    def memory_usage(self):
+        """Bytes used by each table, including string contents."""
+        return {
+            'movies': int(self.movies_df.memory_usage(deep=True).sum()),
+            'viewing': int(self.user_viewing_df.memory_usage(deep=True).sum()),
+            'profiles': int(self.user_profiles_df.memory_usage(deep=True).sum())
+        }
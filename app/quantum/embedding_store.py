@@ -0,0 +1,115 @@
+import hashlib
+import os
+import numpy as np
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_arrays(*parts):
+    """Hash strings and arrays into one hex key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            digest.update(part.encode())
+        else:
+            digest.update(np.ascontiguousarray(part).tobytes())
+    return digest.hexdigest()
+
+
+class EmbeddingStore:
+    """
+    On-disk store of precomputed movie embeddings.
+
+    Embeddings are saved as float32 in a single .npz file together with the
+    movie IDs, the circuit inputs they were computed from and a key hashing
+    everything they depend on (movie data, scaler state and weights). When
+    the key no longer matches, only movies whose circuit inputs changed are
+    re-embedded.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Path of the .npz file holding the embeddings
+        """
+        self.path = path
+
+    def load(self):
+        """Load the stored arrays, or None if there is no usable store."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with np.load(self.path) as data:
+                return {name: data[name] for name in data.files}
+        except Exception as e:
+            print(f"Ignoring unreadable embedding store {self.path}: {e}")
+            return None
+
+    def save(self, key, weights_key, movie_ids, features, embeddings):
+        """Atomically write the embeddings and the inputs they were computed from."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                key=np.array(key),
+                weights_key=np.array(weights_key),
+                movie_ids=np.asarray(movie_ids),
+                features=np.asarray(features, dtype=np.float32),
+                embeddings=np.asarray(embeddings, dtype=np.float32)
+            )
+        os.replace(tmp_path, self.path)
+
+    def sync(self, key, weights_key, movie_ids, features, embed_fn):
+        """
+        Return embeddings for movie_ids, reusing stored ones where possible.
+
+        Args:
+            key: Hash of everything the embeddings depend on
+            weights_key: Hash of the circuit weights alone
+            movie_ids: Movie IDs to return embeddings for
+            features: Circuit inputs for movie_ids, shape (n_movies, n_qubits)
+            embed_fn: Function mapping rows of features to their embeddings
+
+        Returns:
+            float32 array of embeddings aligned with movie_ids
+        """
+        movie_ids = np.asarray(movie_ids)
+        features = np.asarray(features, dtype=np.float32)
+        stored = self.load()
+
+        if (stored is not None and str(stored['key']) == key
+                and np.array_equal(stored['movie_ids'], movie_ids)):
+            return stored['embeddings']
+
+        embeddings = np.zeros(features.shape, dtype=np.float32)
+        stale = np.ones(len(movie_ids), dtype=bool)
+
+        # Reuse embeddings of movies whose circuit inputs are unchanged, which
+        # is only valid while the weights are the same
+        if (stored is not None and str(stored['weights_key']) == weights_key
+                and stored['features'].shape[1:] == features.shape[1:]
+                and len(stored['movie_ids']) > 0):
+            order = np.argsort(stored['movie_ids'])
+            sorted_ids = stored['movie_ids'][order]
+            pos = np.minimum(np.searchsorted(sorted_ids, movie_ids), len(sorted_ids) - 1)
+            found = sorted_ids[pos] == movie_ids
+            rows = order[pos[found]]
+            unchanged = np.all(stored['features'][rows] == features[found], axis=1)
+            reused = np.flatnonzero(found)[unchanged]
+            embeddings[reused] = stored['embeddings'][rows[unchanged]]
+            stale[reused] = False
+
+        if stale.any():
+            print(f"Computing embeddings for {int(stale.sum())} of {len(movie_ids)} movies")
+            embeddings[stale] = embed_fn(np.flatnonzero(stale))
+
+        self.save(key, weights_key, movie_ids, features, embeddings)
+        return embeddings
@@ -0,0 +1,104 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from app.quantum.statevector import StatevectorSimulator
+from app.quantum.mps import MPSSimulator
+from app.quantum.arrays import top_k_indices
+
+# Per-process state set up once by _init_worker, so tasks only carry row indices
+_worker = {}
+
+
+def _make_simulator(backend, n_qubits, bond_dim):
+    # The PennyLane backend runs the same circuit as the exact NumPy kernel,
+    # which avoids rebuilding a QNode in every worker
+    if backend == 'mps':
+        return MPSSimulator(n_qubits, bond_dim=bond_dim)
+    return StatevectorSimulator(n_qubits)
+
+
+def _init_worker(movie_features, weights, backend, bond_dim):
+    _worker['movie_features'] = movie_features
+    _worker['weights'] = weights
+    _worker['simulator'] = _make_simulator(backend, movie_features.shape[1], bond_dim)
+
+
+def _embed_chunk(rows):
+    return _worker['simulator'].expectations(_worker['movie_features'][rows], _worker['weights'])
+
+
+def _top_k_chunk(rows, user_embedding, k):
+    embeddings = _embed_chunk(rows)
+    norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(user_embedding)
+    similarities = (embeddings @ user_embedding / norms + 1) / 2
+    top = top_k_indices(similarities, k)
+    return rows[top], similarities[top]
+
+
+class ShardedScorer:
+    """
+    Embeds and scores catalog movies across a pool of worker processes.
+
+    Workers are initialized once with the movie feature matrix, the circuit
+    weights and a simulator, so each task only pickles an array of catalog
+    rows (plus the user embedding when scoring). Scoring returns a local
+    top-k per chunk, and the chunks are merged into a global top-k.
+    """
+
+    def __init__(self, movie_features, weights, backend='numpy', bond_dim=16, n_workers=None, chunk_size=1024):
+        """
+        Args:
+            movie_features: Circuit inputs of the catalog, shape (n_movies, n_qubits)
+            weights: Circuit weights
+            backend: Simulator backend of the recommender ('pennylane', 'numpy' or 'mps')
+            bond_dim: Maximum bond dimension of the 'mps' backend
+            n_workers: Number of worker processes (defaults to the CPU count)
+            chunk_size: Number of movies per task
+        """
+        self.chunk_size = chunk_size
+        self.pool = ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=_init_worker,
+            initargs=(np.asarray(movie_features), np.asarray(weights), backend, bond_dim)
+        )
+
+    def _chunks(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        return [rows[start:start + self.chunk_size] for start in range(0, len(rows), self.chunk_size)]
+
+    def embed(self, rows):
+        """Embeddings of the movies at the given catalog rows, shape (len(rows), n_qubits)."""
+        chunks = self._chunks(rows)
+        if not chunks:
+            return np.empty((0, 0))
+        return np.concatenate(list(self.pool.map(_embed_chunk, chunks)))
+
+    def top_k(self, user_embedding, rows, k):
+        """
+        Score movies against a user embedding and keep the best k.
+
+        Args:
+            user_embedding: Embedding of the user, shape (n_qubits,)
+            rows: Catalog rows of the candidate movies
+            k: Number of movies to return
+
+        Returns:
+            Tuple of (catalog rows, similarities in [0, 1]) ordered by descending similarity
+        """
+        chunks = self._chunks(rows)
+        results = list(self.pool.map(_top_k_chunk, chunks, [user_embedding] * len(chunks), [k] * len(chunks)))
+        if not results:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        rows = np.concatenate([chunk_rows for chunk_rows, _ in results])
+        similarities = np.concatenate([chunk_similarities for _, chunk_similarities in results])
+        top = top_k_indices(similarities, k)
+        return rows[top], similarities[top]
+
+    def close(self):
+        """Shut down the worker processes."""
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
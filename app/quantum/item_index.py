@@ -0,0 +1,130 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from app.quantum.arrays import top_k_indices
+from app.quantum.neighbours import normalize_rows
+
+
+class ItemNeighbourIndex:
+    """
+    Top-k most similar movies of every catalog movie as fixed-width arrays.
+
+    Similarity blends the cosine similarity of the movie embeddings, mapped
+    to [0, 1], with the cosine similarity of the movies' viewer sets. Rows
+    are padded with -1 where a movie has fewer than k similar movies, so
+    lookups read k entries and never touch the circuit.
+    """
+
+    def __init__(self, neighbours, similarities):
+        self.neighbours = neighbours
+        self.similarities = similarities
+
+    @classmethod
+    def build(cls, n_movies, k=20, embeddings=None, coviewing=None, coviewing_weight=0.5, block_size=1024):
+        """
+        Compute the top-k similar movies of every movie block by block.
+
+        Args:
+            n_movies: Number of catalog movies
+            k: Number of similar movies kept per movie
+            embeddings: Optional (n_movies, dim) movie embeddings
+            coviewing: Optional sparse (n_users, n_movies) viewing matrix
+            coviewing_weight: Weight of the co-viewing similarity when both
+                sources are given
+            block_size: Number of movies whose similarities are computed together
+        """
+        k = min(k, max(n_movies - 1, 0))
+        index = cls(np.full((n_movies, k), -1, dtype=np.int32), np.zeros((n_movies, k), dtype=np.float32))
+        index._compute_rows(np.arange(n_movies), embeddings, coviewing, coviewing_weight, block_size)
+        return index
+
+    def updated(self, changed_rows, embeddings=None, coviewing=None, coviewing_weight=0.5, block_size=1024):
+        """
+        A new index after viewers were added to some movies.
+
+        Only the co-viewing similarities of the changed movies move, so
+        their rows and those of the movies sharing a viewer with them are
+        recomputed and every other row is kept. The result equals build()
+        on the new viewing matrix; this index is left unchanged.
+
+        Args:
+            changed_rows: Catalog rows of the movies that gained viewers
+            embeddings, coviewing, coviewing_weight, block_size: As for build(),
+                with coviewing the new viewing matrix
+        """
+        index = type(self)(self.neighbours.copy(), self.similarities.copy())
+        changed_rows = np.asarray(changed_rows, dtype=np.int64)
+        if coviewing is None or not len(changed_rows):
+            return index
+        coviewing = csr_matrix(coviewing)
+        viewers = np.unique(coviewing[:, changed_rows].nonzero()[0])
+        rows = np.union1d(changed_rows, coviewing[viewers].indices)
+        index._compute_rows(rows, embeddings, coviewing, coviewing_weight, block_size)
+        return index
+
+    def _compute_rows(self, rows, embeddings, coviewing, coviewing_weight, block_size):
+        """Recompute the top-k similar movies of the given catalog rows in place."""
+        n_movies, k = self.neighbours.shape
+        if embeddings is not None:
+            embeddings = np.asarray(embeddings, dtype=float)
+            embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        if coviewing is not None:
+            viewers = normalize_rows(csr_matrix(coviewing).T)
+            viewers_t = viewers.T.tocsr()
+        if embeddings is not None and coviewing is not None:
+            weights = (1 - coviewing_weight, coviewing_weight)
+        else:
+            weights = (1, 1)
+
+        for start in range(0, len(rows), block_size):
+            block = rows[start:start + block_size]
+            block_similarities = np.zeros((len(block), n_movies))
+            if embeddings is not None:
+                block_similarities += weights[0] * (embeddings[block] @ embeddings.T + 1) / 2
+            if coviewing is not None:
+                block_similarities += weights[1] * (viewers[block] @ viewers_t).toarray()
+            block_similarities[np.arange(len(block)), block] = 0  # not similar to itself
+
+            top = top_k_indices(block_similarities, k)
+            top_similarities = np.take_along_axis(block_similarities, top, axis=1)
+            found = top_similarities > 0
+            self.neighbours[block] = np.where(found, top, -1)
+            self.similarities[block] = np.where(found, top_similarities, 0)
+
+    def similar(self, row, n=10):
+        """
+        Movies most similar to the movie at a catalog row.
+
+        Returns:
+            Tuple of (catalog rows, similarities), best first
+        """
+        neighbours = self.neighbours[row, :n]
+        found = neighbours >= 0
+        return neighbours[found], self.similarities[row, :n][found]
+
+    def recommend(self, seed_rows, exclude_rows=None, n=10):
+        """
+        Item-based recommendations: movies most similar to a set of seed movies.
+
+        Each candidate scores its similarity to the seeds averaged over all
+        seeds (0 for seeds it is not a neighbour of), so the cost is
+        O(len(seed_rows) * k) and scores stay in [0, 1].
+
+        Args:
+            seed_rows: Catalog rows of the movies the user watched or liked
+            exclude_rows: Catalog rows never to recommend (e.g. watched movies)
+            n: Number of movies to return
+
+        Returns:
+            Tuple of (catalog rows, scores), best first
+        """
+        seed_rows = np.asarray(seed_rows, dtype=np.int64)
+        neighbours = self.neighbours[seed_rows].ravel()
+        similarities = self.similarities[seed_rows].ravel()
+        keep = neighbours >= 0
+        if exclude_rows is not None:
+            keep &= ~np.isin(neighbours, exclude_rows)
+
+        rows, inverse = np.unique(neighbours[keep], return_inverse=True)
+        scores = np.bincount(inverse, weights=similarities[keep], minlength=len(rows)) / max(len(seed_rows), 1)
+        top = top_k_indices(scores, n)
+        return rows[top], scores[top]
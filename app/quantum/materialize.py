@@ -0,0 +1,122 @@
+import os
+import argparse
+import numpy as np
+from app.quantum.embedding_store import hash_arrays
+from app.quantum.dataset import source_digest, data_paths
+from app.quantum.arrays import extend_index, lookup_rows
+from app.quantum.recommender import recommendations_frame
+
+
+def data_version(recommender):
+    """Hash of the data and the scoring model a recommender was built from."""
+    return hash_arrays(
+        source_digest(recommender.user_data_path),
+        source_digest(recommender.movie_data_path),
+        source_digest(recommender.user_profile_path),
+        recommender.model_key
+    )
+
+
+def materialize(recommender, path, top_n=15, block_size=1024):
+    """
+    Write every user's top-N recommendations to a compact .npz file.
+
+    The file holds a (n_users, top_n) matrix of movie IDs padded with -1,
+    the matching float32 scores and the data version they were computed
+    for, so that stale files can be detected when loading.
+
+    Returns:
+        Number of users written
+    """
+    user_ids = recommender.user_profiles_df['user_id'].unique()
+    recs_df = recommender.generate_recommendations_batch(user_ids, top_n=top_n, block_size=block_size)
+    score_column = 'similarity' if 'similarity' in recs_df else 'rec_count'
+
+    movie_ids = np.full((len(user_ids), top_n), -1, dtype=np.int64)
+    scores = np.zeros((len(user_ids), top_n), dtype=np.float32)
+    user_index = extend_index(np.empty(0, dtype=np.int64), user_ids, np.arange(len(user_ids)))
+    rows = lookup_rows(user_index, recs_df['user_id'].to_numpy())
+    ranks = recs_df.groupby('user_id').cumcount().to_numpy()
+    movie_ids[rows, ranks] = recs_df['movie_id'].to_numpy()
+    scores[rows, ranks] = recs_df[score_column].to_numpy()
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(
+            f,
+            version=np.array(data_version(recommender)),
+            score_column=np.array(score_column),
+            user_ids=user_ids,
+            movie_ids=movie_ids,
+            scores=scores
+        )
+    os.replace(tmp_path, path)
+    return len(user_ids)
+
+
+class MaterializedRecommendations:
+    """Precomputed top-N recommendations written by materialize()."""
+
+    def __init__(self, version, score_column, user_ids, movie_ids, scores):
+        self.version = version
+        self.score_column = score_column
+        self.movie_ids = movie_ids
+        self.scores = scores
+        self.user_index = extend_index(np.empty(0, dtype=np.int64), user_ids, np.arange(len(user_ids)))
+
+    @classmethod
+    def load(cls, path, version):
+        """Load a materialized file, or return None if it is missing or was built from other data."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if str(data['version']) != version:
+                print(f"Ignoring stale materialized recommendations in {path}")
+                return None
+            return cls(version, str(data['score_column']), data['user_ids'], data['movie_ids'], data['scores'])
+
+    def invalidate(self, user_ids):
+        """Stop serving precomputed recommendations for users whose data changed."""
+        rows = lookup_rows(self.user_index, np.asarray(user_ids))
+        if (rows >= 0).any():
+            user_index = self.user_index.copy()
+            user_index[np.asarray(user_ids)[rows >= 0]] = -1
+            self.user_index = user_index
+
+    def get(self, user_id, top_n, recommender):
+        """
+        Precomputed recommendations for a user as a DataFrame, or None if
+        the user is not covered or more than the stored top-N is requested.
+        """
+        row = lookup_rows(self.user_index, user_id)
+        if row < 0 or top_n > self.movie_ids.shape[1]:
+            return None
+        movie_ids = self.movie_ids[row, :top_n]
+        scores = self.scores[row, :top_n]
+        movie_rows = lookup_rows(recommender.movie_index, movie_ids)
+        keep = (movie_ids >= 0) & (movie_rows >= 0)
+        scores = scores[keep] if self.score_column == 'similarity' else scores[keep].astype(int)
+        return recommendations_frame(recommender.movie_metadata, movie_rows[keep], self.score_column, scores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute every user's top-N recommendations")
+    parser.add_argument('--data-dir', default='data', help="Directory with the data files and profile store")
+    parser.add_argument('--out', default=None, help="Output .npz path (defaults to <data-dir>/cache/recommendations.npz)")
+    parser.add_argument('--top-n', type=int, default=15)
+    parser.add_argument('--block-size', type=int, default=1024, help="Users scored per matrix product")
+    parser.add_argument('--classical', action='store_true', help="Use the classical recommender")
+    args = parser.parse_args()
+
+    from app.quantum.recommender import QuantumRecommender, ClassicalRecommender
+    recommender_cls = ClassicalRecommender if args.classical else QuantumRecommender
+    recommender = recommender_cls(**data_paths(args.data_dir))
+
+    out = args.out or os.path.join(args.data_dir, 'cache', 'recommendations.npz')
+    n_users = materialize(recommender, out, top_n=args.top_n, block_size=args.block_size)
+    print(f"Wrote top-{args.top_n} recommendations for {n_users} users to {out}")
+
+
+if __name__ == '__main__':
+    main()
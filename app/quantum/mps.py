@@ -0,0 +1,160 @@
+import numpy as np
+from app.quantum.statevector import rotation_unitaries
+
+# Two-qubit gates as (2, 2, 2, 2) tensors indexed [out_a, out_b, in_a, in_b]
+CNOT = np.array([
+    [1, 0, 0, 0],
+    [0, 1, 0, 0],
+    [0, 0, 0, 1],
+    [0, 0, 1, 0]
+], dtype=complex).reshape(2, 2, 2, 2)
+# CNOT with the control on the second of the two sites
+CNOT_REVERSED = CNOT.transpose(1, 0, 3, 2)
+SWAP = np.eye(4, dtype=complex)[[0, 2, 1, 3]].reshape(2, 2, 2, 2)
+PAULI_Z_SIGNS = np.array([1.0, -1.0])
+
+
+class MPSSimulator:
+    """
+    Batched matrix-product-state simulator for the recommender circuit.
+
+    The state of every batch element is a chain of tensors of shape
+    (batch, left_bond, 2, right_bond). Two-qubit gates are applied by
+    contracting neighbouring sites and splitting them again with an SVD
+    truncated to bond_dim, so memory grows linearly with the qubit count.
+    The closing CNOT(n - 1, 0) of the ring is applied by swapping the last
+    qubit next to the first one and back. With a large enough bond_dim the
+    results are exact.
+    """
+
+    def __init__(self, n_qubits, bond_dim=16, n_layers=2, chunk_size=256):
+        """
+        Args:
+            n_qubits: Number of qubits in the circuit (at least 2)
+            bond_dim: Maximum bond dimension kept after each two-qubit gate
+            n_layers: Number of entangling/rotation layers
+            chunk_size: Maximum number of states simulated at once
+        """
+        if n_qubits < 2:
+            raise ValueError("The MPS simulator needs at least 2 qubits")
+        self.n_qubits = n_qubits
+        self.bond_dim = bond_dim
+        self.n_layers = n_layers
+        self.chunk_size = chunk_size
+
+    def _apply_two_site(self, tensors, site, gate, absorb='right'):
+        """Apply a gate to sites (site, site + 1) and truncate the shared bond."""
+        left, right = tensors[site], tensors[site + 1]
+        batch, left_bond, right_bond = left.shape[0], left.shape[1], right.shape[3]
+
+        theta = np.matmul(left.reshape(batch, left_bond * 2, -1), right.reshape(batch, -1, 2 * right_bond))
+        theta = np.matmul(gate.reshape(4, 4), theta.reshape(batch, left_bond, 4, right_bond))
+        u, s, vh = np.linalg.svd(theta.reshape(batch, left_bond * 2, 2 * right_bond), full_matrices=False)
+
+        keep = min(self.bond_dim, s.shape[1])
+        u, s, vh = u[:, :, :keep], s[:, :keep], vh[:, :keep, :]
+        # Absorbing the singular values on one side keeps the other isometric,
+        # which moves the orthogonality centre along with the gate sweep
+        if absorb == 'right':
+            vh = s[:, :, None] * vh
+        else:
+            u = u * s[:, None, :]
+        tensors[site] = u.reshape(batch, left_bond, 2, keep)
+        tensors[site + 1] = vh.reshape(batch, keep, 2, right_bond)
+
+    def _apply_cnot_ring(self, tensors):
+        last = self.n_qubits - 1
+        for site in range(last):
+            self._apply_two_site(tensors, site, CNOT, absorb='right')
+
+        # Bring the last qubit next to qubit 0, apply CNOT(n - 1, 0), move it back
+        for site in range(last - 1, 0, -1):
+            self._apply_two_site(tensors, site, SWAP, absorb='left')
+        self._apply_two_site(tensors, 0, CNOT_REVERSED, absorb='right')
+        for site in range(1, last):
+            self._apply_two_site(tensors, site, SWAP, absorb='right')
+
+    def _simulate_chunk(self, angles, unitaries):
+        batch = angles.shape[0]
+        tensors = []
+        for wire in range(self.n_qubits):
+            site = np.zeros((batch, 1, 2, 1), dtype=complex)
+            site[:, 0, 0, 0] = np.cos(angles[:, wire] / 2)
+            site[:, 0, 1, 0] = np.sin(angles[:, wire] / 2)
+            tensors.append(site)
+
+        for layer in range(self.n_layers):
+            self._apply_cnot_ring(tensors)
+            for wire in range(self.n_qubits):
+                tensors[wire] = np.einsum('ij,xajb->xaib', unitaries[layer, wire], tensors[wire])
+
+        return self._pauli_z_expectations(tensors)
+
+    @staticmethod
+    def _extend_left(environment, tensor, conj_tensor):
+        """Contract a left environment (x, a, b) with a site and its conjugate."""
+        batch, left_bond, _, right_bond = tensor.shape
+        partial = np.matmul(environment.transpose(0, 2, 1), tensor.reshape(batch, left_bond, -1))
+        partial = partial.reshape(batch, left_bond * 2, right_bond)
+        return np.matmul(partial.transpose(0, 2, 1), conj_tensor.reshape(batch, left_bond * 2, right_bond))
+
+    @staticmethod
+    def _extend_right(environment, tensor, conj_tensor):
+        """Contract a right environment (x, c, d) with a site and its conjugate."""
+        batch, left_bond, _, right_bond = tensor.shape
+        partial = np.matmul(tensor.reshape(batch, -1, right_bond), environment)
+        partial = partial.reshape(batch, left_bond, 2 * right_bond)
+        return np.matmul(partial, conj_tensor.reshape(batch, left_bond, 2 * right_bond).transpose(0, 2, 1))
+
+    def _pauli_z_expectations(self, tensors):
+        """<Z> on every site, normalized by the (truncated) state norm."""
+        batch = tensors[0].shape[0]
+        conj_tensors = [tensor.conj() for tensor in tensors]
+
+        # Left environments: contraction of all sites before each site with
+        # their conjugates
+        environment = np.ones((batch, 1, 1), dtype=complex)
+        left_environments = []
+        for tensor, conj_tensor in zip(tensors, conj_tensors):
+            left_environments.append(environment)
+            environment = self._extend_left(environment, tensor, conj_tensor)
+        norm = environment[:, 0, 0].real
+
+        expectations = np.empty((batch, self.n_qubits))
+        environment = np.ones((batch, 1, 1), dtype=complex)
+        for wire in range(self.n_qubits - 1, -1, -1):
+            tensor, conj_tensor = tensors[wire], conj_tensors[wire]
+            signed = tensor * PAULI_Z_SIGNS[None, None, :, None]
+            right = self._extend_right(environment, signed, conj_tensor)
+            expectations[:, wire] = np.sum(left_environments[wire] * right, axis=(1, 2)).real
+            environment = self._extend_right(environment, tensor, conj_tensor)
+
+        return expectations / norm[:, None]
+
+    def expectations(self, features, weights):
+        """
+        PauliZ expectations of the circuit for one or many feature vectors.
+
+        Args:
+            features: Feature vector (n_features,) or matrix (batch, n_features)
+            weights: Circuit weights of shape (n_layers, n_qubits, 3)
+
+        Returns:
+            Array of shape (n_qubits,) or (batch, n_qubits)
+        """
+        features = np.asarray(features, dtype=float)
+        single = features.ndim == 1
+        features = np.atleast_2d(features)
+
+        # Feature i is embedded with RY(pi * x_i) on wire i % n_qubits
+        angles = np.zeros((features.shape[0], self.n_qubits))
+        for i in range(features.shape[1]):
+            angles[:, i % self.n_qubits] += np.pi * features[:, i]
+
+        unitaries = rotation_unitaries(weights)
+        expectations = np.concatenate([
+            self._simulate_chunk(angles[start:start + self.chunk_size], unitaries)
+            for start in range(0, len(angles), self.chunk_size)
+        ]) if len(angles) else np.empty((0, self.n_qubits))
+
+        return expectations[0] if single else expectations
@@ -0,0 +1,280 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from app.quantum.arrays import top_k_indices, append_rows
+
+
+def rating_totals(user_rows, movie_rows, ratings, shape):
+    """
+    Sparse sums and counts of ratings per (user, movie).
+
+    Records with a negative row or column (unknown IDs) or a missing rating
+    are ignored. Totals of new records can be added to existing ones.
+
+    Args:
+        user_rows: Row of each record
+        movie_rows: Column of each record
+        ratings: Rating of each record
+        shape: (n_users, n_movies)
+
+    Returns:
+        Tuple of (sums, counts) CSR matrices of shape `shape`
+    """
+    user_rows, movie_rows = np.asarray(user_rows), np.asarray(movie_rows)
+    ratings = np.asarray(ratings, dtype=float)
+    keep = (user_rows >= 0) & (movie_rows >= 0) & ~np.isnan(ratings)
+    coords = (user_rows[keep], movie_rows[keep])
+    sums = csr_matrix((ratings[keep], coords), shape=shape)
+    counts = csr_matrix((np.ones(keep.sum()), coords), shape=shape)
+    return sums, counts
+
+
+def mean_ratings(sums, counts):
+    """Sparse user-movie matrix of mean ratings, averaging repeated records like pd.pivot_table."""
+    return csr_matrix(sums.multiply(counts.power(-1)))
+
+
+def pad_rows(matrix, n_rows):
+    """A CSR matrix with empty rows appended up to n_rows."""
+    extra = n_rows - matrix.shape[0]
+    indptr = np.concatenate([matrix.indptr, np.full(extra, matrix.indptr[-1], dtype=matrix.indptr.dtype)])
+    return csr_matrix((matrix.data, matrix.indices, indptr), shape=(n_rows, matrix.shape[1]))
+
+
+def append_csr(buffers, name, matrix, tail):
+    """
+    A CSR matrix with the rows of the CSR matrix tail appended.
+
+    The data, indices and indptr arrays are appended to through
+    append_rows(), so adding the rows of new users costs O(their entries)
+    and the matrix is not copied.
+
+    Args:
+        buffers: Dict of name -> RowBuffer owned by the caller, updated in place
+        name: Prefix of the matrix arrays in buffers
+        matrix: CSR matrix to append to, left unchanged
+        tail: CSR matrix of the new rows, with as many columns as matrix
+    """
+    tail = csr_matrix(tail)
+    tail.sum_duplicates()
+    data = append_rows(buffers, f'{name}/data', matrix.data, tail.data)
+    indices = append_rows(buffers, f'{name}/indices', matrix.indices, tail.indices)
+    indptr = append_rows(buffers, f'{name}/indptr', matrix.indptr, tail.indptr[1:] + matrix.indptr[-1])
+    return csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, matrix.shape[1]), copy=False)
+
+
+def normalize_rows(matrix):
+    """Scale every row of a sparse matrix to unit L2 norm, leaving empty rows empty."""
+    matrix = csr_matrix(matrix, dtype=float, copy=True)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    row_of = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    matrix.data /= norms[row_of]
+    return matrix
+
+
+def top_k_neighbours(matrix, k, block_size=1024, rows=None, max_block_entries=2 ** 24):
+    """
+    Top-k most cosine-similar users of each user.
+
+    The normalized sparse interaction matrix is multiplied with its
+    transpose one block of users at a time and only the k best neighbours of
+    each user are kept, so memory is O(users * k) plus one block of
+    similarities instead of O(users^2). Users are never their own
+    neighbours and users without co-rated movies are not neighbours.
+
+    Args:
+        matrix: Sparse (n_users, n_movies) interaction matrix
+        k: Number of neighbours per user
+        block_size: Maximum number of users whose similarities are computed together
+        rows: User rows to compute neighbours for (defaults to all users)
+        max_block_entries: Upper bound on the entries of one dense block of
+            similarities, which shrinks the blocks for large user counts
+
+    Returns:
+        Tuple of (neighbour rows, similarities) arrays of shape (len(rows), k),
+        ordered by descending similarity and padded with -1 and 0
+    """
+    normalized = normalize_rows(matrix)
+    transposed = normalized.T.tocsr()
+    rows = np.arange(matrix.shape[0]) if rows is None else np.asarray(rows)
+    block_size = max(1, min(block_size, max_block_entries // max(matrix.shape[0], 1)))
+
+    neighbours = np.full((len(rows), k), -1, dtype=np.int32)
+    similarities = np.zeros((len(rows), k), dtype=np.float32)
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        block_similarities = (normalized[block] @ transposed).toarray()
+        block_similarities[np.arange(len(block)), block] = 0  # not their own neighbour
+
+        top = top_k_indices(block_similarities, k)
+        top_similarities = np.take_along_axis(block_similarities, top, axis=1)
+        found = top_similarities > 0
+        end = start + len(block)
+        neighbours[start:end, :top.shape[1]] = np.where(found, top, -1)
+        similarities[start:end, :top.shape[1]] = np.where(found, top_similarities, 0)
+    return neighbours, similarities
+
+
+def neighbour_base(matrix):
+    """Transposed row-normalized interaction matrix, the (n_movies, n_users) input of neighbours_of()."""
+    return normalize_rows(matrix).T.tocsr()
+
+
+def neighbours_of(matrix, rows, k, base, stale):
+    """
+    Top-k most cosine-similar users of a few users, without normalizing the whole matrix.
+
+    Similarities with the users whose records did not change since `base`
+    was computed are read from its rows of the movies the users rated,
+    those with the other users are computed from their current rows. The
+    result equals top_k_neighbours(matrix, k, rows=rows) up to the order of
+    equal similarities, at a cost that depends on the viewers of those
+    movies rather than on all records.
+
+    Args:
+        matrix: Current sparse (n_users, n_movies) interaction matrix
+        rows: User rows to compute neighbours for
+        k: Number of neighbours per user
+        base: neighbour_base() of an earlier matrix, whose users are the
+            first rows of matrix
+        stale: Rows of the users whose records changed since base was computed
+
+    Returns:
+        Tuple of (neighbour rows, similarities) arrays of shape (len(rows), k),
+        ordered by descending similarity and padded with -1 and 0
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    fresh = np.union1d(np.union1d(stale, rows), np.arange(base.shape[1], matrix.shape[0])).astype(np.int64)
+    normalized = normalize_rows(matrix[rows])
+    base_similarities = (normalized @ base).tocoo()
+    keep = ~np.isin(base_similarities.col, fresh)
+    fresh_similarities = (normalized @ normalize_rows(matrix[fresh]).T).tocoo()
+
+    block = np.concatenate([base_similarities.row[keep], fresh_similarities.row])
+    users = np.concatenate([base_similarities.col[keep], fresh[fresh_similarities.col]])
+    values = np.concatenate([base_similarities.data[keep], fresh_similarities.data])
+    found = (users != rows[block]) & (values > 0)  # not their own neighbour
+
+    neighbours = np.full((len(rows), k), -1, dtype=np.int32)
+    similarities = np.zeros((len(rows), k), dtype=np.float32)
+    for i in range(len(rows)):
+        pick = np.flatnonzero(found & (block == i))
+        top = pick[top_k_indices(values[pick], k)]
+        neighbours[i, :len(top)] = users[top]
+        similarities[i, :len(top)] = values[top]
+    return neighbours, similarities
+
+
+def update_neighbours(matrix, neighbours, similarities, changed, block_size=1024):
+    """
+    Update neighbour lists after the rows `changed` of the interaction matrix changed.
+
+    Only users who share a rated movie with a changed user can have a
+    different list. Lists of the changed users, and of users who had a
+    changed user as a neighbour, are recomputed. For the other co-raters
+    only the changed users are new candidates, so their stored lists are
+    merged with the new similarities. The result equals a full fit.
+
+    Args:
+        matrix: Updated sparse (n_users, n_movies) interaction matrix
+        neighbours: Neighbour rows of shape (n_users, k), -1 padded
+        similarities: Neighbour similarities of shape (n_users, k)
+        changed: Rows of the users whose records changed
+        block_size: Maximum number of users whose similarities are computed together
+
+    Returns:
+        New (neighbours, similarities) arrays; the inputs are not modified
+    """
+    k = neighbours.shape[1]
+    changed = np.unique(np.asarray(changed, dtype=np.int64))
+    neighbours, similarities = neighbours.copy(), similarities.copy()
+    if not len(changed):
+        return neighbours, similarities
+
+    # Users with a movie in common with a changed user
+    normalized = normalize_rows(matrix)
+    co_raters = np.unique((normalized @ normalized[changed].T).tocoo().row)
+    co_raters = co_raters[~np.isin(co_raters, changed)]
+
+    had_changed = np.isin(neighbours[co_raters], changed).any(axis=1)
+    recompute = np.concatenate([changed, co_raters[had_changed]])
+    neighbours[recompute], similarities[recompute] = top_k_neighbours(
+        matrix, k, block_size=block_size, rows=recompute
+    )
+
+    merge = co_raters[~had_changed]
+    if not len(merge):
+        return neighbours, similarities
+
+    # Candidates: the stored neighbours plus the changed users with their
+    # new similarities
+    stored = neighbours[merge]
+    stored_similarities = np.where(stored >= 0, similarities[merge], -np.inf)
+    new_similarities = (normalized[merge] @ normalized[changed].T).toarray()
+    candidates = np.concatenate([stored, np.broadcast_to(changed, new_similarities.shape)], axis=1)
+    candidate_similarities = np.concatenate(
+        [stored_similarities, np.where(new_similarities > 0, new_similarities, -np.inf)], axis=1
+    )
+
+    top = top_k_indices(candidate_similarities, k)
+    top_similarities = np.take_along_axis(candidate_similarities, top, axis=1)
+    found = np.isfinite(top_similarities)
+    neighbours[merge] = np.where(found, np.take_along_axis(candidates, top, axis=1), -1)
+    similarities[merge] = np.where(found, top_similarities, 0)
+    return neighbours, similarities
+
+
+def csr_row_positions(matrix, rows):
+    """Positions in matrix.indices and matrix.data of the entries of the given CSR rows."""
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = matrix.indptr[rows].astype(np.int64)
+    lengths = matrix.indptr[rows + 1] - starts
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+def neighbour_counts(neighbours, liked_matrix, watched_matrix=None, row=None):
+    """
+    Count how many neighbours rated each movie highly.
+
+    Only the short rows of the neighbours (and of the user, to exclude
+    watched movies) are read, so the cost does not depend on the number of
+    users or viewing records.
+
+    Args:
+        neighbours: Neighbour rows of the user, -1 entries are ignored
+        liked_matrix: CSR (n_users, n_movies) counts of highly rated records
+        watched_matrix: Optional CSR (n_users, n_movies) of watched movies
+        row: Row of the user in watched_matrix
+
+    Returns:
+        Tuple of (catalog rows, counts), ordered by catalog row
+    """
+    neighbours = np.asarray(neighbours)
+    positions = csr_row_positions(liked_matrix, neighbours[neighbours >= 0])
+    movie_rows = liked_matrix.indices[positions]
+    weights = liked_matrix.data[positions]
+    if watched_matrix is not None:
+        unwatched = ~np.isin(movie_rows, watched_matrix.indices[csr_row_positions(watched_matrix, [row])])
+        movie_rows, weights = movie_rows[unwatched], weights[unwatched]
+
+    movie_rows, inverse = np.unique(movie_rows, return_inverse=True)
+    return movie_rows, np.bincount(inverse, weights=weights, minlength=len(movie_rows)).astype(np.int64)
+
+
+def csr_arrays(prefix, matrix):
+    """The arrays of a CSR matrix keyed by prefix, for a snapshot."""
+    return {
+        f'{prefix}/data': matrix.data,
+        f'{prefix}/indices': matrix.indices,
+        f'{prefix}/indptr': matrix.indptr,
+        f'{prefix}/shape': np.array(matrix.shape)
+    }
+
+
+def arrays_csr(arrays, prefix):
+    """Rebuild a CSR matrix from csr_arrays() output without copying its arrays."""
+    return csr_matrix(
+        (arrays[f'{prefix}/data'], arrays[f'{prefix}/indices'], arrays[f'{prefix}/indptr']),
+        shape=tuple(int(n) for n in arrays[f'{prefix}/shape']),
+        copy=False
+    )
@@ -1,11 +1,105 @@
+import os
+import copy
 import pennylane as qml
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy.sparse import csr_matrix
+from app.quantum.embedding_store import EmbeddingStore, file_digest, hash_arrays
+from app.quantum.weights import WeightRegistry
+from app.quantum.statevector import StatevectorSimulator
+from app.quantum.mps import MPSSimulator
+from app.quantum.arrays import lookup_rows, top_k_indices, extend_index, append_rows, assign_rows, append_index
+from app.quantum.executor import ShardedScorer
+from app.quantum.item_index import ItemNeighbourIndex
+from app.quantum.ann import approximate_neighbours
+from app.quantum.candidates import CandidateGenerator
+from app.quantum.watched import WatchedIndex
+from app.quantum.dataset import (
+    Dataset, AppendedTable, table_arrays, VIEWING_DTYPES, VIEWING_DATES, PROFILE_DTYPES, PROFILE_DATES
+)
+from app.quantum.neighbours import (
+    rating_totals, mean_ratings, pad_rows, append_csr, top_k_neighbours, update_neighbours, neighbour_base,
+    neighbours_of, neighbour_counts, csr_arrays, arrays_csr
+)
+
+
+def movie_metadata(movies_df):
+    """Columnar movie details returned with recommendations, aligned with movies_df rows."""
+    return {column: movies_df[column].to_numpy() for column in ['movie_id', 'title', 'genre', 'rating']}
+
+
+def recommendations_frame(metadata, rows, score_column, scores):
+    """Build a recommendations DataFrame for the given movie rows and scores."""
+    recs = {'movie_id': metadata['movie_id'][rows], score_column: scores}
+    for column in ['title', 'genre', 'rating']:
+        recs[column] = metadata[column][rows]
+    return pd.DataFrame(recs)
+
+
+def batch_recommendations_frame(metadata, user_ids, rows, score_column, scores, keep):
+    """
+    Build a long recommendations DataFrame from per-user top-k rows.
+    
+    Args:
+        metadata: Columnar movie details from movie_metadata
+        user_ids: User IDs, one per row of rows and scores
+        rows: Catalog rows of shape (n_users, k)
+        score_column: Name of the score column
+        scores: Scores of shape (n_users, k)
+        keep: Boolean mask of shape (n_users, k) of the entries to return
+    """
+    user_ids = np.broadcast_to(np.asarray(user_ids)[:, None], rows.shape)[keep]
+    recs_df = recommendations_frame(metadata, rows[keep], score_column, scores[keep])
+    recs_df.insert(0, 'user_id', user_ids)
+    return recs_df
+
+
+def empty_batch_frame(score_column):
+    """Empty result of a batch recommendation call."""
+    return pd.DataFrame(columns=['user_id', 'movie_id', score_column, 'title', 'genre', 'rating'])
+
+
+def appended_tables(user_viewing_df, user_profiles_df):
+    """The viewing and profile tables as AppendedTables, which update() appends new records to."""
+    return (
+        AppendedTable(user_viewing_df, VIEWING_DTYPES, VIEWING_DATES),
+        AppendedTable(user_profiles_df, PROFILE_DTYPES, PROFILE_DATES)
+    )
+
+
+def has_appended_records(recommender):
+    """Whether update() added records to a recommender since it was built or compacted."""
+    return (len(recommender._viewing) > len(recommender._viewing.base) or
+            len(recommender._profiles) > len(recommender._profiles.base))
+
+
+def records_since(recommender, earlier):
+    """
+    The records update() added to a recommender since an earlier version of it.
+    
+    Returns:
+        Tuple of (viewing, profile) DataFrames, or None if the recommender
+        was not derived from `earlier` by copy() and update()
+    """
+    viewing = recommender._viewing.appended_since(earlier._viewing)
+    profiles = recommender._profiles.appended_since(earlier._profiles)
+    if viewing is None or profiles is None:
+        return None
+    return viewing, profiles
+
 
 class QuantumRecommender:
-    def __init__(self, user_data_path, movie_data_path, user_profile_path, n_qubits=8):
+    # Attributes stored as they are in a snapshot
+    SNAPSHOT_ARRAYS = [
+        'movie_ids', 'movie_index', 'movie_features', '_scaled_popularity', 'movie_embeddings',
+        'user_ids', 'user_index', '_user_profile_features', '_user_stats', 'user_features'
+    ]
+    
+    def __init__(self, user_data_path, movie_data_path, user_profile_path, n_qubits=8,
+                 embedding_cache_dir=None, weights_dir=None, weights_version=None, seed=0,
+                 backend='pennylane', bond_dim=16, n_workers=1, chunk_size=1024, ann_index=None,
+                 n_candidates=None, dataset=None):
         """
         Initialize the quantum recommender system.
         
@@ -14,44 +108,232 @@ class QuantumRecommender:
             movie_data_path: Path to movie data
             user_profile_path: Path to user profile data
             n_qubits: Number of qubits to use for the quantum circuit
+            embedding_cache_dir: Directory for the precomputed movie embeddings
+                (defaults to a cache directory next to the movie data)
+            weights_dir: Directory of the circuit weight registry
+                (defaults to a weights directory next to the movie data)
+            weights_version: Weights version to load (defaults to the latest)
+            seed: Seed for the initial random weights if the registry is empty
+            backend: Simulator used for embeddings: 'pennylane' (QNode on
+                default.qubit), 'numpy' (native batched statevector kernel) or
+                'mps' (matrix product states, for large qubit counts)
+            bond_dim: Maximum bond dimension of the 'mps' backend
+            n_workers: Number of worker processes used to embed the catalog
+                and to score it with the circuit when not batched
+                (1 embeds in this process)
+            chunk_size: Number of movies per worker task
+            ann_index: Optional approximate nearest-neighbour index from
+                app.quantum.ann, built over the movie embeddings and used to
+                retrieve the top movies instead of scoring the whole catalog
+            n_candidates: If set, only this many movies picked by the cheap
+                candidate generation stage are scored per request
+            dataset: Already loaded Dataset to share with other recommenders
+                (defaults to loading the three data files)
         """
+        if backend not in ('pennylane', 'numpy', 'mps'):
+            raise ValueError(f"Unknown simulator backend: {backend}")
         self.n_qubits = n_qubits
-        self.movies_df = pd.read_csv(movie_data_path)
-        self.user_viewing_df = pd.read_csv(user_data_path)
-        self.user_profiles_df = pd.read_csv(user_profile_path)
+        self.backend = backend
+        self.bond_dim = bond_dim
+        self.n_workers = n_workers
+        self.chunk_size = chunk_size
+        self.user_data_path = user_data_path
+        self.movie_data_path = movie_data_path
+        self.user_profile_path = user_profile_path
+        self.dataset = dataset or Dataset.load(movie_data_path, user_data_path, user_profile_path)
+        self.movies_df = self.dataset.movies_df
+        self._viewing, self._profiles = appended_tables(self.dataset.user_viewing_df, self.dataset.user_profiles_df)
+        
+        # Spare rows that update() appends new users to, and the movies
+        # whose similar movies compacted() recomputes
+        self._buffers = {}
+        self._pending_movies = np.empty(0, dtype=np.int64)
         
         # Preprocess data
         self._preprocess_data()
+        self._setup_circuit()
+        
+        # Fixed, versioned weights so that scores are deterministic and movie
+        # embeddings can be computed once and reused
+        if weights_dir is None:
+            weights_dir = os.path.join(os.path.dirname(movie_data_path), 'weights')
+        self.weight_registry = WeightRegistry(weights_dir)
+        self.weights, self.weights_version, _ = self.weight_registry.load_or_init(
+            self.n_qubits, version=weights_version, seed=seed
+        )
+        self._setup_scorer()
+        
+        # Load or compute the embeddings of the whole catalog
+        if embedding_cache_dir is None:
+            embedding_cache_dir = os.path.join(os.path.dirname(movie_data_path), 'cache')
+        self.embedding_store = EmbeddingStore(
+            os.path.join(embedding_cache_dir, f'movie_embeddings_{self.n_qubits}q.npz')
+        )
+        self._build_movie_embeddings()
+        
+        # Most similar movies of every movie, from the embeddings and co-viewing
+        self.item_index = ItemNeighbourIndex.build(
+            len(self.movie_ids),
+            embeddings=self.movie_embeddings,
+            coviewing=self.watched.matrix
+        )
+        self._setup_retrieval(ann_index, n_candidates)
+    
+    @classmethod
+    def from_snapshot(cls, snapshot, user_data_path, movie_data_path, user_profile_path, n_workers=1,
+                      chunk_size=1024, ann_index=None, n_candidates=None, weights_dir=None):
+        """
+        Restore a recommender from the arrays of a snapshot written by
+        app.quantum.snapshot, without reading the data files or running the
+        circuit on the catalog. Arrays are used as they are, so memory-mapped
+        snapshot arrays stay shared between processes.
         
-        # Set up quantum device
+        Args:
+            snapshot: Dict of arrays from snapshot_arrays(), e.g. from load_arrays()
+            user_data_path: Path to user viewing data
+            movie_data_path: Path to movie data
+            user_profile_path: Path to user profile data
+            n_workers, chunk_size, ann_index, n_candidates, weights_dir: As for __init__
+        """
+        self = cls.__new__(cls)
+        self.n_qubits = int(snapshot['n_qubits'])
+        self.backend = str(snapshot['backend'])
+        self.bond_dim = int(snapshot['bond_dim'])
+        self.n_workers = n_workers
+        self.chunk_size = chunk_size
+        self.user_data_path = user_data_path
+        self.movie_data_path = movie_data_path
+        self.user_profile_path = user_profile_path
+        self.dataset = Dataset.from_arrays(snapshot)
+        self.movies_df = self.dataset.movies_df
+        self._viewing, self._profiles = appended_tables(self.dataset.user_viewing_df, self.dataset.user_profiles_df)
+        
+        # Spare rows that update() appends new users to, and the movies
+        # whose similar movies compacted() recomputes
+        self._buffers = {}
+        self._pending_movies = np.empty(0, dtype=np.int64)
+        
+        # Preprocessed catalog and users
+        self.scaler = MinMaxScaler().fit(np.stack([snapshot['scaler_min'], snapshot['scaler_max']]))
+        self.genres = self.dataset.genres
+        self.movie_genres = self.dataset.movie_genres
+        self.movie_metadata = movie_metadata(self.movies_df)
+        for name in cls.SNAPSHOT_ARRAYS:
+            setattr(self, name, snapshot[name])
+        self.watched = WatchedIndex.from_arrays(snapshot, 'watched', self.movie_index, len(self.movie_ids))
+        self._setup_circuit()
+        
+        # Weights and embeddings the snapshot was built with
+        if weights_dir is None:
+            weights_dir = os.path.join(os.path.dirname(movie_data_path), 'weights')
+        self.weight_registry = WeightRegistry(weights_dir)
+        self.weights = snapshot['weights']
+        self.weights_version = int(snapshot['weights_version'])
+        self._setup_scorer()
+        self.model_key = str(snapshot['model_key'])
+        self.embedding_store = None  # the embeddings come from the snapshot
+        
+        self.item_index = ItemNeighbourIndex(snapshot['item_neighbours'], snapshot['item_similarities'])
+        self._setup_retrieval(ann_index, n_candidates)
+        return self
+    
+    def snapshot_arrays(self):
+        """Everything needed to restore this recommender with from_snapshot(), as arrays."""
+        arrays = table_arrays(self.movies_df, self.user_viewing_df, self.user_profiles_df)
+        arrays.update({name: getattr(self, name) for name in self.SNAPSHOT_ARRAYS})
+        arrays.update(self.watched.to_arrays('watched'))
+        arrays.update(
+            n_qubits=np.array(self.n_qubits),
+            backend=np.array(self.backend),
+            bond_dim=np.array(self.bond_dim),
+            scaler_min=self.scaler.data_min_,
+            scaler_max=self.scaler.data_max_,
+            weights=self.weights,
+            weights_version=np.array(self.weights_version),
+            model_key=np.array(self.model_key),
+            item_neighbours=self.item_index.neighbours,
+            item_similarities=self.item_index.similarities
+        )
+        return arrays
+    
+    def _setup_circuit(self):
+        """Set up the quantum device, circuit and native simulator."""
         self.dev = qml.device("default.qubit", wires=self.n_qubits)
         
         # Define quantum circuit
         self.circuit = qml.QNode(self.quantum_circuit, self.dev)
+        if self.backend == 'numpy':
+            self.simulator = StatevectorSimulator(self.n_qubits)
+        elif self.backend == 'mps':
+            self.simulator = MPSSimulator(self.n_qubits, bond_dim=self.bond_dim)
+    
+    def _setup_scorer(self):
+        """
+        Set up the worker pool used to run the circuit over many movies.
+        
+        The pool lives as long as the recommender and the copies made by
+        copy(), which share its weights and movie features. Its processes
+        start on first use and exit once no version refers to it anymore,
+        or on close().
+        """
+        self.scorer = None
+        if self.n_workers > 1:
+            self.scorer = ShardedScorer(self.movie_features, self.weights, self.backend, self.bond_dim,
+                                        n_workers=self.n_workers, chunk_size=self.chunk_size)
+    
+    def close(self):
+        """Shut down the worker processes, if any."""
+        if self.scorer is not None:
+            self.scorer.close()
+    
+    def _setup_retrieval(self, ann_index, n_candidates):
+        """Set up the optional ANN index and the candidate generation stage."""
+        self.ann_index = ann_index
+        if self.ann_index is not None:
+            self.ann_index.build(self.movie_embeddings)
+        
+        # First retrieval stage, limiting quantum scoring to likely candidates
+        self.n_candidates = n_candidates
+        self.candidate_generator = CandidateGenerator(
+            self.movie_features,
+            self.movie_genres,
+            self._scaled_popularity,
+            self.item_index,
+            n_candidates=n_candidates or 200
+        )
         
     def _preprocess_data(self):
         """Preprocess and normalize data for quantum processing."""
-        # Normalize movie features
+        # Normalize movie features, leaving the shared movies_df untouched
         numeric_cols = ['release_year', 'rating', 'popularity', 'runtime']
         self.scaler = MinMaxScaler()
-        self.movies_df[numeric_cols] = self.scaler.fit_transform(self.movies_df[numeric_cols])
+        scaled = self.scaler.fit_transform(self.movies_df[numeric_cols].to_numpy(dtype=float))
         
-        # One-hot encode genre
-        self.genres = self.movies_df['genre'].unique()
-        for genre in self.genres:
-            self.movies_df[f'genre_{genre}'] = (self.movies_df['genre'] == genre).astype(int)
-            
-        # Add is_original as a feature
-        self.movies_df['is_original'] = self.movies_df['is_original'].astype(int)
+        # One-hot encode genre from the dataset's packed genre bits
+        self.genres = self.dataset.genres
         
-        # Create user-movie interaction matrix
-        self.user_movie_matrix = pd.pivot_table(
-            self.user_viewing_df, 
-            values='rating', 
-            index='user_id', 
-            columns='movie_id',
-            fill_value=0
-        )
+        # Dense circuit inputs for the whole catalog, already padded or
+        # truncated to n_qubits, so feature lookups are row slices
+        self.movie_features = self._fit_to_qubits(np.column_stack([
+            scaled, self.dataset.genre_onehot(), self.movies_df['is_original'].to_numpy()
+        ])).astype(np.float32)
+        self._scaled_popularity = scaled[:, numeric_cols.index('popularity')]
+        
+        # movie_id -> row of movie_features, -1 for unknown IDs
+        self.movie_ids = self.movies_df['movie_id'].to_numpy()
+        self.movie_index = extend_index(np.empty(0, dtype=np.int64), self.movie_ids, np.arange(len(self.movie_ids)))
+        
+        # Details attached to the top recommendations
+        self.movie_metadata = movie_metadata(self.movies_df)
+        
+        # Watched catalog rows per user, kept up to date by update()
+        self.watched = WatchedIndex.build(self.user_viewing_df, self.movie_index, len(self.movie_ids))
+        
+        # Genre of every movie as an index into self.genres
+        self.movie_genres = self.dataset.movie_genres
+        
+        # Feature rows of all users, kept up to date by update()
+        self._build_user_features()
     
     def quantum_circuit(self, features, weights):
         """
@@ -64,8 +346,10 @@ class QuantumRecommender:
         Returns:
             Expectation values of the qubits
         """
-        # Embed the classical features into quantum states
-        for i, feat in enumerate(features):
+        # Embed the classical features into quantum states. Iterating over the
+        # transpose yields one column per wire, so a (batch, n_features) matrix
+        # is embedded with parameter broadcasting in a single execution.
+        for i, feat in enumerate(np.asarray(features).T):
             qml.RY(np.pi * feat, wires=i % self.n_qubits)
             
         # Apply parameterized quantum circuit
@@ -84,86 +368,285 @@ class QuantumRecommender:
         # Measure all qubits
         return [qml.expval(qml.PauliZ(i)) for i in range(self.n_qubits)]
     
+    def _movie_rows(self, movie_ids):
+        """Map movie IDs to rows of movie_features."""
+        rows = lookup_rows(self.movie_index, movie_ids)
+        if (rows < 0).any():
+            raise ValueError(f"Movie ID {np.asarray(movie_ids)[rows < 0].ravel()[0]} not found")
+        return rows
+    
     def get_movie_features(self, movie_id):
-        """Get normalized features for a movie."""
-        movie = self.movies_df[self.movies_df['movie_id'] == movie_id]
-        if movie.empty:
-            raise ValueError(f"Movie ID {movie_id} not found")
-            
-        # Extract relevant features
-        features = []
+        """Get normalized features for a movie, padded or truncated to n_qubits."""
+        return self.movie_features[self._movie_rows(movie_id)]
+    
+    def get_movie_features_batch(self, movie_ids):
+        """Get the feature matrix of several movies, one row per movie ID."""
+        return self.movie_features[self._movie_rows(movie_ids)]
+    
+    def _profile_features(self, profiles):
+        """Profile part of the user features: age, subscription and preferred genre."""
+        # Get user age normalized
+        age_norm = (profiles['age'].to_numpy(dtype=float) - 18) / 82  # Assuming age range 18-100
         
-        # Add normalized numeric features
-        features.extend(movie[['release_year', 'rating', 'popularity', 'runtime']].values[0])
+        # Get subscription type (0 for standard, 1 for premium)
+        subscription = (profiles['subscription_type'] == 'premium').to_numpy(dtype=float)
         
-        # Add genre one-hot encoding
-        for genre in self.genres:
-            features.append(movie[f'genre_{genre}'].values[0])
-            
-        # Add is_original feature
-        features.append(movie['is_original'].values[0])
+        # Get preferred genre encoding
+        preferred_genre = np.asarray(profiles['preferred_genre'], dtype=object)
+        genre_encoding = preferred_genre[:, None] == np.asarray(self.genres, dtype=object)[None, :]
         
-        return np.array(features)
+        return np.column_stack([age_norm, subscription, genre_encoding.astype(float)])
     
-    def get_user_features(self, user_id):
-        """Get user features based on viewing history and profile."""
-        user_profile = self.user_profiles_df[self.user_profiles_df['user_id'] == user_id]
-        if user_profile.empty:
-            raise ValueError(f"User ID {user_id} not found")
+    def _viewing_stats(self, viewing):
+        """
+        Rating and completion sums and counts of viewing records per user row.
+        
+        Returns:
+            Tuple of the rows of the users the records belong to and their
+            (len(rows), 4) rating sum, rating count, completed sum and
+            completed count
+        """
+        rows = lookup_rows(self.user_index, viewing['user_id'].to_numpy())
+        known = rows >= 0
+        rows, inverse = np.unique(rows[known], return_inverse=True)
+        stats = np.zeros((len(rows), 4))
+        for col, column in enumerate(['rating', 'completed']):
+            values = viewing[column].to_numpy(dtype=float)[known]
+            present = ~np.isnan(values)
+            np.add.at(stats[:, 2 * col], inverse[present], values[present])
+            np.add.at(stats[:, 2 * col + 1], inverse[present], 1)
+        return rows, stats
+    
+    def _compose_user_features(self, rows):
+        """Assemble the circuit inputs of the given user rows."""
+        stats = self._user_stats[rows]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_rating = np.where(stats[:, 1] > 0, stats[:, 0] / stats[:, 1], 0) / 5  # Normalize to [0,1]
+            completion_rate = np.where(stats[:, 3] > 0, stats[:, 2] / stats[:, 3], 0)
+        profile = self._user_profile_features[rows]
+        
+        features = np.column_stack([profile[:, 0], avg_rating, completion_rate, profile[:, 1], profile[:, 2:]])
+        return self._fit_to_qubits(features).astype(np.float32)
+    
+    def _build_user_features(self):
+        """Compute the feature rows of all users in one pass over the data."""
+        profiles = self.user_profiles_df.drop_duplicates('user_id', keep='last')
+        self.user_ids = profiles['user_id'].to_numpy()
+        self.user_index = extend_index(np.empty(0, dtype=np.int64), self.user_ids, np.arange(len(self.user_ids)))
+        self._user_profile_features = self._profile_features(profiles)
+        
+        # Per user: rating sum, rating count, completed sum, completed count
+        self._user_stats = np.zeros((len(self.user_ids), 4))
+        rows, stats = self._viewing_stats(self.user_viewing_df)
+        self._user_stats[rows] = stats
+        
+        self.user_features = self._compose_user_features(np.arange(len(self.user_ids)))
+    
+    def copy(self):
+        """
+        A shallow copy sharing all arrays with this recommender.
+        
+        update() replaces arrays rather than modifying them, so updating the
+        copy leaves this recommender unchanged for requests still using it.
+        """
+        recommender = copy.copy(self)
+        recommender.watched = copy.copy(self.watched)
+        return recommender
+    
+    @property
+    def user_viewing_df(self):
+        """All viewing records, including those added by update()."""
+        return self._viewing.frame()
+    
+    @property
+    def user_profiles_df(self):
+        """All user profiles, including those added by update()."""
+        return self._profiles.frame()
+    
+    def has_profile(self, user_id):
+        """Whether a user has a profile."""
+        return lookup_rows(self.user_index, user_id) >= 0
+    
+    def update(self, new_viewing_rows=None, new_profile_rows=None):
+        """
+        Add new profile and viewing records.
+        
+        Only the feature rows of the users the records belong to are
+        recomputed. Rows of new users are appended in spare capacity and
+        the tables keep the records as appended chunks, so adding new users
+        costs O(new records); changing the rows of existing users copies the
+        per-user arrays. The similar movies of the movies they watched are
+        left to compacted(). Arrays are replaced rather than modified in
+        place.
+        
+        Args:
+            new_viewing_rows: DataFrame of new user_viewing records
+            new_profile_rows: DataFrame of new or changed user profiles
+        """
+        self._buffers = dict(self._buffers)
+        n_users = len(self.user_ids)
+        affected = []
+        
+        if new_profile_rows is not None and len(new_profile_rows):
+            self._profiles = self._profiles.append(new_profile_rows)
+            profiles = new_profile_rows.drop_duplicates('user_id', keep='last')
+            ids = profiles['user_id'].to_numpy()
+            rows = lookup_rows(self.user_index, ids)
+            new = rows < 0
             
-        # Get user age normalized
-        age_norm = (user_profile['age'].values[0] - 18) / 82  # Assuming age range 18-100
+            # Append rows for new users and overwrite the profile part of existing ones
+            rows[new] = n_users + np.arange(new.sum())
+            n_users += new.sum()
+            self.user_index = append_index(self._buffers, 'user_index', self.user_index, ids[new], rows[new])
+            self.user_ids = append_rows(self._buffers, 'user_ids', self.user_ids, ids[new])
+            self._user_profile_features = assign_rows(
+                self._buffers, '_user_profile_features', self._user_profile_features, rows,
+                self._profile_features(profiles), n_users
+            )
+            affected.append(rows)
         
-        # Get preferred genre encoding
-        preferred_genre = user_profile['preferred_genre'].values[0]
-        genre_encoding = [1 if genre == preferred_genre else 0 for genre in self.genres]
+        # Statistics of the users with new viewing records, zero for other new users
+        rows, stats = np.empty(0, dtype=np.int64), np.zeros((0, 4))
+        if new_viewing_rows is not None and len(new_viewing_rows):
+            self._viewing = self._viewing.append(new_viewing_rows)
+            changed_movies = self.watched.append(new_viewing_rows)
+            self._pending_movies = np.union1d(self._pending_movies, changed_movies)
+            rows, stats = self._viewing_stats(new_viewing_rows)
+            existing = rows < len(self._user_stats)
+            stats[existing] += self._user_stats[rows[existing]]
+            affected.append(rows)
+        self._user_stats = assign_rows(self._buffers, '_user_stats', self._user_stats, rows, stats, n_users)
         
-        # Get subscription type (0 for standard, 1 for premium)
-        subscription = 1 if user_profile['subscription_type'].values[0] == 'premium' else 0
+        if affected:
+            rows = np.unique(np.concatenate(affected))
+            self.user_features = assign_rows(
+                self._buffers, 'user_features', self.user_features, rows, self._compose_user_features(rows), n_users
+            )
+    
+    def compacted(self):
+        """
+        A copy with the work update() defers done, in O(all records).
         
-        # Get user's average rating
-        user_ratings = self.user_viewing_df[self.user_viewing_df['user_id'] == user_id]
-        avg_rating = user_ratings['rating'].mean() / 5  # Normalize to [0,1]
+        The tables are concatenated and the similar movies of the movies
+        that gained viewers are recomputed, also for the candidate stage.
+        This recommender is left unchanged.
+        """
+        recommender = self.copy()
+        recommender._viewing, recommender._profiles = appended_tables(self.user_viewing_df, self.user_profiles_df)
+        recommender.item_index = self.item_index.updated(
+            self._pending_movies,
+            embeddings=self.movie_embeddings,
+            coviewing=self.watched.matrix
+        )
+        recommender.candidate_generator = copy.copy(self.candidate_generator)
+        recommender.candidate_generator.item_index = recommender.item_index
+        recommender._pending_movies = np.empty(0, dtype=np.int64)
+        return recommender
+    
+    def get_user_features(self, user_id):
+        """Get user features based on viewing history and profile, padded or truncated to n_qubits."""
+        row = lookup_rows(self.user_index, user_id)
+        if row < 0:
+            raise ValueError(f"User ID {user_id} not found")
+        return self.user_features[row]
+    
+    def _build_movie_embeddings(self):
+        """Load movie embeddings from the store, computing only stale ones."""
+        # The embeddings depend on the movie data, the scaler state and the
+        # circuit, i.e. the weights plus the (possibly truncating) simulator
+        weights_key = hash_arrays(self.weights, self.backend, str(self.bond_dim))
+        key = hash_arrays(
+            file_digest(self.movie_data_path),
+            self.scaler.data_min_,
+            self.scaler.data_max_,
+            weights_key
+        )
+        # Identifies the scoring model, e.g. for caches of recommendations
+        self.model_key = f'quantum-{weights_key[:16]}'
         
-        # Get watch completion rate
-        completion_rate = user_ratings['completed'].mean()
+        self.movie_embeddings = self.embedding_store.sync(
+            key, weights_key, self.movie_ids, self.movie_features, self._embed_movie_rows
+        )
+    
+    def _embed_movie_rows(self, rows):
+        """Embed the movies at the given catalog rows, sharded across processes if configured."""
+        if self.scorer is not None and len(rows) > self.chunk_size:
+            return self.scorer.embed(rows)
+        return self.embed(self.movie_features[rows], self.weights)
+    
+    def _fit_to_qubits(self, features):
+        """Pad or truncate features (last axis) to match n_qubits."""
+        features = np.asarray(features, dtype=float)
+        n_features = features.shape[-1]
+        if n_features > self.n_qubits:
+            features = features[..., :self.n_qubits]
+        elif n_features < self.n_qubits:
+            pad_width = [(0, 0)] * (features.ndim - 1) + [(0, self.n_qubits - n_features)]
+            features = np.pad(features, pad_width)
+        return features
+    
+    def embed(self, features, weights):
+        """
+        Embed one or many feature vectors with the quantum circuit.
         
-        # Combine all features
-        features = [age_norm, avg_rating, completion_rate, subscription]
-        features.extend(genre_encoding)
+        Args:
+            features: Feature vector of shape (n_qubits,) or matrix of shape (batch, n_qubits)
+            weights: Weights for the circuit
+            
+        Returns:
+            Array of PauliZ expectations with shape (n_qubits,) or (batch, n_qubits)
+        """
+        if self.backend in ('numpy', 'mps'):
+            return self.simulator.expectations(features, weights)
         
-        return np.array(features)
+        # With a feature matrix the QNode broadcasts over the batch and returns
+        # one (batch,) array per wire
+        return np.stack(self.circuit(features, weights), axis=-1)
     
     def compute_quantum_similarity(self, user_id, movie_id):
         """Compute quantum similarity between a user and a movie."""
-        # Get features
-        user_features = self.get_user_features(user_id)
-        movie_features = self.get_movie_features(movie_id)
-        
-        # Pad or truncate features to match n_qubits
-        if len(user_features) > self.n_qubits:
-            user_features = user_features[:self.n_qubits]
-        elif len(user_features) < self.n_qubits:
-            user_features = np.pad(user_features, (0, self.n_qubits - len(user_features)))
-            
-        if len(movie_features) > self.n_qubits:
-            movie_features = movie_features[:self.n_qubits]
-        elif len(movie_features) < self.n_qubits:
-            movie_features = np.pad(movie_features, (0, self.n_qubits - len(movie_features)))
-        
-        # Initialize random weights for the quantum circuit
-        weights = np.random.uniform(0, 2*np.pi, size=(2, self.n_qubits, 3))
+        # Get features, padded or truncated to match n_qubits
+        user_features = self._fit_to_qubits(self.get_user_features(user_id))
+        movie_features = self._fit_to_qubits(self.get_movie_features(movie_id))
         
         # Get quantum embeddings
-        user_embedding = self.circuit(user_features, weights)
-        movie_embedding = self.circuit(movie_features, weights)
+        user_embedding = self.embed(user_features, self.weights)
+        movie_embedding = self.embed(movie_features, self.weights)
         
         # Compute similarity
         similarity = np.dot(user_embedding, movie_embedding) / (np.linalg.norm(user_embedding) * np.linalg.norm(movie_embedding))
         
         return (similarity + 1) / 2  # Normalize to [0,1]
     
-    def generate_recommendations(self, user_id, top_n=10, exclude_watched=True):
+    def compute_quantum_similarities(self, user_id, movie_ids):
+        """
+        Compute quantum similarity between a user and many movies at once.
+        
+        Movie embeddings come from the precomputed catalog embeddings, so only
+        the user is run through the circuit and all movies are scored with one
+        matrix-vector product.
+        
+        Args:
+            user_id: User ID to score movies for
+            movie_ids: Movie IDs to score
+            
+        Returns:
+            Array of similarities in [0, 1], aligned with movie_ids
+        """
+        return self._score_rows(user_id, self._movie_rows(movie_ids))
+    
+    def _score_rows(self, user_id, rows):
+        """Similarity in [0, 1] between a user and the movies at the given rows."""
+        user_embedding = self.embed(self.get_user_features(user_id), self.weights)
+        movie_embeddings = self.movie_embeddings[rows]
+        
+        # Cosine similarity of every movie embedding with the user embedding
+        norms = np.linalg.norm(movie_embeddings, axis=1) * np.linalg.norm(user_embedding)
+        similarities = movie_embeddings @ user_embedding / norms
+        
+        return (similarities + 1) / 2  # Normalize to [0,1]
+    
+    def generate_recommendations(self, user_id, top_n=10, exclude_watched=True, batched=True):
         """
         Generate movie recommendations for a user.
         
@@ -171,85 +654,480 @@ class QuantumRecommender:
             user_id: User ID to generate recommendations for
             top_n: Number of recommendations to generate
             exclude_watched: Whether to exclude already watched movies
+            batched: Whether to score all candidates against the precomputed
+                movie embeddings instead of running the circuit per movie
+                (across the worker pool if n_workers > 1)
             
         Returns:
             DataFrame with recommended movies and similarity scores
         """
-        # Get list of movies user has already watched
-        watched_movies = self.user_viewing_df[self.user_viewing_df['user_id'] == user_id]['movie_id'].unique()
+        if batched and self.ann_index is not None:
+            return self._ann_recommendations(user_id, self.watched.rows(user_id) if exclude_watched else [], top_n)
         
-        # Find candidate movies
-        if exclude_watched:
-            candidate_movies = self.movies_df[~self.movies_df['movie_id'].isin(watched_movies)]['movie_id'].unique()
+        # Find candidate movies as rows of the catalog
+        if self.n_candidates:
+            candidate_rows = self.generate_candidates(user_id, exclude_watched)
+        elif exclude_watched:
+            candidate_rows = self.watched.unwatched_rows(user_id)
         else:
-            candidate_movies = self.movies_df['movie_id'].unique()
+            candidate_rows = np.arange(len(self.movie_ids))
             
-        # Compute quantum similarity for each candidate movie
-        similarities = []
-        for movie_id in candidate_movies:
-            similarity = self.compute_quantum_similarity(user_id, movie_id)
-            similarities.append({'movie_id': movie_id, 'similarity': similarity})
+        # Compute quantum similarity for the candidate movies
+        if batched:
+            similarities = self._score_rows(user_id, candidate_rows)
+        elif self.scorer is not None:
+            # Run the circuit for the candidates in the worker pool, merging per-chunk top-n
+            user_embedding = self.embed(self.get_user_features(user_id), self.weights)
+            rows, similarities = self.scorer.top_k(user_embedding, candidate_rows, top_n)
+            return recommendations_frame(self.movie_metadata, rows, 'similarity', similarities)
+        else:
+            similarities = np.array([
+                self.compute_quantum_similarity(user_id, movie_id)
+                for movie_id in self.movie_ids[candidate_rows]
+            ])
+        
+        # Select the top n without sorting all candidates, then attach the
+        # movie details for those rows only
+        top = top_k_indices(similarities, top_n)
+        return recommendations_frame(self.movie_metadata, candidate_rows[top], 'similarity', similarities[top])
+    
+    def generate_candidates(self, user_id, exclude_watched=True, n_candidates=None):
+        """Catalog rows of the movies worth scoring for a user, from the candidate generation stage."""
+        # Circuit inputs and preferred genre (the one-hot part of the profile features)
+        row = lookup_rows(self.user_index, user_id)
+        if row < 0:
+            raise ValueError(f"User ID {user_id} not found")
+        genre_encoding = self._user_profile_features[row, 2:]
+        preferred_genre = int(np.argmax(genre_encoding)) if genre_encoding.any() else -1
+        
+        return self.candidate_generator.generate(
+            self.watched.rows(user_id), self.user_features[row], preferred_genre, exclude_watched, n_candidates
+        )
+    
+    def measure_candidate_recall(self, user_ids, top_n=10, n_candidates=None):
+        """
+        Share of the full-catalog top-n recommendations that the candidate
+        stage keeps, recorded in candidate_generator.metrics.
+        
+        Returns:
+            Mean recall over the users with recommendations
+        """
+        recalls = []
+        for user_id in user_ids:
+            unwatched_rows = self.watched.unwatched_rows(user_id)
+            exact_rows = unwatched_rows[top_k_indices(self._score_rows(user_id, unwatched_rows), top_n)]
+            candidate_rows = self.generate_candidates(user_id, n_candidates=n_candidates)
+            recall = self.candidate_generator.record_recall(candidate_rows, exact_rows)
+            if recall is not None:
+                recalls.append(recall)
+        return float(np.mean(recalls)) if recalls else None
+    
+    def _ann_recommendations(self, user_id, watched_rows, top_n):
+        """Top movies from the ANN index, searching past the watched ones."""
+        user_embedding = self.embed(self.get_user_features(user_id), self.weights)
+        rows, cosines = self.ann_index.search(user_embedding[None, :], top_n + len(watched_rows))
+        keep = (rows[0] >= 0) & ~np.isin(rows[0], watched_rows)
+        rows, cosines = rows[0][keep][:top_n], cosines[0][keep][:top_n]
+        return recommendations_frame(self.movie_metadata, rows, 'similarity', (cosines + 1) / 2)
+    
+    def similar_movies(self, movie_id, top_n=10):
+        """Movies most similar to a movie, read from the precomputed item index."""
+        rows, similarities = self.item_index.similar(self._movie_rows(movie_id), top_n)
+        return recommendations_frame(self.movie_metadata, rows, 'similarity', similarities)
+    
+    def generate_item_recommendations(self, user_id, top_n=10, exclude_watched=True):
+        """Item-based recommendations: the movies most similar to the ones a user watched."""
+        watched_rows = self.watched.rows(user_id)
+        rows, scores = self.item_index.recommend(watched_rows, watched_rows if exclude_watched else None, top_n)
+        return recommendations_frame(self.movie_metadata, rows, 'similarity', scores)
+    
+    def generate_recommendations_batch(self, user_ids, top_n=10, exclude_watched=True, block_size=1024,
+                                       max_block_entries=2 ** 24):
+        """
+        Generate recommendations for many users at once.
+        
+        Each block of users is embedded in one circuit execution and scored
+        against the whole catalog with one float32 matrix product. Unknown
+        user IDs are skipped.
+        
+        Args:
+            user_ids: User IDs to generate recommendations for
+            top_n: Number of recommendations per user
+            exclude_watched: Whether to exclude already watched movies
+            block_size: Maximum number of users scored together
+            max_block_entries: Upper bound on the entries of one block of
+                scores, which shrinks the blocks for large catalogs
             
-        # Create recommendations dataframe and sort by similarity
-        recs_df = pd.DataFrame(similarities)
-        recs_df = recs_df.sort_values('similarity', ascending=False).head(top_n)
+        Returns:
+            DataFrame with user_id, movie_id, similarity, title, genre and
+            rating, ordered by user and descending similarity
+        """
+        user_ids = np.asarray(user_ids)
+        user_ids = user_ids[lookup_rows(self.user_index, user_ids) >= 0]
+        movie_embeddings = self.movie_embeddings / np.linalg.norm(self.movie_embeddings, axis=1, keepdims=True)
+        movie_embeddings = movie_embeddings.astype(np.float32)
+        block_size = max(1, min(block_size, max_block_entries // max(len(movie_embeddings), 1)))
         
-        # Join with movie data to get movie details
-        recs_df = recs_df.merge(self.movies_df[['movie_id', 'title', 'genre', 'rating']], on='movie_id')
+        frames = []
+        for start in range(0, len(user_ids), block_size):
+            block = user_ids[start:start + block_size]
+            user_embeddings = self.embed(self.user_features[lookup_rows(self.user_index, block)], self.weights)
+            user_embeddings = user_embeddings / np.linalg.norm(user_embeddings, axis=1, keepdims=True)
+            
+            # Cosine similarity of every user in the block with every movie
+            similarities = user_embeddings.astype(np.float32) @ movie_embeddings.T
+            similarities += 1
+            similarities /= 2  # Normalize to [0,1]
+            if exclude_watched:
+                self.watched.exclude(similarities, block, -np.inf)
+            
+            top = top_k_indices(similarities, top_n)
+            top_similarities = np.take_along_axis(similarities, top, axis=1)
+            frames.append(batch_recommendations_frame(
+                self.movie_metadata, block, top, 'similarity', top_similarities, np.isfinite(top_similarities)
+            ))
         
-        return recs_df
+        return pd.concat(frames, ignore_index=True) if frames else empty_batch_frame('similarity')
 
 
 # Alternative implementations for situations where quantum computing may not be available
 class ClassicalRecommender:
-    def __init__(self, user_data_path, movie_data_path, user_profile_path):
-        """Initialize with classical collaborative filtering."""
-        self.movies_df = pd.read_csv(movie_data_path)
-        self.user_viewing_df = pd.read_csv(user_data_path)
-        self.user_profiles_df = pd.read_csv(user_profile_path)
+    # Attributes stored as they are in a snapshot
+    SNAPSHOT_ARRAYS = ['movie_index', 'user_ids', 'user_index', 'neighbours', 'neighbour_similarities']
+    SNAPSHOT_MATRICES = ['_rating_sums', '_rating_counts', 'user_movie_matrix', 'liked_matrix']
+    
+    def __init__(self, user_data_path, movie_data_path, user_profile_path, n_neighbours=5, block_size=1024,
+                 ann_index=None, dataset=None):
+        """
+        Initialize with classical collaborative filtering.
+        
+        Args:
+            user_data_path: Path to user viewing data
+            movie_data_path: Path to movie data
+            user_profile_path: Path to user profile data
+            n_neighbours: Number of most similar users kept per user
+            block_size: Number of users whose similarities are computed together
+            ann_index: Optional approximate nearest-neighbour index from
+                app.quantum.ann used to find the neighbours instead of exact
+                similarities with every user
+            dataset: Already loaded Dataset to share with other recommenders
+                (defaults to loading the three data files)
+        """
+        self.user_data_path = user_data_path
+        self.movie_data_path = movie_data_path
+        self.user_profile_path = user_profile_path
+        self.model_key = 'classical'
+        self.n_neighbours = n_neighbours
+        self.block_size = block_size
+        self.dataset = dataset or Dataset.load(movie_data_path, user_data_path, user_profile_path)
+        self.movies_df = self.dataset.movies_df
+        self._viewing, self._profiles = appended_tables(self.dataset.user_viewing_df, self.dataset.user_profiles_df)
+        
+        # Spare rows that update() appends new users to, the movies whose
+        # similar movies and the users whose neighbours compacted()
+        # recomputes, and the matrix neighbours of new users are found in
+        self._buffers = {}
+        self._pending_movies = np.empty(0, dtype=np.int64)
+        self._pending_users = np.empty(0, dtype=np.int64)
+        self._neighbour_base = None
+        
+        # movie_id -> row of movies_df, and the details attached to recommendations
+        movie_ids = self.movies_df['movie_id'].to_numpy()
+        self.movie_index = extend_index(np.empty(0, dtype=np.int64), movie_ids, np.arange(len(movie_ids)))
+        self.movie_metadata = movie_metadata(self.movies_df)
+        
+        # user_id -> row of the interaction matrix, for users with rated viewing records
+        rated = self.user_viewing_df.dropna(subset=['rating'])
+        self.user_ids = np.unique(rated['user_id'].to_numpy())
+        self.user_index = extend_index(np.empty(0, dtype=np.int64), self.user_ids, np.arange(len(self.user_ids)))
         
-        # Create user-movie interaction matrix
-        self.user_movie_matrix = pd.pivot_table(
-            self.user_viewing_df, 
-            values='rating', 
-            index='user_id', 
-            columns='movie_id',
-            fill_value=0
+        # Sparse user-movie interaction matrix of mean ratings over catalog
+        # rows, kept as rating sums and counts so that records can be added
+        self._rating_sums, self._rating_counts = self._rating_totals(rated)
+        self.user_movie_matrix = mean_ratings(self._rating_sums, self._rating_counts)
+        
+        # Most similar users of every user as (n_users, n_neighbours) rows
+        # and similarities, padded with -1 where a user has fewer neighbours
+        if ann_index is None:
+            self.neighbours, self.neighbour_similarities = top_k_neighbours(
+                self.user_movie_matrix, n_neighbours, block_size=block_size
+            )
+        else:
+            self.neighbours, self.neighbour_similarities = approximate_neighbours(
+                ann_index, self.user_movie_matrix, n_neighbours, block_size=block_size
+            )
+        
+        # Highly rated (>= 4) catalog rows per user row. Its CSR indptr/indices
+        # arrays are the per-user item lists read when serving, and it also
+        # counts neighbour picks for many users at once.
+        liked = self.user_viewing_df['rating'].to_numpy() >= 4
+        self.liked_matrix = self._user_movie_counts(self.user_viewing_df[liked])
+        
+        # Watched catalog rows per user, kept up to date by update()
+        self.watched = WatchedIndex.build(self.user_viewing_df, self.movie_index, len(movie_ids))
+        
+        # Most similar movies of every movie, from co-viewing alone
+        self.item_index = ItemNeighbourIndex.build(len(movie_ids), coviewing=self.watched.matrix)
+    
+    @classmethod
+    def from_snapshot(cls, snapshot, user_data_path, movie_data_path, user_profile_path):
+        """
+        Restore a recommender from the arrays of a snapshot written by
+        app.quantum.snapshot, without reading the data files or fitting the
+        neighbour index. Arrays are used as they are, so memory-mapped
+        snapshot arrays stay shared between processes.
+        """
+        self = cls.__new__(cls)
+        self.user_data_path = user_data_path
+        self.movie_data_path = movie_data_path
+        self.user_profile_path = user_profile_path
+        self.model_key = 'classical'
+        self.n_neighbours = int(snapshot['n_neighbours'])
+        self.block_size = int(snapshot['block_size'])
+        self.dataset = Dataset.from_arrays(snapshot)
+        self.movies_df = self.dataset.movies_df
+        self._viewing, self._profiles = appended_tables(self.dataset.user_viewing_df, self.dataset.user_profiles_df)
+        
+        # Spare rows that update() appends new users to, the movies whose
+        # similar movies and the users whose neighbours compacted()
+        # recomputes, and the matrix neighbours of new users are found in
+        self._buffers = {}
+        self._pending_movies = np.empty(0, dtype=np.int64)
+        self._pending_users = np.empty(0, dtype=np.int64)
+        self._neighbour_base = None
+        self.movie_metadata = movie_metadata(self.movies_df)
+        
+        for name in cls.SNAPSHOT_ARRAYS:
+            setattr(self, name, snapshot[name])
+        for name in cls.SNAPSHOT_MATRICES:
+            setattr(self, name, arrays_csr(snapshot, name))
+        n_movies = len(self.movie_metadata['movie_id'])
+        self.watched = WatchedIndex.from_arrays(snapshot, 'watched', self.movie_index, n_movies)
+        self.item_index = ItemNeighbourIndex(snapshot['item_neighbours'], snapshot['item_similarities'])
+        return self
+    
+    def snapshot_arrays(self):
+        """Everything needed to restore this recommender with from_snapshot(), as arrays."""
+        arrays = table_arrays(self.movies_df, self.user_viewing_df, self.user_profiles_df)
+        arrays.update({name: getattr(self, name) for name in self.SNAPSHOT_ARRAYS})
+        for name in self.SNAPSHOT_MATRICES:
+            arrays.update(csr_arrays(name, getattr(self, name)))
+        arrays.update(self.watched.to_arrays('watched'))
+        arrays.update(
+            n_neighbours=np.array(self.n_neighbours),
+            block_size=np.array(self.block_size),
+            item_neighbours=self.item_index.neighbours,
+            item_similarities=self.item_index.similarities
+        )
+        return arrays
+    
+    def _rating_totals(self, rated, first_row=0):
+        """Sparse rating sums and counts per catalog row of the user rows from first_row on."""
+        return rating_totals(
+            lookup_rows(self.user_index, rated['user_id'].to_numpy()) - first_row,
+            lookup_rows(self.movie_index, rated['movie_id'].to_numpy()),
+            rated['rating'].to_numpy(),
+            shape=(len(self.user_ids) - first_row, len(self.movie_metadata['movie_id']))
+        )
+    
+    def _user_movie_counts(self, viewing, first_row=0):
+        """CSR matrix of viewing record counts per catalog row of the user rows from first_row on."""
+        user_rows = lookup_rows(self.user_index, viewing['user_id'].to_numpy()) - first_row
+        movie_rows = lookup_rows(self.movie_index, viewing['movie_id'].to_numpy())
+        known = (user_rows >= 0) & (movie_rows >= 0)
+        return csr_matrix(
+            (np.ones(known.sum()), (user_rows[known], movie_rows[known])),
+            shape=(len(self.user_ids) - first_row, len(self.movie_metadata['movie_id']))
+        )
+    
+    @property
+    def user_viewing_df(self):
+        """All viewing records, including those added by update()."""
+        return self._viewing.frame()
+    
+    @property
+    def user_profiles_df(self):
+        """All user profiles, including those added by update()."""
+        return self._profiles.frame()
+    
+    def has_profile(self, user_id):
+        """Whether a user has a profile, without concatenating the profiles table."""
+        return self._profiles.contains('user_id', user_id)
+    
+    def copy(self):
+        """
+        A shallow copy sharing all arrays with this recommender.
+        
+        update() replaces arrays rather than modifying them, so updating the
+        copy leaves this recommender unchanged for requests still using it.
+        """
+        recommender = copy.copy(self)
+        recommender.watched = copy.copy(self.watched)
+        return recommender
+    
+    def update(self, new_viewing_rows=None, new_profile_rows=None):
+        """
+        Add new profile and viewing records.
+        
+        Records of new users are added in O(new records): the tables keep
+        them as appended chunks, the sparse matrices get their rows in
+        spare capacity and their neighbour lists are computed from the
+        columns of the movies they rated. Records of users who already have
+        rated records rebuild the matrices.
+        
+        The neighbour lists of the other users and the similar movies of
+        the movies with new viewers are left to compacted(), so they stay
+        those of the last compaction until then. Arrays are replaced rather
+        than modified in place.
+        
+        Args:
+            new_viewing_rows: DataFrame of new user_viewing records
+            new_profile_rows: DataFrame of new or changed user profiles
+        """
+        if new_profile_rows is not None and len(new_profile_rows):
+            self._profiles = self._profiles.append(new_profile_rows)
+        if new_viewing_rows is None or not len(new_viewing_rows):
+            return
+        self._viewing = self._viewing.append(new_viewing_rows)
+        self._buffers = dict(self._buffers)
+        if self._neighbour_base is None:
+            self._neighbour_base = neighbour_base(self.user_movie_matrix)
+        
+        # Rows for users with their first rated records
+        rated = new_viewing_rows.dropna(subset=['rating'])
+        rated_ids = np.unique(rated['user_id'].to_numpy())
+        new_ids = rated_ids[lookup_rows(self.user_index, rated_ids) < 0]
+        n_old = len(self.user_ids)
+        n_users = n_old + len(new_ids)
+        self.user_index = append_index(self._buffers, 'user_index', self.user_index, new_ids, np.arange(n_old, n_users))
+        self.user_ids = append_rows(self._buffers, 'user_ids', self.user_ids, new_ids)
+        changed = lookup_rows(self.user_index, rated_ids)
+        
+        liked = new_viewing_rows[new_viewing_rows['rating'].to_numpy() >= 4]
+        if (changed >= n_old).all():
+            # Only new users, whose rows are appended
+            sums, counts = self._rating_totals(rated, first_row=n_old)
+            self._rating_sums = append_csr(self._buffers, '_rating_sums', self._rating_sums, sums)
+            self._rating_counts = append_csr(self._buffers, '_rating_counts', self._rating_counts, counts)
+            self.user_movie_matrix = append_csr(
+                self._buffers, 'user_movie_matrix', self.user_movie_matrix, mean_ratings(sums, counts)
+            )
+            self.liked_matrix = append_csr(
+                self._buffers, 'liked_matrix', self.liked_matrix, self._user_movie_counts(liked, first_row=n_old)
+            )
+        else:
+            sums, counts = self._rating_totals(rated)
+            self._rating_sums = pad_rows(self._rating_sums, n_users) + sums
+            self._rating_counts = pad_rows(self._rating_counts, n_users) + counts
+            self.user_movie_matrix = mean_ratings(self._rating_sums, self._rating_counts)
+            self.liked_matrix = pad_rows(self.liked_matrix, n_users) + self._user_movie_counts(liked)
+        changed_movies = self.watched.append(new_viewing_rows)
+        self._pending_movies = np.union1d(self._pending_movies, changed_movies)
+        
+        # Neighbours of the users with new rated records
+        self._pending_users = np.union1d(self._pending_users, changed)
+        neighbours, similarities = neighbours_of(
+            self.user_movie_matrix, changed, self.neighbours.shape[1], self._neighbour_base, self._pending_users
+        )
+        self.neighbours = assign_rows(self._buffers, 'neighbours', self.neighbours, changed, neighbours, n_users, -1)
+        self.neighbour_similarities = assign_rows(
+            self._buffers, 'neighbour_similarities', self.neighbour_similarities, changed, similarities, n_users
         )
+    
+    def compacted(self):
+        """
+        A copy with the work update() defers done, in O(all records).
         
-        # Compute similarity between users
-        self.user_similarity = cosine_similarity(self.user_movie_matrix)
-        self.user_similarity_df = pd.DataFrame(
-            self.user_similarity,
-            index=self.user_movie_matrix.index,
-            columns=self.user_movie_matrix.index
+        The tables are concatenated, and the similar movies of the movies
+        that gained viewers and the neighbour lists that can include the
+        updated users are recomputed, so the result equals a full fit on
+        the same records. This recommender is left unchanged.
+        """
+        recommender = self.copy()
+        recommender._viewing, recommender._profiles = appended_tables(self.user_viewing_df, self.user_profiles_df)
+        recommender.item_index = self.item_index.updated(self._pending_movies, coviewing=self.watched.matrix)
+        recommender.neighbours, recommender.neighbour_similarities = update_neighbours(
+            self.user_movie_matrix, self.neighbours, self.neighbour_similarities, self._pending_users,
+            block_size=self.block_size
         )
+        recommender._neighbour_base = neighbour_base(self.user_movie_matrix)
+        recommender._pending_movies = np.empty(0, dtype=np.int64)
+        recommender._pending_users = np.empty(0, dtype=np.int64)
+        return recommender
     
     def generate_recommendations(self, user_id, top_n=10, exclude_watched=True):
         """Generate recommendations using collaborative filtering."""
-        # Get list of movies user has already watched
-        watched_movies = self.user_viewing_df[self.user_viewing_df['user_id'] == user_id]['movie_id'].unique()
-        
-        # Get similar users
-        similar_users = self.user_similarity_df[user_id].sort_values(ascending=False).iloc[1:6]
+        row = lookup_rows(self.user_index, user_id)
+        if row < 0:
+            raise ValueError(f"User ID {user_id} not found")
         
-        # Get movies these similar users have rated highly
-        similar_user_ratings = self.user_viewing_df[
-            (self.user_viewing_df['user_id'].isin(similar_users.index)) & 
-            (self.user_viewing_df['rating'] >= 4)
-        ]
+        # Count the highly rated movies of the precomputed similar users,
+        # excluding movies the user has already watched if required
+        rows, counts = neighbour_counts(
+            self.neighbours[row],
+            self.liked_matrix,
+            self.watched.matrix if exclude_watched else None,
+            lookup_rows(self.watched.user_index, user_id)
+        )
         
-        # Exclude movies the user has already watched if required
-        if exclude_watched:
-            similar_user_ratings = similar_user_ratings[~similar_user_ratings['movie_id'].isin(watched_movies)]
+        # Get top n and attach the movie details for those rows only
+        top = top_k_indices(counts, top_n)
+        return recommendations_frame(self.movie_metadata, rows[top], 'rec_count', counts[top])
+    
+    def similar_movies(self, movie_id, top_n=10):
+        """Movies most similar to a movie, read from the precomputed item index."""
+        row = lookup_rows(self.movie_index, movie_id)
+        if row < 0:
+            raise ValueError(f"Movie ID {movie_id} not found")
+        rows, similarities = self.item_index.similar(row, top_n)
+        return recommendations_frame(self.movie_metadata, rows, 'similarity', similarities)
+    
+    def generate_item_recommendations(self, user_id, top_n=10, exclude_watched=True):
+        """Item-based recommendations: the movies most similar to the ones a user watched."""
+        row = lookup_rows(self.user_index, user_id)
+        if row < 0:
+            raise ValueError(f"User ID {user_id} not found")
+        watched_rows = self.watched.rows(user_id)
+        rows, scores = self.item_index.recommend(watched_rows, watched_rows if exclude_watched else None, top_n)
+        return recommendations_frame(self.movie_metadata, rows, 'similarity', scores)
+    
+    def generate_recommendations_batch(self, user_ids, top_n=10, exclude_watched=True, block_size=1024):
+        """
+        Generate collaborative filtering recommendations for many users at once.
         
-        # Count recommendations and get top n
-        movie_recs = similar_user_ratings['movie_id'].value_counts().sort_values(ascending=False).head(top_n)
+        For each block of users, the highly rated movies of their precomputed
+        neighbours are counted with one sparse matrix product. Users without
+        viewing history are skipped.
         
-        # Create dataframe with recommendations
-        recs_df = pd.DataFrame({'movie_id': movie_recs.index, 'rec_count': movie_recs.values})
+        Returns:
+            DataFrame with user_id, movie_id, rec_count, title, genre and
+            rating, ordered by user and descending count
+        """
+        user_ids = np.asarray(user_ids)
+        user_rows = lookup_rows(self.user_index, user_ids)
+        user_ids, user_rows = user_ids[user_rows >= 0], user_rows[user_rows >= 0]
         
-        # Join with movie data
-        recs_df = recs_df.merge(self.movies_df[['movie_id', 'title', 'genre', 'rating']], on='movie_id')
+        frames = []
+        for start in range(0, len(user_ids), block_size):
+            block, rows = user_ids[start:start + block_size], user_rows[start:start + block_size]
+            
+            # Neighbours of each user in the block as a sparse selection matrix
+            neighbours = self.neighbours[rows]
+            block_pos, rank = np.nonzero(neighbours >= 0)
+            neighbour_matrix = csr_matrix(
+                (np.ones(len(block_pos)), (block_pos, neighbours[block_pos, rank])),
+                shape=(len(rows), self.liked_matrix.shape[0])
+            )
+            
+            # Number of neighbours that rated each movie highly
+            counts = (neighbour_matrix @ self.liked_matrix).toarray()
+            if exclude_watched:
+                self.watched.exclude(counts, block, 0)
+            
+            top = top_k_indices(counts, top_n)
+            top_counts = np.take_along_axis(counts, top, axis=1).astype(int)
+            frames.append(batch_recommendations_frame(
+                self.movie_metadata, block, top, 'rec_count', top_counts, top_counts > 0
+            ))
         
-        return recs_df 
\ No newline at end of file
+        return pd.concat(frames, ignore_index=True) if frames else empty_batch_frame('rec_count')
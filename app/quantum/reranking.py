@@ -0,0 +1,154 @@
+import numpy as np
+from app.quantum.arrays import extend_index, lookup_rows
+
+# Genres boosted by each theme of an extended profile
+THEME_GENRES = {
+    'action_packed': ['Action', 'Thriller'],
+    'deep_themes': ['Drama', 'Sci-Fi'],
+    'character_driven': ['Drama'],
+    'dark': ['Horror', 'Thriller', 'Crime'],
+    'light_hearted': ['Comedy', 'Romance']
+}
+THEME_BOOST = 0.1
+GENRE_RATING_BOOST = 0.05  # per rating point above or below 3
+
+# Genres moved to the end in the morning, and to the front late at night
+MORNING_HEAVY_GENRES = ['Drama', 'Crime', 'Thriller', 'Horror']
+LATE_NIGHT_GENRES = ['Sci-Fi', 'Thriller', 'Horror']
+
+
+def is_series_title(title):
+    """Titles with a space and a digit, e.g. 'Stranger Things 2', are treated as series."""
+    return ' ' in title and any(char.isdigit() for char in title)
+
+
+class RerankState:
+    """Scores of a recommendation list being re-ranked, one entry per movie."""
+
+    def __init__(self, rows, genres, similarity=None, rec_count=None):
+        self.rows = rows
+        self.genres = genres
+        self.similarity = similarity
+        self.rec_count = rec_count
+        self.order = np.arange(len(rows))
+
+    def take(self, order):
+        """Reorder the list by positions into the current order."""
+        self.order = self.order[order]
+
+
+class Reranker:
+    """
+    Personalization rules applied to a recommendation list.
+
+    Per-movie genre codes and series flags are precomputed for the whole
+    catalog, so every rule is a vectorized adjustment of the score array or
+    a stable partition of the order.
+    """
+
+    def __init__(self, movie_metadata):
+        """
+        Args:
+            movie_metadata: Columnar movie details from movie_metadata()
+        """
+        movie_ids = movie_metadata['movie_id']
+        self.movie_index = extend_index(np.empty(0, dtype=np.int64), movie_ids, np.arange(len(movie_ids)))
+        self.genre_names, self.movie_genres = np.unique(np.asarray(movie_metadata['genre'], dtype=str), return_inverse=True)
+        self.series = np.array([is_series_title(str(title)) for title in movie_metadata['title']], dtype=bool)
+
+    def _genre_mask(self, state, genres):
+        """Movies of the list whose genre is one of `genres`."""
+        return np.isin(self.genre_names, genres)[state.genres]
+
+    def theme_boost(self, state, themes):
+        """Add THEME_BOOST per matching theme, capped at 1; rec counts become similarities first."""
+        boost = np.zeros(len(state.rows))
+        for theme in themes:
+            if theme in THEME_GENRES:
+                boost[self._genre_mask(state, THEME_GENRES[theme])] += THEME_BOOST
+        if state.similarity is None:
+            state.similarity = state.rec_count / 5
+        state.similarity = np.minimum(1.0, state.similarity + boost)
+
+    def genre_rating_boost(self, state, genre_ratings):
+        """Shift similarities by the user's rating of each matching genre, clamped to [0, 1] after each shift."""
+        if state.similarity is None:
+            return
+        genre_lower = np.char.lower(self.genre_names)
+        for genre, rating in genre_ratings.items():
+            matches = (np.char.find(genre_lower, genre) >= 0) | (genre == 'scifi' and np.char.find(genre_lower, 'sci-fi') >= 0)
+            mask = matches[state.genres]
+            state.similarity = np.where(mask, np.clip(state.similarity + (rating - 3) * GENRE_RATING_BOOST, 0, 1.0), state.similarity)
+
+    def sort_by_similarity(self, state):
+        """Stable sort by descending similarity."""
+        if state.similarity is not None and len(state.rows):
+            state.take(np.argsort(-state.similarity[state.order], kind='stable'))
+
+    def promote(self, state, mask):
+        """Stable partition moving the movies in mask (indexed like state.rows) to the front."""
+        state.take(np.argsort(~mask[state.order], kind='stable'))
+
+    def viewing_time_order(self, state, viewing_time):
+        if viewing_time == 'morning':
+            self.promote(state, ~self._genre_mask(state, MORNING_HEAVY_GENRES))
+        elif viewing_time == 'late-night':
+            self.promote(state, self._genre_mask(state, LATE_NIGHT_GENRES))
+
+    def binge_order(self, state, watch_habit):
+        if watch_habit == 'binge':
+            self.promote(state, self.series[state.rows])
+
+    def rerank(self, recs_df, extended_profile=None, viewing_time=None, watch_habit=None, top_n=10):
+        """
+        Apply the personalization rules to a recommendations DataFrame.
+
+        Args:
+            recs_df: Recommendations with movie_id and similarity or rec_count
+            extended_profile: Extended profile dict with optional 'themes' and
+                'genre_ratings'
+            viewing_time: Preferred viewing time ('morning', 'late-night', ...)
+            watch_habit: Watching habit ('binge', ...)
+            top_n: Number of recommendations returned
+
+        Returns:
+            List of recommendation dicts with id, title, genre, rating and
+            similarity and/or rec_count
+        """
+        rows = lookup_rows(self.movie_index, recs_df['movie_id'].to_numpy())
+        state = RerankState(
+            rows,
+            self.movie_genres[rows],
+            recs_df['similarity'].to_numpy(dtype=float) if 'similarity' in recs_df else None,
+            recs_df['rec_count'].to_numpy(dtype=int) if 'rec_count' in recs_df else None
+        )
+
+        if extended_profile:
+            try:
+                if extended_profile.get('themes'):
+                    self.theme_boost(state, extended_profile['themes'])
+                if extended_profile.get('genre_ratings'):
+                    self.genre_rating_boost(state, extended_profile['genre_ratings'])
+            except Exception as profile_error:
+                print(f"Error processing extended profile: {profile_error}")
+
+        self.sort_by_similarity(state)
+        self.viewing_time_order(state, viewing_time)
+        self.binge_order(state, watch_habit)
+
+        order = state.order[:top_n]
+        columns = {column: recs_df[column].to_numpy()[order] for column in ['movie_id', 'title', 'genre', 'rating']}
+        recommendations = []
+        for i, position in enumerate(order):
+            rec = {
+                'id': int(columns['movie_id'][i]),
+                'title': columns['title'][i],
+                'genre': columns['genre'][i],
+                'rating': float(columns['rating'][i])
+            }
+            if state.rec_count is not None:
+                rec['rec_count'] = int(state.rec_count[position])
+            if state.similarity is not None:
+                rec['similarity'] = float(state.similarity[position])
+            recommendations.append(rec)
+        return recommendations
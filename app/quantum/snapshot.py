@@ -0,0 +1,196 @@
+import os
+import time
+import struct
+import zipfile
+import argparse
+import numpy as np
+from numpy.lib import format as npy_format
+from app.quantum.embedding_store import hash_arrays
+from app.quantum.dataset import (
+    source_digest, data_paths, read_table, VIEWING_DTYPES, VIEWING_DATES, PROFILE_DTYPES, PROFILE_DATES
+)
+from app.quantum.store import ProfileStore, STORE_SUFFIX
+from app.quantum.weights import WeightRegistry
+
+# Bumped whenever the arrays a snapshot holds change
+SNAPSHOT_FORMAT = 1
+
+_HEADER_READERS = {
+    (1, 0): npy_format.read_array_header_1_0,
+    (2, 0): npy_format.read_array_header_2_0
+}
+
+
+def is_store(path):
+    """Whether a data path is a profile store."""
+    return os.path.splitext(path)[1] == STORE_SUFFIX
+
+
+def data_digest(user_data_path, movie_data_path, user_profile_path):
+    """
+    Hash of the three data sources.
+
+    A profile store is hashed by its id rather than its revision: its
+    tables are only appended to, so a snapshot stays usable after signups
+    and open_snapshot() replays the rows added since it was written.
+    """
+    return hash_arrays(*[
+        ProfileStore(path).store_id() if is_store(path) else source_digest(path)
+        for path in (user_data_path, movie_data_path, user_profile_path)
+    ])
+
+
+def save_arrays(path, arrays):
+    """Atomically write arrays to an uncompressed .npz file, whose members can then be memory-mapped."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_arrays(path):
+    """
+    Memory-map every array of an uncompressed .npz file.
+
+    np.load(mmap_mode='r') only maps plain .npy files, but the members of
+    an uncompressed .npz are .npy files stored contiguously in the archive,
+    so each one is mapped at its offset in the file. Processes mapping the
+    same file share its pages through the OS page cache. Compressed
+    members, scalars and empty arrays are read into memory instead.
+
+    Returns:
+        Dict of member name -> read-only array
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type == zipfile.ZIP_STORED:
+                # Local file header: 30 fixed bytes, then the file name and extra field
+                f.seek(info.header_offset)
+                name_length, extra_length = struct.unpack('<HH', f.read(30)[26:30])
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                reader = _HEADER_READERS.get(npy_format.read_magic(f))
+                if reader is not None:
+                    shape, fortran_order, dtype = reader(f)
+                    if not dtype.hasobject and len(shape) and np.prod(shape) > 0:
+                        arrays[name] = np.asarray(np.memmap(
+                            path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                            order='F' if fortran_order else 'C'
+                        ))
+                        continue
+            with archive.open(info) as member:
+                arrays[name] = npy_format.read_array(member)
+    return arrays
+
+
+def write_snapshot(recommender, path):
+    """
+    Write everything needed to restore a recommender to one uncompressed .npz file.
+
+    Returns:
+        Size of the snapshot in bytes
+    """
+    arrays = recommender.snapshot_arrays()
+    arrays.update(
+        format=np.array(SNAPSHOT_FORMAT),
+        kind=np.array(type(recommender).__name__),
+        data_digest=np.array(data_digest(
+            recommender.user_data_path, recommender.movie_data_path, recommender.user_profile_path
+        ))
+    )
+    save_arrays(path, arrays)
+    return os.path.getsize(path)
+
+
+def replay_store_rows(recommender, user_data_path, user_profile_path):
+    """
+    Add the profile store rows written after a snapshot to the recommender restored from it.
+
+    The snapshot's tables hold the first rows of the store's tables, so
+    the rows after them are the ones to add.
+
+    Returns:
+        The recommender, compacted if any rows were added
+    """
+    viewing = profiles = None
+    if is_store(user_data_path):
+        viewing = read_table(user_data_path, VIEWING_DTYPES, VIEWING_DATES, table='user_viewing',
+                             offset=len(recommender.user_viewing_df))
+    if is_store(user_profile_path):
+        profiles = read_table(user_profile_path, PROFILE_DTYPES, PROFILE_DATES, table='user_profiles',
+                              offset=len(recommender.user_profiles_df))
+    n_rows = sum(len(rows) for rows in (viewing, profiles) if rows is not None)
+    if not n_rows:
+        return recommender
+    print(f"Adding {n_rows} records written since the snapshot")
+    recommender.update(viewing, profiles)
+    return recommender.compacted()
+
+
+def open_snapshot(path, user_data_path, movie_data_path, user_profile_path, weights_dir=None):
+    """
+    Restore a recommender from a snapshot built from the current data files.
+
+    Records added to the profile store since the snapshot was built are
+    replayed with update(). Quantum snapshots go stale when newer circuit
+    weights have been saved to the registry since the snapshot was built.
+
+    Returns:
+        QuantumRecommender or ClassicalRecommender, or None if there is no
+        usable snapshot
+    """
+    if not os.path.exists(path):
+        return None
+    snapshot = load_arrays(path)
+    if (int(snapshot.get('format', -1)) != SNAPSHOT_FORMAT or
+            str(snapshot['data_digest']) != data_digest(user_data_path, movie_data_path, user_profile_path)):
+        print(f"Ignoring stale snapshot {path}")
+        return None
+
+    from app.quantum.recommender import QuantumRecommender, ClassicalRecommender
+    paths = dict(user_data_path=user_data_path, movie_data_path=movie_data_path, user_profile_path=user_profile_path)
+    if str(snapshot['kind']) == 'ClassicalRecommender':
+        return replay_store_rows(
+            ClassicalRecommender.from_snapshot(snapshot, **paths), user_data_path, user_profile_path
+        )
+
+    if weights_dir is None:
+        weights_dir = os.path.join(os.path.dirname(movie_data_path), 'weights')
+    versions = WeightRegistry(weights_dir).versions(int(snapshot['n_qubits']))
+    if versions and versions[-1] != int(snapshot['weights_version']):
+        print(f"Ignoring snapshot {path} built with weights version {int(snapshot['weights_version'])}")
+        return None
+    return replay_store_rows(
+        QuantumRecommender.from_snapshot(snapshot, weights_dir=weights_dir, **paths), user_data_path, user_profile_path
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a memory-mappable snapshot of the preprocessed model")
+    parser.add_argument('--data-dir', default='data', help="Directory with the data files and profile store")
+    parser.add_argument('--out', default=None, help="Output .npz path (defaults to <data-dir>/cache/snapshot.npz)")
+    parser.add_argument('--classical', action='store_true', help="Snapshot the classical recommender")
+    parser.add_argument('--backend', default='pennylane', help="Simulator backend used to embed the catalog")
+    args = parser.parse_args()
+
+    from app.quantum.recommender import QuantumRecommender, ClassicalRecommender
+    paths = data_paths(args.data_dir)
+    start = time.perf_counter()
+    if args.classical:
+        recommender = ClassicalRecommender(**paths)
+    else:
+        recommender = QuantumRecommender(backend=args.backend, **paths)
+    build_seconds = time.perf_counter() - start
+
+    out = args.out or os.path.join(args.data_dir, 'cache', 'snapshot.npz')
+    size = write_snapshot(recommender, out)
+    start = time.perf_counter()
+    open_snapshot(out, **paths)
+    print(f"Wrote {size / 2 ** 20:.1f} MiB snapshot to {out}: built in {build_seconds:.2f}s, "
+          f"restores in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
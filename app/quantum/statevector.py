@@ -0,0 +1,163 @@
+import numpy as np
+
+
+def rotation_unitaries(weights):
+    """
+    Combine the RX, RY and RZ rotations of each layer and wire into one gate.
+
+    Args:
+        weights: Circuit weights of shape (n_layers, n_qubits, 3)
+
+    Returns:
+        Complex array of shape (n_layers, n_qubits, 2, 2) holding RZ @ RY @ RX
+    """
+    weights = np.asarray(weights, dtype=float)
+    cx, sx = np.cos(weights[..., 0] / 2), np.sin(weights[..., 0] / 2)
+    cy, sy = np.cos(weights[..., 1] / 2), np.sin(weights[..., 1] / 2)
+    phase = np.exp(-0.5j * weights[..., 2])
+
+    rx = np.empty(weights.shape[:-1] + (2, 2), dtype=complex)
+    rx[..., 0, 0], rx[..., 0, 1] = cx, -1j * sx
+    rx[..., 1, 0], rx[..., 1, 1] = -1j * sx, cx
+
+    ry = np.empty(weights.shape[:-1] + (2, 2), dtype=complex)
+    ry[..., 0, 0], ry[..., 0, 1] = cy, -sy
+    ry[..., 1, 0], ry[..., 1, 1] = sy, cy
+
+    rz = np.zeros(weights.shape[:-1] + (2, 2), dtype=complex)
+    rz[..., 0, 0], rz[..., 1, 1] = phase, np.conj(phase)
+
+    return rz @ ry @ rx
+
+
+def cnot_ring_permutation(n_qubits):
+    """
+    Basis permutation of the CNOT ring CNOT(0, 1), ..., CNOT(n - 1, 0).
+
+    Wire 0 is the most significant bit of a basis index, matching PennyLane.
+    Applying the ring to a statevector is then state[..., permutation].
+    """
+    basis = np.arange(2 ** n_qubits)
+    permutation = basis.copy()
+    wires = list(zip(range(n_qubits - 1), range(1, n_qubits))) + [(n_qubits - 1, 0)]
+    for control, target in wires:
+        control_bit = (basis >> (n_qubits - 1 - control)) & 1
+        # Each CNOT is its own inverse, so its permutation doubles as the gather
+        # index, and gates compose by indexing the accumulated permutation
+        permutation = permutation[basis ^ (control_bit << (n_qubits - 1 - target))]
+    return permutation
+
+
+def pauli_z_signs(n_qubits):
+    """Eigenvalue of PauliZ on every wire for every basis state, shape (2**n, n)."""
+    basis = np.arange(2 ** n_qubits)[:, None]
+    bits = (basis >> (n_qubits - 1 - np.arange(n_qubits))) & 1
+    return 1.0 - 2.0 * bits
+
+
+class StatevectorSimulator:
+    """
+    Batched NumPy simulator for the recommender circuit.
+
+    Applies the RY angle embedding, the CNOT ring and the RX/RY/RZ layers
+    of QuantumRecommender.quantum_circuit directly to a (batch, 2**n)
+    statevector and reads out every PauliZ expectation in one matrix
+    product, without building a tape per call.
+    """
+
+    def __init__(self, n_qubits, n_layers=2, chunk_size=4096, max_dense_qubits=10):
+        """
+        Args:
+            n_qubits: Number of qubits in the circuit
+            n_layers: Number of entangling/rotation layers
+            chunk_size: Maximum number of statevectors simulated at once
+            max_dense_qubits: Up to this many qubits, the weight-dependent part
+                of the circuit is folded into one dense (2**n, 2**n) matrix
+        """
+        self.n_qubits = n_qubits
+        self.n_layers = n_layers
+        self.chunk_size = chunk_size
+        self.max_dense_qubits = max_dense_qubits
+        self.permutation = cnot_ring_permutation(n_qubits)
+        self.z_signs = pauli_z_signs(n_qubits)
+        self._dense_key = None
+        self._dense_transfer = None
+
+    def _embedding_state(self, angles):
+        """Product state after RY(angle) on every wire, shape (batch, 2**n)."""
+        cos, sin = np.cos(angles / 2), np.sin(angles / 2)
+        state = np.ones((angles.shape[0], 1))
+        for wire in range(self.n_qubits):
+            amplitudes = np.stack([cos[:, wire], sin[:, wire]], axis=1)
+            state = (state[:, :, None] * amplitudes[:, None, :]).reshape(angles.shape[0], -1)
+        return state
+
+    def _apply_single_qubit(self, state, unitary, wire):
+        """Apply a 2x2 unitary to one wire of a batch of statevectors."""
+        batch = state.shape[0]
+        state = state.reshape(batch, 2 ** wire, 2, 2 ** (self.n_qubits - wire - 1))
+        state = np.einsum('ij,bljr->blir', unitary, state)
+        return state.reshape(batch, -1)
+
+    def _apply_layers(self, state, unitaries):
+        """Apply the CNOT ring and rotation layers to a batch of statevectors."""
+        for layer in range(self.n_layers):
+            state = state[:, self.permutation]
+            for wire in range(self.n_qubits):
+                state = self._apply_single_qubit(state, unitaries[layer, wire], wire)
+        return state
+
+    def _transfer_matrix(self, weights, unitaries):
+        """
+        Dense matrix T with final_state = embedding_state @ T.
+
+        Everything after the embedding depends only on the weights, so T is
+        built once per set of weights by running the layers on the basis states.
+        """
+        key = np.asarray(weights, dtype=float).tobytes()
+        if key != self._dense_key:
+            basis = np.eye(2 ** self.n_qubits, dtype=complex)
+            self._dense_transfer = self._apply_layers(basis, unitaries)
+            self._dense_key = key
+        return self._dense_transfer
+
+    def _simulate_chunk(self, angles, weights, unitaries):
+        state = self._embedding_state(angles)
+        if self.n_qubits <= self.max_dense_qubits:
+            # The embedding state is real, so two real matrix products suffice
+            transfer = self._transfer_matrix(weights, unitaries)
+            real, imag = state @ transfer.real, state @ transfer.imag
+            probabilities = real ** 2 + imag ** 2
+        else:
+            state = self._apply_layers(state.astype(complex), unitaries)
+            probabilities = state.real ** 2 + state.imag ** 2
+        return probabilities @ self.z_signs
+
+    def expectations(self, features, weights):
+        """
+        PauliZ expectations of the circuit for one or many feature vectors.
+
+        Args:
+            features: Feature vector (n_features,) or matrix (batch, n_features)
+            weights: Circuit weights of shape (n_layers, n_qubits, 3)
+
+        Returns:
+            Array of shape (n_qubits,) or (batch, n_qubits)
+        """
+        features = np.asarray(features, dtype=float)
+        single = features.ndim == 1
+        features = np.atleast_2d(features)
+
+        # Feature i is embedded with RY(pi * x_i) on wire i % n_qubits, and
+        # consecutive RY rotations on the same wire add up
+        angles = np.zeros((features.shape[0], self.n_qubits))
+        for i in range(features.shape[1]):
+            angles[:, i % self.n_qubits] += np.pi * features[:, i]
+
+        unitaries = rotation_unitaries(weights)
+        expectations = np.concatenate([
+            self._simulate_chunk(angles[start:start + self.chunk_size], weights, unitaries)
+            for start in range(0, len(angles), self.chunk_size)
+        ]) if len(angles) else np.empty((0, self.n_qubits))
+
+        return expectations[0] if single else expectations
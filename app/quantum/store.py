@@ -0,0 +1,392 @@
+import os
+import csv
+import glob
+import json
+import uuid
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import pandas as pd
+from app.quantum.embedding_store import hash_arrays
+
+# Store file in the data directory; data paths with its suffix are read from a store
+STORE_NAME = 'recommender.db'
+STORE_SUFFIX = '.db'
+
+# Columns of the two tables the recommenders are built from, in CSV order
+PROFILE_COLUMNS = [
+    'user_id', 'age', 'gender', 'location', 'preferred_genre', 'subscription_type', 'last_active', 'country'
+]
+VIEWING_COLUMNS = ['user_id', 'movie_id', 'watch_duration', 'rating', 'completed', 'date_watched']
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS user_profiles (
+        user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        age REAL,
+        gender TEXT,
+        location TEXT,
+        preferred_genre TEXT,
+        subscription_type TEXT,
+        last_active TEXT,
+        country TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS user_viewing (
+        event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        movie_id INTEGER NOT NULL,
+        watch_duration REAL,
+        rating REAL,
+        completed REAL,
+        date_watched TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS user_viewing_user_id ON user_viewing (user_id)",
+    """CREATE TABLE IF NOT EXISTS extended_profiles (
+        user_id INTEGER PRIMARY KEY,
+        profile TEXT NOT NULL,
+        revision INTEGER NOT NULL DEFAULT 0
+    )""",
+    "CREATE INDEX IF NOT EXISTS extended_profiles_revision ON extended_profiles (revision)"
+]
+
+# Rough memory of a cached extended profile besides its JSON
+PROFILE_ENTRY_BYTES = 200
+
+# Returned by ExtendedProfileCache.get() for users it does not hold
+MISSING = object()
+
+
+def _insert(table, columns):
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+
+def _csv_rows(path, columns):
+    """Rows of a CSV file as tuples in column order, with empty fields as NULL."""
+    with open(path, newline='') as f:
+        for record in csv.DictReader(f):
+            yield tuple(record.get(column) or None for column in columns)
+
+
+class ExtendedProfileCache:
+    """
+    LRU cache of parsed extended profiles, evicting the least recently used
+    ones once their JSON size exceeds max_bytes. Users without an extended
+    profile are cached as None.
+
+    `revision` is the latest extended_profiles row revision the entries are
+    known to be current for. `writes` counts the profiles stored by writes
+    of this process and the changes applied from others, so that a read
+    that started before one of them is not cached over it.
+    """
+
+    def __init__(self, max_bytes=16 << 20):
+        self.max_bytes = max_bytes
+        self.revision = None
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """A user's cached profile, or MISSING."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def state(self):
+        """The (revision, writes) pair a read from the store is checked against by put()."""
+        with self._lock:
+            return self.revision, self.writes
+
+    def put(self, user_id, profile, size, seen=MISSING):
+        """
+        Cache a profile.
+
+        Args:
+            seen: state() before the profile was read from the store; the
+                profile is not cached if a write or newer changes have been
+                applied since, as it may predate them. Profiles just
+                written leave it out and invalidate such reads.
+        """
+        with self._lock:
+            if seen is MISSING:
+                self.writes += 1
+            elif seen != (self.revision, self.writes):
+                return
+            self._store(user_id, profile, size)
+
+    def apply_changes(self, changes, revision):
+        """Replace the cached profiles of changed rows, given as (user_id, profile JSON) pairs."""
+        with self._lock:
+            for user_id, text in changes:
+                if user_id in self._entries:
+                    self._store(user_id, json.loads(text), len(text))
+            if changes:
+                self.writes += 1
+            self.revision = revision if self.revision is None else max(self.revision, revision)
+
+    def _store(self, user_id, profile, size):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        self._entries[user_id] = (profile, size + PROFILE_ENTRY_BYTES)
+        self._bytes += size + PROFILE_ENTRY_BYTES
+        # Evict least recently used profiles, always keeping the newest one
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._bytes -= self._entries.popitem(last=False)[1][1]
+
+    def info(self):
+        """Hit and miss counts and the current size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'bytes': self._bytes}
+
+
+class ProfileStore:
+    """
+    SQLite store of user profiles, viewing events and extended profiles.
+
+    The database runs in WAL mode, so readers in other threads and
+    processes are not blocked by the writer, and a signup is a few indexed
+    inserts instead of a rewrite of the CSV files. User ids come from the
+    AUTOINCREMENT sequence of user_profiles inside the write transaction,
+    so concurrent signups always get distinct ids.
+
+    Every write to the profiles or viewing tables increments a revision
+    number, which identifies the data a recommender was built from.
+    Extended profiles do not feed the recommenders and leave it unchanged.
+
+    Extended profiles are read through an in-process LRU cache. Writes
+    through the store update it directly. Writes by other processes are
+    detected with PRAGMA data_version, which changes when another
+    connection commits and is answered from the WAL index without reading
+    the database; only then are the profiles changed since the cache's
+    revision read back, from the revision column each write sets.
+    """
+
+    def __init__(self, path, profile_cache_bytes=16 << 20):
+        """
+        Args:
+            path: Path of the SQLite database file
+            profile_cache_bytes: JSON size of the extended profiles kept in memory
+        """
+        self.path = path
+        self.profile_cache = ExtendedProfileCache(profile_cache_bytes)
+        self._local = threading.local()
+
+    @classmethod
+    def open(cls, path, user_profile_path=None, user_data_path=None, extended_profile_dir=None):
+        """
+        Open a store, creating it on first use.
+
+        A new store imports the records of the profile and viewing CSV
+        files and the user_<id>.json files of the extended profile directory.
+        """
+        store = cls(path)
+        store._connection().execute('PRAGMA journal_mode=WAL')
+        with store._transaction() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+            if cursor.execute("SELECT 1 FROM meta WHERE key = 'store_id'").fetchone() is None:
+                cursor.execute("INSERT INTO meta VALUES ('store_id', ?), ('revision', '0')", (uuid.uuid4().hex,))
+                store._import(cursor, user_profile_path, user_data_path, extended_profile_dir)
+        return store
+
+    def _import(self, cursor, user_profile_path, user_data_path, extended_profile_dir):
+        if user_profile_path and os.path.exists(user_profile_path):
+            cursor.executemany(_insert('user_profiles', PROFILE_COLUMNS), _csv_rows(user_profile_path, PROFILE_COLUMNS))
+        if user_data_path and os.path.exists(user_data_path):
+            cursor.executemany(_insert('user_viewing', VIEWING_COLUMNS), _csv_rows(user_data_path, VIEWING_COLUMNS))
+        if extended_profile_dir:
+            for path in glob.glob(os.path.join(extended_profile_dir, 'user_*.json')):
+                user_id = int(os.path.basename(path)[len('user_'):-len('.json')])
+                with open(path) as f:
+                    cursor.execute(
+                        "INSERT INTO extended_profiles (user_id, profile) VALUES (?, ?)", (user_id, json.dumps(json.load(f)))
+                    )
+        print(f"Created profile store {self.path}")
+
+    def _connection(self):
+        """The calling thread's connection, since sqlite3 connections are not shared between threads."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            # In WAL mode this only defers syncing to checkpoints; the database stays consistent
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self, changes_data=False):
+        """
+        A write transaction that takes the write lock up front, so that
+        reads inside it are not invalidated by other writers.
+
+        Args:
+            changes_data: Whether it writes to the profiles or viewing tables
+        """
+        cursor = self._connection().cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            if changes_data:
+                cursor.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'revision'")
+            yield cursor
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+
+    def add_user(self, profile, viewing_records=(), extended_profile=None):
+        """
+        Add a user with their first viewing records and extended profile, in one transaction.
+
+        Args:
+            profile: Dict of profile columns, without user_id
+            viewing_records: Dicts of viewing columns, without user_id
+            extended_profile: Optional extended profile dict
+
+        Returns:
+            Tuple of the new user's id and the store revision after the write
+        """
+        columns = [column for column in PROFILE_COLUMNS if column in profile and column != 'user_id']
+        with self._transaction(changes_data=True) as cursor:
+            cursor.execute(_insert('user_profiles', columns), [profile[column] for column in columns])
+            user_id = cursor.lastrowid
+            if viewing_records:
+                cursor.executemany(
+                    _insert('user_viewing', VIEWING_COLUMNS),
+                    [
+                        tuple(user_id if column == 'user_id' else record.get(column) for column in VIEWING_COLUMNS)
+                        for record in viewing_records
+                    ]
+                )
+            if extended_profile is not None:
+                text = self._write_extended_profile(cursor, user_id, extended_profile)
+            revision = self._revision(cursor)
+        self.profile_cache.put(user_id, extended_profile, len(text) if extended_profile is not None else 0)
+        return user_id, revision
+
+    def add_viewing(self, viewing_records):
+        """
+        Append viewing records.
+
+        Returns:
+            The store revision after the write
+        """
+        with self._transaction(changes_data=True) as cursor:
+            cursor.executemany(
+                _insert('user_viewing', VIEWING_COLUMNS),
+                [tuple(record.get(column) for column in VIEWING_COLUMNS) for record in viewing_records]
+            )
+            return self._revision(cursor)
+
+    def extended_profile(self, user_id):
+        """
+        A user's extended profile dict, or None if they have none.
+
+        The dict may be shared with other callers through the cache and
+        must not be modified.
+        """
+        user_id = int(user_id)
+        seen = self._sync_profile_cache()
+        profile = self.profile_cache.get(user_id)
+        if profile is not MISSING:
+            return profile
+        row = self._connection().execute(
+            "SELECT profile FROM extended_profiles WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        profile = json.loads(row[0]) if row is not None else None
+        self.profile_cache.put(user_id, profile, len(row[0]) if row is not None else 0, seen=seen)
+        return profile
+
+    def update_extended_profile(self, user_id, changes):
+        """
+        Merge changes into a user's extended profile, in one transaction.
+
+        Returns:
+            The updated extended profile, also stored in the cache
+        """
+        user_id = int(user_id)
+        with self._transaction() as cursor:
+            row = cursor.execute("SELECT profile FROM extended_profiles WHERE user_id = ?", (user_id,)).fetchone()
+            profile = json.loads(row[0]) if row is not None else {}
+            profile.update(changes)
+            text = self._write_extended_profile(cursor, user_id, profile)
+        self.profile_cache.put(user_id, profile, len(text))
+        return profile
+
+    def _write_extended_profile(self, cursor, user_id, profile):
+        """Write an extended profile with the next row revision, returning its JSON."""
+        text = json.dumps(profile)
+        cursor.execute(
+            "INSERT OR REPLACE INTO extended_profiles (user_id, profile, revision) "
+            "VALUES (?, ?, (SELECT COALESCE(MAX(revision), 0) + 1 FROM extended_profiles))",
+            (user_id, text)
+        )
+        return text
+
+    def _sync_profile_cache(self):
+        """
+        Apply extended profile changes committed by other connections to the cache.
+
+        Returns:
+            The cache state() after syncing
+        """
+        cache = self.profile_cache
+        connection = self._connection()
+        data_version = connection.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == getattr(self._local, 'data_version', None) and cache.revision is not None:
+            return cache.state()
+        self._local.data_version = data_version
+        if cache.revision is None:
+            # Nothing is cached yet, so only the latest revision is needed
+            latest = connection.execute("SELECT COALESCE(MAX(revision), 0) FROM extended_profiles").fetchone()[0]
+            cache.apply_changes([], latest)
+            return cache.state()
+        changes = connection.execute(
+            "SELECT user_id, profile, revision FROM extended_profiles WHERE revision > ? ORDER BY revision",
+            (cache.revision,)
+        ).fetchall()
+        if changes:
+            cache.apply_changes([(user_id, text) for user_id, text, _ in changes], changes[-1][2])
+        return cache.state()
+
+    def read_frame(self, table, offset=0):
+        """
+        The user_profiles or user_viewing table as a DataFrame, in insertion order.
+
+        Args:
+            offset: Number of leading rows to skip; both tables are only
+                appended to, so these are the rows added after the first
+                `offset` ones
+        """
+        columns = {'user_profiles': PROFILE_COLUMNS, 'user_viewing': VIEWING_COLUMNS}[table]
+        return pd.read_sql_query(
+            f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid LIMIT -1 OFFSET ?",
+            self._connection(), params=(offset,)
+        )
+
+    def _revision(self, cursor):
+        return int(cursor.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0])
+
+    def revision(self):
+        """Number of committed writes to the profiles and viewing tables."""
+        return self._revision(self._connection().cursor())
+
+    def store_id(self):
+        """Random id given to the store when it was created."""
+        return self._connection().execute("SELECT value FROM meta WHERE key = 'store_id'").fetchone()[0]
+
+    def digest(self):
+        """Key of the store's current profiles and viewing data, unique across stores."""
+        return hash_arrays(self.store_id(), str(self.revision()))
@@ -0,0 +1,71 @@
+"""
+Synthetic catalogs, users and re-ranking requests shared by the benchmarks
+and tests, in the formats of data/ and of the recommendation routes.
+"""
+import os
+import numpy as np
+import pandas as pd
+from app.quantum.reranking import THEME_GENRES
+
+GENRES = ['Action', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Horror', 'Romance', 'Sci-Fi', 'Thriller']
+
+
+def write_synthetic_dataset(directory, n_users, n_movies, per_user, rng):
+    """Write movies, user profile and viewing CSVs in the format of data/."""
+    movie_genres = rng.choice(GENRES, size=n_movies)
+    pd.DataFrame({
+        'movie_id': np.arange(1, n_movies + 1),
+        'title': [f'Movie {i}' for i in range(1, n_movies + 1)],
+        'genre': movie_genres,
+        'release_year': rng.integers(1970, 2024, size=n_movies),
+        'rating': np.round(rng.uniform(5, 9.5, size=n_movies), 1),
+        'popularity': rng.integers(1, 100, size=n_movies),
+        'runtime': rng.integers(20, 180, size=n_movies),
+        'is_original': rng.integers(0, 2, size=n_movies)
+    }).to_csv(os.path.join(directory, 'movies.csv'), index=False)
+
+    preferred = rng.choice(GENRES, size=n_users)
+    pd.DataFrame({
+        'user_id': np.arange(1, n_users + 1),
+        'age': rng.integers(18, 80, size=n_users),
+        'gender': rng.choice(['M', 'F'], size=n_users),
+        'location': 'US',
+        'preferred_genre': preferred,
+        'subscription_type': rng.choice(['standard', 'premium'], size=n_users),
+        'last_active': '2024-01-01'
+    }).to_csv(os.path.join(directory, 'user_profiles.csv'), index=False)
+
+    # Users mostly watch movies of their preferred genre
+    user_ids = np.repeat(np.arange(1, n_users + 1), per_user)
+    in_genre = rng.uniform(size=len(user_ids)) < 0.6
+    by_genre = {genre: np.flatnonzero(movie_genres == genre) + 1 for genre in GENRES}
+    movie_ids = rng.integers(1, n_movies + 1, size=len(user_ids))
+    for genre in GENRES:
+        pick = in_genre & (np.repeat(preferred, per_user) == genre)
+        movie_ids[pick] = rng.choice(by_genre[genre], size=pick.sum())
+    pd.DataFrame({
+        'user_id': user_ids,
+        'movie_id': movie_ids,
+        'watch_duration': rng.integers(5, 120, size=len(user_ids)),
+        'rating': rng.integers(1, 6, size=len(user_ids)),
+        'completed': rng.integers(0, 2, size=len(user_ids)),
+        'date_watched': '2024-01-01'
+    }).drop_duplicates(['user_id', 'movie_id']).to_csv(os.path.join(directory, 'user_viewing.csv'), index=False)
+
+
+def random_request(metadata, n_recs, rng):
+    """A recommendations DataFrame with random scores plus a random profile and session."""
+    rows = rng.choice(len(metadata['movie_id']), size=n_recs, replace=False)
+    recs = {column: metadata[column][rows] for column in metadata}
+    if rng.uniform() < 0.5:
+        recs['similarity'] = np.round(rng.uniform(size=n_recs), 2)
+    else:
+        recs['rec_count'] = rng.integers(1, 6, size=n_recs)
+    extended_profile = {
+        'themes': list(rng.choice(list(THEME_GENRES), size=rng.integers(0, 4))),
+        'genre_ratings': {genre: int(rng.integers(1, 6)) for genre in ['action', 'drama', 'scifi', 'comedy', 'horror']
+                          if rng.uniform() < 0.5}
+    }
+    viewing_time = rng.choice(['morning', 'late-night', 'evening'])
+    watch_habit = rng.choice(['binge', 'casual'])
+    return pd.DataFrame(recs), extended_profile, viewing_time, watch_habit
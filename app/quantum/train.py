@@ -0,0 +1,98 @@
+import os
+import argparse
+import pennylane as qml
+from pennylane import numpy as pnp
+import numpy as np
+
+
+def train_weights(recommender, epochs=30, learning_rate=0.1, verbose=True):
+    """
+    Fit the circuit weights of a QuantumRecommender to the viewing ratings.
+
+    The model predicts a rating of 5 * similarity for every (user, movie)
+    viewing record. Each step embeds all users and movies of the training
+    set in two broadcast circuit executions and takes a parameter-shift
+    gradient of the mean squared error over the whole batch.
+
+    Args:
+        recommender: QuantumRecommender whose current weights are the starting point
+        epochs: Number of optimization steps
+        learning_rate: Adam learning rate
+        verbose: Whether to print the loss after each step
+
+    Returns:
+        Tuple of (trained weights, final loss)
+    """
+    viewing = recommender.user_viewing_df
+    viewing = viewing[
+        viewing['user_id'].isin(recommender.user_profiles_df['user_id']) &
+        viewing['movie_id'].isin(recommender.movies_df['movie_id'])
+    ]
+    user_ids, user_idx = np.unique(viewing['user_id'].values, return_inverse=True)
+    movie_ids, movie_idx = np.unique(viewing['movie_id'].values, return_inverse=True)
+    targets = viewing['rating'].values / 5
+
+    user_features = recommender._fit_to_qubits(
+        np.array([recommender.get_user_features(user_id) for user_id in user_ids])
+    )
+    movie_features = recommender.get_movie_features_batch(movie_ids)
+
+    circuit = qml.QNode(recommender.quantum_circuit, recommender.dev, diff_method='parameter-shift')
+
+    def embed(features, weights):
+        return pnp.stack(circuit(features, weights), axis=-1)
+
+    def cost(weights):
+        user_embeddings = embed(user_features, weights)[user_idx]
+        movie_embeddings = embed(movie_features, weights)[movie_idx]
+        cosine = pnp.sum(user_embeddings * movie_embeddings, axis=1) / (
+            pnp.linalg.norm(user_embeddings, axis=1) * pnp.linalg.norm(movie_embeddings, axis=1)
+        )
+        return pnp.mean(((cosine + 1) / 2 - targets) ** 2)
+
+    weights = pnp.array(recommender.weights, requires_grad=True)
+    optimizer = qml.AdamOptimizer(learning_rate)
+    loss = float(cost(weights))
+    if verbose:
+        print(f"Initial loss: {loss:.5f}")
+
+    for epoch in range(epochs):
+        weights, _ = optimizer.step_and_cost(cost, weights)
+        loss = float(cost(weights))
+        if verbose:
+            print(f"Epoch {epoch + 1}/{epochs} - loss: {loss:.5f}")
+
+    return np.array(weights), loss
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the recommender circuit weights on viewing ratings")
+    parser.add_argument('--data-dir', default='data', help="Directory with the data files and profile store")
+    parser.add_argument('--n-qubits', type=int, default=8)
+    parser.add_argument('--base-version', type=int, default=None, help="Weights version to start from (defaults to the latest)")
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--learning-rate', type=float, default=0.1)
+    args = parser.parse_args()
+
+    from app.quantum.recommender import QuantumRecommender
+    from app.quantum.dataset import data_paths
+    recommender = QuantumRecommender(
+        **data_paths(args.data_dir),
+        n_qubits=args.n_qubits,
+        weights_version=args.base_version
+    )
+
+    weights, loss = train_weights(recommender, epochs=args.epochs, learning_rate=args.learning_rate)
+    version = recommender.weight_registry.save(
+        weights,
+        source='trained',
+        base_version=recommender.weights_version,
+        epochs=args.epochs,
+        learning_rate=args.learning_rate,
+        loss=loss
+    )
+    print(f"Saved weights version {version} to {recommender.weight_registry.path(args.n_qubits, version)}")
+
+
+if __name__ == '__main__':
+    main()
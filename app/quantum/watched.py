@@ -0,0 +1,134 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from app.quantum.arrays import lookup_rows, append_rows, append_index
+from app.quantum.neighbours import pad_rows, append_csr, csr_arrays, arrays_csr
+
+
+class WatchedIndex:
+    """
+    Catalog rows watched by every user, built once and extended on append.
+
+    A binary CSR (n_users, n_movies) matrix: indptr holds the offsets of
+    each user's sorted catalog rows in indices, so a user's watched set is
+    one slice and excluding watched movies is a mask write on the score
+    vector instead of scans of the viewing records.
+    """
+
+    def __init__(self, movie_index, n_movies):
+        """
+        Args:
+            movie_index: movie_id -> catalog row index from extend_index
+            n_movies: Number of catalog movies
+        """
+        self.movie_index = movie_index
+        self.n_movies = n_movies
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.user_index = np.empty(0, dtype=np.int64)
+        self.matrix = csr_matrix((0, n_movies), dtype=np.int8)
+        # Spare rows the user arrays and the matrix of later versions are appended into
+        self._buffers = {}
+
+    @classmethod
+    def build(cls, viewing_df, movie_index, n_movies):
+        """Index the viewing records of a DataFrame with user_id and movie_id columns."""
+        index = cls(movie_index, n_movies)
+        index.append(viewing_df)
+        return index
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix, movie_index, n_movies):
+        """Restore an index saved with to_arrays()."""
+        index = cls(movie_index, n_movies)
+        index.matrix = arrays_csr(arrays, f'{prefix}/matrix')
+        index.user_ids = arrays[f'{prefix}/user_ids']
+        index.user_index = arrays[f'{prefix}/user_index']
+        return index
+
+    def to_arrays(self, prefix):
+        """The index as arrays keyed by prefix, for a snapshot."""
+        arrays = csr_arrays(f'{prefix}/matrix', self.matrix)
+        arrays[f'{prefix}/user_ids'] = self.user_ids
+        arrays[f'{prefix}/user_index'] = self.user_index
+        return arrays
+
+    def append(self, viewing_df):
+        """
+        Add viewing records, giving new users a row.
+
+        The matrix and user index are replaced rather than modified in
+        place, so concurrent readers see either the old or the new index.
+        Records of new users only are appended in O(new records); records
+        of users already indexed rebuild the matrix.
+
+        Returns:
+            Catalog rows of the movies that gained a viewer
+        """
+        self._buffers = dict(self._buffers)
+        n_old = len(self.user_ids)
+        user_ids = viewing_df['user_id'].to_numpy()
+        new_ids = np.unique(user_ids)
+        new_ids = new_ids[lookup_rows(self.user_index, new_ids) < 0]
+        n_users = n_old + len(new_ids)
+        user_index = append_index(self._buffers, 'user_index', self.user_index, new_ids, np.arange(n_old, n_users))
+
+        user_rows = lookup_rows(user_index, user_ids)
+        movie_rows = lookup_rows(self.movie_index, viewing_df['movie_id'].to_numpy())
+        known = movie_rows >= 0
+        user_rows, movie_rows = user_rows[known], movie_rows[known]
+        if not (user_rows < n_old).any():
+            tail = csr_matrix(
+                (np.ones(len(user_rows), dtype=np.int8), (user_rows - n_old, movie_rows)),
+                shape=(n_users - n_old, self.n_movies)
+            )
+            tail.data[:] = 1
+            matrix = append_csr(self._buffers, 'matrix', self.matrix, tail)
+            changed = np.unique(movie_rows)
+        else:
+            for key in ('data', 'indices', 'indptr'):
+                self._buffers.pop(f'matrix/{key}', None)
+            matrix = pad_rows(self.matrix, n_users) + csr_matrix(
+                (np.ones(len(user_rows), dtype=np.int8), (user_rows, movie_rows)),
+                shape=(n_users, self.n_movies)
+            )
+            matrix.data[:] = 1
+            changed = np.flatnonzero(matrix.getnnz(axis=0) != self.matrix.getnnz(axis=0))
+
+        # New rows are appended, so the old user index stays valid for the new matrix
+        self.matrix = matrix
+        self.user_ids = append_rows(self._buffers, 'user_ids', self.user_ids, new_ids)
+        self.user_index = user_index
+        return changed
+
+    def rows(self, user_id):
+        """Sorted catalog rows watched by a user, empty for unknown users."""
+        row = lookup_rows(self.user_index, user_id)
+        if row < 0:
+            return np.empty(0, dtype=self.matrix.indices.dtype)
+        return self.matrix.indices[self.matrix.indptr[row]:self.matrix.indptr[row + 1]]
+
+    def mask(self, user_ids):
+        """Boolean (n_users, n_movies) mask of the catalog rows each user has watched."""
+        rows = lookup_rows(self.user_index, np.asarray(user_ids))
+        mask = np.zeros((len(rows), self.n_movies), dtype=bool)
+        known = rows >= 0
+        mask[known] = self.matrix[rows[known]].toarray() > 0
+        return mask
+
+    def exclude(self, scores, user_ids, value):
+        """
+        Set the scores of the movies each user has watched to value, in place.
+
+        Only the watched entries of the (n_users, n_movies) scores are
+        written, so no mask of the whole block is built.
+        """
+        rows = lookup_rows(self.user_index, np.asarray(user_ids))
+        known = np.flatnonzero(rows >= 0)
+        block_rows, movie_rows = self.matrix[rows[known]].nonzero()
+        scores[known[block_rows], movie_rows] = value
+        return scores
+
+    def unwatched_rows(self, user_id):
+        """Catalog rows a user has not watched."""
+        unwatched = np.ones(self.n_movies, dtype=bool)
+        unwatched[self.rows(user_id)] = False
+        return np.flatnonzero(unwatched)
@@ -0,0 +1,97 @@
+import os
+import re
+import json
+import numpy as np
+
+
+class WeightRegistry:
+    """
+    Versioned circuit weights stored on disk.
+
+    Each version is a .npz file named weights_<n_qubits>q_v<version>.npz
+    holding the weight tensor of shape (2, n_qubits, 3) and a JSON metadata
+    string (training loss, epochs, ...). Versions are immutable once written.
+    """
+
+    FILE_PATTERN = re.compile(r'weights_(\d+)q_v(\d+)\.npz$')
+
+    def __init__(self, root):
+        """
+        Args:
+            root: Directory holding the weight files
+        """
+        self.root = root
+
+    def path(self, n_qubits, version):
+        """Return the file path of a weights version."""
+        return os.path.join(self.root, f'weights_{n_qubits}q_v{version:04d}.npz')
+
+    def versions(self, n_qubits):
+        """List the available versions for a qubit count, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        versions = []
+        for name in os.listdir(self.root):
+            match = self.FILE_PATTERN.match(name)
+            if match and int(match.group(1)) == n_qubits:
+                versions.append(int(match.group(2)))
+        return sorted(versions)
+
+    def load(self, n_qubits, version=None):
+        """
+        Load a weights version.
+
+        Args:
+            n_qubits: Qubit count the weights were made for
+            version: Version to load (defaults to the latest)
+
+        Returns:
+            Tuple of (weights, version, metadata)
+        """
+        if version is None:
+            versions = self.versions(n_qubits)
+            if not versions:
+                raise FileNotFoundError(f"No weights for {n_qubits} qubits in {self.root}")
+            version = versions[-1]
+
+        with np.load(self.path(n_qubits, version)) as data:
+            weights = data['weights']
+            metadata = json.loads(str(data['metadata']))
+        return weights, version, metadata
+
+    def save(self, weights, **metadata):
+        """
+        Save weights as a new version.
+
+        Args:
+            weights: Weight tensor of shape (2, n_qubits, 3)
+            **metadata: JSON-serializable details stored alongside the weights
+
+        Returns:
+            The new version number
+        """
+        weights = np.asarray(weights, dtype=float)
+        n_qubits = weights.shape[1]
+        versions = self.versions(n_qubits)
+        version = versions[-1] + 1 if versions else 1
+
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(n_qubits, version)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, weights=weights, metadata=np.array(json.dumps(metadata)))
+        os.replace(tmp_path, path)
+        return version
+
+    def load_or_init(self, n_qubits, version=None, seed=0):
+        """
+        Load weights, writing a seeded random version 1 if none exist yet.
+
+        Returns:
+            Tuple of (weights, version, metadata)
+        """
+        if version is None and not self.versions(n_qubits):
+            weights = np.random.default_rng(seed).uniform(0, 2*np.pi, size=(2, n_qubits, 3))
+            self.save(weights, source='random', seed=seed)
+            print(f"Initialized random circuit weights for {n_qubits} qubits")
+        return self.load(n_qubits, version)
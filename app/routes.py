@@ -1,14 +1,33 @@
 from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash
-import os
 import json
-import pandas as pd
-import numpy as np
 from datetime import datetime
-from app import recommender, using_quantum
+from app import model, using_quantum
 
 main_bp = Blueprint('main', __name__)
 
-# The recommender is now imported from app/__init__.py, so we don't need to initialize it here
+# The recommender is built by the background warm-up in app/__init__.py;
+# model.recommender is None until it is ready. Routes read it once per
+# request, since new versions are swapped in while requests are served.
+
+def warming_up_response():
+    """503 response for requests that need the recommender before warm-up has finished."""
+    response = jsonify({
+        'success': False,
+        'error': 'The recommender is starting up, please retry shortly',
+        'warming_up': True
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@main_bp.route('/healthz')
+def healthz():
+    """Liveness: the app is up and serving requests."""
+    return jsonify({'status': 'ok', 'warmup': model.state(), 'response_cache': model.responses.info()})
+
+@main_bp.route('/readyz')
+def readyz():
+    """Readiness: the recommender has been built."""
+    return jsonify(model.state()), 200 if model.ready else 503
 
 @main_bp.route('/')
 def index():
@@ -36,6 +55,12 @@ def onboarding():
 @main_bp.route('/create_profile', methods=['POST'])
 def create_profile():
     """Process the onboarding form and create a user profile."""
+    recommender = model.recommender
+    if recommender is None:
+        return warming_up_response()
+    import numpy as np
+    import pandas as pd
+    
     try:
         # Get demographic data
         age = int(request.form.get('age'))
@@ -64,13 +89,8 @@ def create_profile():
         # Get favorite shows
         favorites = request.form.getlist('favorites')
         
-        # Generate a new user ID (max existing + 1)
-        max_user_id = recommender.user_profiles_df['user_id'].max()
-        new_user_id = int(max_user_id) + 1
-        
-        # Create new user profile
+        # Create new user profile; the store assigns the user ID
         new_profile = {
-            'user_id': new_user_id,
             'age': age,
             'gender': gender,
             'country': location,
@@ -78,7 +98,7 @@ def create_profile():
             'subscription_type': 'premium'  # Default
         }
         
-        # Save extended profile data as JSON
+        # Extended profile data
         extended_profile = {
             'occupation': occupation,
             'genre_ratings': genre_ratings,
@@ -88,21 +108,7 @@ def create_profile():
             'session_duration': session_duration
         }
         
-        # Create profiles directory if it doesn't exist
-        os.makedirs('data/profiles', exist_ok=True)
-        
-        # Save extended profile as JSON
-        with open(f'data/profiles/user_{new_user_id}.json', 'w') as f:
-            json.dump(extended_profile, f)
-        
-        # Append to user_profiles.csv using pandas concat instead of append
-        profiles_df = recommender.user_profiles_df
-        new_profile_df = pd.DataFrame([new_profile])
-        profiles_df = pd.concat([profiles_df, new_profile_df], ignore_index=True)
-        profiles_df.to_csv('data/user_profiles.csv', index=False)
-        
         # Create viewing history based on favorites
-        viewing_df = recommender.user_viewing_df
         viewing_records = []
         
         # Weight the favorites by their order of selection
@@ -116,7 +122,6 @@ def create_profile():
                 
                 # Create viewing record
                 viewing_record = {
-                    'user_id': new_user_id,
                     'movie_id': int(movie_id),
                     'rating': rating,
                     'completed': 1,  # Assume they finished it
@@ -124,14 +129,16 @@ def create_profile():
                 }
                 viewing_records.append(viewing_record)
         
-        if viewing_records:
-            new_viewing_df = pd.DataFrame(viewing_records)
-            viewing_df = pd.concat([viewing_df, new_viewing_df], ignore_index=True)
-            viewing_df.to_csv('data/user_viewing.csv', index=False)
-        
-        # Update the recommender with new data
-        recommender.user_profiles_df = profiles_df
-        recommender.user_viewing_df = viewing_df
+        # Add the user to the store in one transaction and serve a new
+        # recommender version with them in one step. Only the new user's
+        # features are computed and requests in flight keep the old version.
+        with model.write_lock:
+            new_user_id, revision = model.store.add_user(new_profile, viewing_records, extended_profile)
+            new_profile_df = pd.DataFrame([{'user_id': new_user_id, **new_profile}])
+            new_viewing_df = None
+            if viewing_records:
+                new_viewing_df = pd.DataFrame([{'user_id': new_user_id, **record} for record in viewing_records])
+            model.update(new_viewing_rows=new_viewing_df, new_profile_rows=new_profile_df, revision=revision)
         
         # Store user ID in session
         session['user_id'] = new_user_id
@@ -170,9 +177,36 @@ def get_recommendations():
     """Get recommendations for the current user."""
     user_id = session.get('user_id', 1)  # Default to user 1 if not in session
     
+    recommender = model.recommender
+    if recommender is None:
+        # Popular content until the recommender is ready
+        return jsonify({
+            'success': True,
+            'recommendations': model.popular_movies(10),
+            'using_quantum': False,
+            'fallback': True,
+            'warming_up': True
+        })
+    
     try:
+        # Load extended profile if it exists
+        extended_profile = {}
+        try:
+            extended_profile = model.store.extended_profile(user_id) or {}
+        except Exception as profile_error:
+            print(f"Error processing extended profile: {profile_error}")
+        viewing_time = session.get('viewing_time')
+        watch_habit = session.get('watch_habit')
+        
+        # The response only depends on these inputs and the recommender
+        # version, so repeat visits are served from the response cache
+        cache_key = (user_id, viewing_time, watch_habit, json.dumps(extended_profile, sort_keys=True), recommender.version)
+        response = model.responses.get(cache_key)
+        if response is not None:
+            return jsonify(response)
+        
         # Check if user exists in profiles
-        if user_id not in recommender.user_profiles_df['user_id'].values:
+        if not recommender.has_profile(user_id):
             print(f"User {user_id} not found, showing popular content instead")
             # Return popular movies instead
             popular_movies = recommender.movies_df.sort_values('popularity', ascending=False).head(10)
@@ -188,106 +222,22 @@ def get_recommendations():
                 rec['similarity'] = float(row['popularity']) / 100
                 recommendations.append(rec)
         else:
-            # Get personalized recommendations
-            recs_df = recommender.generate_recommendations(user_id, top_n=15)  # Get more than we need for filtering
-            
-            # Convert to list of dictionaries for JSON response
-            recommendations = []
-            for _, row in recs_df.iterrows():
-                rec = {
-                    'id': int(row['movie_id']),
-                    'title': row['title'],
-                    'genre': row['genre'],
-                    'rating': float(row['rating'])
-                }
-                if 'similarity' in row:
-                    rec['similarity'] = float(row['similarity'])
-                elif 'rec_count' in row:
-                    rec['rec_count'] = int(row['rec_count'])
-                recommendations.append(rec)
-            
-            # Load extended profile if it exists
-            extended_profile = {}
-            profile_path = f'data/profiles/user_{user_id}.json'
-            if os.path.exists(profile_path):
-                try:
-                    with open(profile_path, 'r') as f:
-                        extended_profile = json.load(f)
-                    
-                    # Boost content that matches user's themes
-                    if 'themes' in extended_profile and extended_profile['themes']:
-                        # Get content descriptions or use title + genre as proxy
-                        for rec in recommendations:
-                            theme_match_score = 0
-                            # For each theme that might match the title or genre
-                            for theme in extended_profile['themes']:
-                                # Some basic rule-based matching
-                                if theme == 'action_packed' and rec['genre'] in ['Action', 'Thriller']:
-                                    theme_match_score += 0.1
-                                elif theme == 'deep_themes' and rec['genre'] in ['Drama', 'Sci-Fi']:
-                                    theme_match_score += 0.1
-                                elif theme == 'character_driven' and rec['genre'] in ['Drama']:
-                                    theme_match_score += 0.1
-                                elif theme == 'dark' and rec['genre'] in ['Horror', 'Thriller', 'Crime']:
-                                    theme_match_score += 0.1
-                                elif theme == 'light_hearted' and rec['genre'] in ['Comedy', 'Romance']:
-                                    theme_match_score += 0.1
-                                # More advanced matching would use actual content analysis
-                            
-                            # Add theme matching boost to similarity score
-                            if 'similarity' in rec:
-                                rec['similarity'] = min(1.0, rec['similarity'] + theme_match_score)
-                            elif 'rec_count' in rec:
-                                rec['similarity'] = min(1.0, (rec['rec_count'] / 5) + theme_match_score)
-                        
-                    # Apply genre rating boosting if available
-                    if 'genre_ratings' in extended_profile and extended_profile['genre_ratings']:
-                        for rec in recommendations:
-                            genre_lower = rec['genre'].lower()
-                            for genre, rating in extended_profile['genre_ratings'].items():
-                                if genre in genre_lower or (genre == 'scifi' and 'sci-fi' in genre_lower):
-                                    # Add a boost based on the user's rating of this genre (1-5)
-                                    boost = (rating - 3) * 0.05  # -0.1 to +0.1 adjustment
-                                    if 'similarity' in rec:
-                                        rec['similarity'] = max(0, min(1.0, rec['similarity'] + boost))
-                                    # Else case already handled above
-                except Exception as profile_error:
-                    print(f"Error processing extended profile: {profile_error}")
-            
-            # Sort by similarity score
-            if recommendations and 'similarity' in recommendations[0]:
-                recommendations.sort(key=lambda x: x['similarity'], reverse=True)
-            
-            # If we have viewing time preference, customize recommendations order
-            viewing_time = session.get('viewing_time')
-            if viewing_time:
-                if viewing_time == 'morning':
-                    # Prefer lighter content in the morning
-                    recs_light = [rec for rec in recommendations if rec['genre'] not in ['Drama', 'Crime', 'Thriller', 'Horror']]
-                    recs_heavy = [rec for rec in recommendations if rec['genre'] in ['Drama', 'Crime', 'Thriller', 'Horror']]
-                    recommendations = recs_light + recs_heavy
-                elif viewing_time == 'late-night':
-                    # Prefer sci-fi and thriller content at night
-                    recs_night = [rec for rec in recommendations if rec['genre'] in ['Sci-Fi', 'Thriller', 'Horror']]
-                    recs_other = [rec for rec in recommendations if rec['genre'] not in ['Sci-Fi', 'Thriller', 'Horror']]
-                    recommendations = recs_night + recs_other
-            
-            # If we have watching habit, adjust recommendations
-            watch_habit = session.get('watch_habit')
-            if watch_habit == 'binge':
-                # Promote series for binge watchers (titles with numbers or "Season" in them)
-                series_first = [rec for rec in recommendations if ' ' in rec['title'] and any(char.isdigit() for char in rec['title'])]
-                others = [rec for rec in recommendations if rec not in series_first]
-                recommendations = series_first + others
-            
-            # Limit to top 10
-            recommendations = recommendations[:10]
+            # Personalized recommendations, re-ranked by theme and genre-rating
+            # boosts, viewing time and watching habit
+            recommendations = recommender.personalized_recommendations(
+                user_id,
+                extended_profile=extended_profile,
+                viewing_time=viewing_time,
+                watch_habit=watch_habit
+            )
         
-        return jsonify({
+        response = {
             'success': True,
             'recommendations': recommendations,
             'using_quantum': using_quantum
-        })
+        }
+        model.responses.put(cache_key, response)
+        return jsonify(response)
     
     except Exception as e:
         print(f"Error generating recommendations: {e}")
@@ -319,6 +269,9 @@ def get_recommendations():
 @main_bp.route('/movies/<int:movie_id>')
 def get_movie(movie_id):
     """Get details for a specific movie."""
+    recommender = model.recommender
+    if recommender is None:
+        return warming_up_response()
     try:
         movie = recommender.movies_df[recommender.movies_df['movie_id'] == movie_id]
         
@@ -349,24 +302,94 @@ def get_movie(movie_id):
             'error': str(e)
         }), 500
 
+@main_bp.route('/movies/<int:movie_id>/similar')
+def get_similar_movies(movie_id):
+    """Get the movies most similar to a movie from the item-item index."""
+    top_n = request.args.get('n', default=10, type=int)
+    recommender = model.recommender
+    if recommender is None:
+        return warming_up_response()
+    try:
+        if movie_id not in recommender.movies_df['movie_id'].values:
+            return jsonify({
+                'success': False,
+                'error': f"Movie ID {movie_id} not found"
+            }), 404
+        
+        similar_df = recommender.similar_movies(movie_id, top_n=top_n)
+        similar = [
+            {
+                'id': int(movie['movie_id']),
+                'title': movie['title'],
+                'genre': movie['genre'],
+                'rating': float(movie['rating']),
+                'similarity': float(movie['similarity'])
+            }
+            for movie in similar_df.to_dict('records')
+        ]
+        
+        return jsonify({
+            'success': True,
+            'movie_id': movie_id,
+            'similar': similar
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@main_bp.route('/recommendations/items')
+def get_item_recommendations():
+    """Get item-based recommendations: movies similar to the ones the current user watched."""
+    user_id = session.get('user_id', 1)  # Default to user 1 if not in session
+    top_n = request.args.get('n', default=10, type=int)
+    recommender = model.recommender
+    if recommender is None:
+        return warming_up_response()
+    try:
+        recs_df = recommender.generate_item_recommendations(user_id, top_n=top_n)
+        recommendations = [
+            {
+                'id': int(rec['movie_id']),
+                'title': rec['title'],
+                'genre': rec['genre'],
+                'rating': float(rec['rating']),
+                'similarity': float(rec['similarity'])
+            }
+            for rec in recs_df.to_dict('records')
+        ]
+        
+        return jsonify({
+            'success': True,
+            'recommendations': recommendations,
+            'using_quantum': using_quantum
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @main_bp.route('/update_profile', methods=['GET', 'POST'])
 def update_profile():
     """Update or fetch the user's profile with extended information."""
     user_id = session.get('user_id', 1)  # Default to user 1 if not in session
     
+    # Extended profiles are kept in the profile store, opened by the warm-up
+    store = model.store
+    if store is None:
+        return warming_up_response()
+    
     if request.method == 'GET':
         # Return current profile
-        profile_path = f'data/profiles/user_{user_id}.json'
-        if os.path.exists(profile_path):
-            try:
-                with open(profile_path, 'r') as f:
-                    profile_data = json.load(f)
-                return jsonify({'success': True, 'profile': profile_data})
-            except Exception as e:
-                print(f"Error reading profile: {e}")
-                return jsonify({'success': False, 'error': str(e)}), 500
-        else:
-            return jsonify({'success': True, 'profile': {}})
+        try:
+            return jsonify({'success': True, 'profile': store.extended_profile(user_id) or {}})
+        except Exception as e:
+            print(f"Error reading profile: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
     
     # POST request - update profile
     profile_data = request.json
@@ -375,23 +398,11 @@ def update_profile():
         return jsonify({'success': False, 'error': 'No profile data provided'}), 400
     
     try:
-        # Create profiles directory if it doesn't exist
-        os.makedirs('data/profiles', exist_ok=True)
-        
-        # Load existing profile if it exists
-        profile_path = f'data/profiles/user_{user_id}.json'
-        existing_profile = {}
-        
-        if os.path.exists(profile_path):
-            with open(profile_path, 'r') as f:
-                existing_profile = json.load(f)
-        
-        # Update with new data
-        existing_profile.update(profile_data)
+        # Merge the new data into the existing profile in one transaction
+        existing_profile = store.update_extended_profile(user_id, profile_data)
         
-        # Save updated profile
-        with open(profile_path, 'w') as f:
-            json.dump(existing_profile, f)
+        # Cached recommendations were re-ranked with the old profile
+        model.responses.invalidate(user_id)
         
         # Update session variables for use in recommendation filtering
         if 'watch_habit' in existing_profile:
@@ -0,0 +1,74 @@
+"""
+Report recall@10 and query latency of the approximate nearest-neighbour
+indexes against exact search.
+
+Run from the repository root:
+    python -m benchmarks.bench_ann
+"""
+import time
+import argparse
+import numpy as np
+from app.quantum.ann import ExactIndex, IVFIndex, RandomProjectionLSH
+from app.quantum.neighbours import rating_totals, mean_ratings
+from app.quantum.statevector import StatevectorSimulator
+from benchmarks.bench_neighbours import synthetic_viewing
+
+
+def evaluate(name, index, vectors, queries, exact_rows, k):
+    start = time.perf_counter()
+    index.build(vectors)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows, _ = index.search(queries, k)
+    latency = (time.perf_counter() - start) / queries.shape[0]
+
+    recall = np.mean([
+        len(np.intersect1d(found[found >= 0], exact)) / k for found, exact in zip(rows, exact_rows)
+    ])
+    print(f"  {name:<24} {recall:>9.3f} {latency * 1e6:>10.0f} {build:>8.2f}")
+
+
+def run(title, vectors, queries, args):
+    exact_rows, _ = ExactIndex().build(vectors).search(queries, args.k)
+    print(f"\n{title}")
+    print(f"  {'index':<24} {'recall@' + str(args.k):>9} {'us/query':>10} {'build s':>8}")
+    evaluate('exact', ExactIndex(), vectors, queries, exact_rows, args.k)
+    for n_probe in args.n_probe:
+        evaluate(f'ivf n_probe={n_probe}', IVFIndex(n_probe=n_probe), vectors, queries, exact_rows, args.k)
+    for n_tables in args.n_tables:
+        evaluate(f'lsh n_tables={n_tables}', RandomProjectionLSH(n_bits=args.n_bits, n_tables=n_tables),
+                 vectors, queries, exact_rows, args.k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--movies', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--n-qubits', type=int, default=8)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--n-tables', type=int, nargs='+', default=[2, 4, 8, 16])
+    parser.add_argument('--n-bits', type=int, default=12)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    # Quantum embeddings of random movie and user features
+    weights = rng.uniform(0, 2 * np.pi, size=(2, args.n_qubits, 3))
+    simulator = StatevectorSimulator(args.n_qubits)
+    movie_embeddings = simulator.expectations(rng.uniform(0, 1, (args.movies, args.n_qubits)), weights)
+    user_embeddings = simulator.expectations(rng.uniform(0, 1, (args.queries, args.n_qubits)), weights)
+    run(f"User -> movie search over {args.movies} quantum embeddings ({args.n_qubits} dims)",
+        movie_embeddings, user_embeddings, args)
+
+    # Sparse rating vectors of the classical recommender; queries are users
+    # of the index itself, so exact search returns the user first
+    user_rows, movie_rows, ratings = synthetic_viewing(args.users, 20000, 20, rng)
+    user_vectors = mean_ratings(*rating_totals(user_rows, movie_rows, ratings, (args.users, 20000)))
+    queries = user_vectors[rng.choice(args.users, size=args.queries, replace=False)]
+    run(f"User -> user search over {args.users} sparse rating vectors", user_vectors, queries, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Measure recall and latency of candidate generation before quantum scoring
+on a synthetic catalog.
+
+Run from the repository root:
+    python -m benchmarks.bench_candidates
+"""
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+from app.quantum.recommender import QuantumRecommender
+from app.quantum.synthetic import write_synthetic_dataset
+
+
+def time_requests(recommender, user_ids, **kwargs):
+    start = time.perf_counter()
+    for user_id in user_ids:
+        recommender.generate_recommendations(user_id, **kwargs)
+    return 1000 * (time.perf_counter() - start) / len(user_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--movies', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--per-user', type=int, default=20)
+    parser.add_argument('--candidates', type=int, nargs='+', default=[50, 100, 200, 500, 1000])
+    parser.add_argument('--sample-users', type=int, default=100)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_synthetic_dataset(directory, args.users, args.movies, args.per_user, rng)
+        recommender = QuantumRecommender(
+            user_data_path=os.path.join(directory, 'user_viewing.csv'),
+            movie_data_path=os.path.join(directory, 'movies.csv'),
+            user_profile_path=os.path.join(directory, 'user_profiles.csv'),
+            backend='numpy'
+        )
+        user_ids = rng.choice(recommender.user_ids, size=args.sample_users, replace=False)
+
+        # Per-movie circuit cost of the unbatched path
+        start = time.perf_counter()
+        for movie_id in recommender.movie_ids[:50]:
+            recommender.compute_quantum_similarity(user_ids[0], movie_id)
+        circuit_ms = 1000 * (time.perf_counter() - start) / 50
+
+        full_ms = time_requests(recommender, user_ids)
+        print(f"{args.movies} movies, {args.users} users, {args.sample_users} sampled users")
+        print(f"Full catalog: {full_ms:.2f} ms per request with cached embeddings, "
+              f"~{circuit_ms * args.movies / 1000:.1f} s with one circuit per movie")
+        print(f"{'candidates':>10} {'recall@10':>10} {'stage ms':>9} {'request ms':>11} {'circuit s':>10}")
+        for n_candidates in args.candidates:
+            recommender.n_candidates = n_candidates
+            recommender.candidate_generator.n_candidates = n_candidates
+            recommender.candidate_generator.metrics.update(
+                requests=0, seconds=0.0, candidates=0, recall_users=0, recall_sum=0.0
+            )
+            request_ms = time_requests(recommender, user_ids)
+            stage_ms = recommender.candidate_generator.summary()['mean_latency_ms']
+            recall = recommender.measure_candidate_recall(user_ids, top_n=10)
+            print(f"{n_candidates:>10} {recall:>10.3f} {stage_ms:>9.2f} {request_ms:>11.2f} "
+                  f"{circuit_ms * n_candidates / 1000:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
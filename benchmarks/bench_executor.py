@@ -0,0 +1,64 @@
+"""
+Measure how sharded catalog scoring scales with the number of worker
+processes and check it against single-process scoring.
+
+Run from the repository root:
+    python -m benchmarks.bench_executor
+"""
+import os
+import time
+import argparse
+import numpy as np
+from app.quantum.executor import ShardedScorer
+from app.quantum.statevector import StatevectorSimulator
+from app.quantum.arrays import top_k_indices
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--movies', type=int, default=50000)
+    parser.add_argument('--n-qubits', type=int, default=8)
+    parser.add_argument('--backend', default='numpy', choices=['numpy', 'mps'])
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help="Worker counts to measure (defaults to 1, 2, 4, ... up to the CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=1024)
+    parser.add_argument('--top-k', type=int, default=10)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    workers = args.workers or sorted({min(2 ** i, cpus) for i in range(cpus.bit_length() + 1)})
+    rng = np.random.default_rng(0)
+    weights = rng.uniform(0, 2 * np.pi, size=(2, args.n_qubits, 3))
+    movie_features = rng.uniform(0, 1, size=(args.movies, args.n_qubits)).astype(np.float32)
+    user_embedding = StatevectorSimulator(args.n_qubits).expectations(rng.uniform(0, 1, args.n_qubits), weights)
+    rows = np.arange(args.movies)
+
+    # Single-process reference
+    embeddings = StatevectorSimulator(args.n_qubits).expectations(movie_features, weights)
+    norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(user_embedding)
+    similarities = (embeddings @ user_embedding / norms + 1) / 2
+    reference = top_k_indices(similarities, args.top_k)
+
+    print(f"{args.movies} movies, {args.n_qubits} qubits, backend={args.backend}, {cpus} CPUs")
+    print(f"{'workers':>7} {'startup s':>10} {'score s':>10} {'movies/s':>12} {'speedup':>8} {'top-k match':>12}")
+    baseline = None
+    for n_workers in workers:
+        start = time.perf_counter()
+        with ShardedScorer(movie_features, weights, args.backend, n_workers=n_workers,
+                           chunk_size=args.chunk_size) as scorer:
+            # The first map starts the workers and runs their initializer
+            scorer.embed(rows[:1])
+            startup = time.perf_counter() - start
+
+            start = time.perf_counter()
+            top_rows, _ = scorer.top_k(user_embedding, rows, args.top_k)
+            elapsed = time.perf_counter() - start
+
+        baseline = baseline or elapsed
+        match = np.array_equal(top_rows, reference) if args.backend == 'numpy' else '-'
+        print(f"{n_workers:>7} {startup:>10.3f} {elapsed:>10.3f} {args.movies / elapsed:>12.0f} "
+              f"{baseline / elapsed:>7.2f}x {str(match):>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare the MPS simulator with the exact statevector kernel on small
+circuits and measure it on large ones.
+
+Run from the repository root:
+    python -m benchmarks.bench_mps
+"""
+import time
+import argparse
+import numpy as np
+from app.quantum.mps import MPSSimulator
+from app.quantum.statevector import StatevectorSimulator
+
+
+def mps_state_bytes(n_qubits, bond_dim):
+    """Upper bound on the memory of one MPS state in bytes (complex128)."""
+    total = 0
+    for site in range(n_qubits):
+        left = min(bond_dim, 2 ** min(site, n_qubits - site))
+        right = min(bond_dim, 2 ** min(site + 1, n_qubits - site - 1))
+        total += left * 2 * right * 16
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--exact-qubits', type=int, nargs='+', default=[6, 8, 10, 12])
+    parser.add_argument('--large-qubits', type=int, nargs='+', default=[32, 48, 64])
+    parser.add_argument('--bond-dims', type=int, nargs='+', default=[4, 8, 16, 32])
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print("Max abs error of <Z> vs the exact statevector")
+    print(f"{'qubits':>6} " + " ".join(f"{'chi=' + str(chi):>10}" for chi in args.bond_dims))
+    for n_qubits in args.exact_qubits:
+        weights = rng.uniform(0, 2 * np.pi, size=(2, n_qubits, 3))
+        features = rng.uniform(0, 1, size=(args.batch_size, n_qubits))
+        exact = StatevectorSimulator(n_qubits).expectations(features, weights)
+        errors = [
+            np.max(np.abs(MPSSimulator(n_qubits, bond_dim=chi).expectations(features, weights) - exact))
+            for chi in args.bond_dims
+        ]
+        print(f"{n_qubits:>6} " + " ".join(f"{error:>10.2e}" for error in errors))
+
+    print(f"\nLarge circuits, batch of {args.batch_size}")
+    print(f"{'qubits':>6} {'chi':>4} {'embeds/s':>10} {'MPS KiB':>10} {'statevector':>14}")
+    for n_qubits in args.large_qubits:
+        weights = rng.uniform(0, 2 * np.pi, size=(2, n_qubits, 3))
+        features = rng.uniform(0, 1, size=(args.batch_size, n_qubits))
+        for chi in args.bond_dims:
+            simulator = MPSSimulator(n_qubits, bond_dim=chi)
+            start = time.perf_counter()
+            simulator.expectations(features, weights)
+            rate = args.batch_size / (time.perf_counter() - start)
+            statevector_gib = 2 ** n_qubits * 16 / 2 ** 30
+            print(f"{n_qubits:>6} {chi:>4} {rate:>10.1f} {mps_state_bytes(n_qubits, chi) / 1024:>10.1f} "
+                  f"{statevector_gib:>10.3g} GiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Measure fitting and serving latency of the collaborative filtering
+neighbour index on synthetic data.
+
+Run from the repository root:
+    python -m benchmarks.bench_neighbours
+"""
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from app.quantum.neighbours import rating_totals, mean_ratings, top_k_neighbours, neighbour_counts
+from app.quantum.arrays import top_k_indices
+
+
+def synthetic_viewing(n_users, n_movies, per_user, rng):
+    """Viewing records with a skewed movie popularity and ratings from 1 to 5."""
+    user_rows = np.repeat(np.arange(n_users), per_user)
+    popularity = 1 / np.arange(1, n_movies + 1) ** 0.8
+    movie_rows = rng.choice(n_movies, size=len(user_rows), p=popularity / popularity.sum())
+    ratings = rng.integers(1, 6, size=len(user_rows))
+    return user_rows, movie_rows, ratings
+
+
+def legacy_latency(user_rows, movie_rows, ratings, neighbours, users):
+    """Per-request latency of the previous DataFrame-scan serving path."""
+    viewing = pd.DataFrame({'user_id': user_rows, 'movie_id': movie_rows, 'rating': ratings})
+    timings = []
+    for user in users:
+        start = time.perf_counter()
+        watched = viewing[viewing['user_id'] == user]['movie_id'].unique()
+        picks = viewing[viewing['user_id'].isin(neighbours[user]) & (viewing['rating'] >= 4)]
+        picks = picks[~picks['movie_id'].isin(watched)]
+        picks['movie_id'].value_counts().head(10)
+        timings.append(time.perf_counter() - start)
+    return np.array(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--movies', type=int, default=20000)
+    parser.add_argument('--per-user', type=int, default=20, help="Viewing records per user")
+    parser.add_argument('--neighbours', type=int, default=5)
+    parser.add_argument('--max-fit-users', type=int, default=100000,
+                        help="Above this size random neighbour lists are used instead of fitting")
+    parser.add_argument('--legacy-max-users', type=int, default=10000,
+                        help="Largest size at which the DataFrame-scan path is also timed")
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'users':>8} {'fit s':>8} {'index MiB':>10} {'p50 us':>8} {'p99 us':>8} {'legacy p50 us':>14}")
+    for n_users in args.users:
+        user_rows, movie_rows, ratings = synthetic_viewing(n_users, args.movies, args.per_user, rng)
+        shape = (n_users, args.movies)
+        liked = ratings >= 4
+        liked_matrix = csr_matrix((np.ones(liked.sum()), (user_rows[liked], movie_rows[liked])), shape=shape)
+        watched_matrix = csr_matrix((np.ones(len(user_rows)), (user_rows, movie_rows)), shape=shape)
+
+        if n_users <= args.max_fit_users:
+            start = time.perf_counter()
+            matrix = mean_ratings(*rating_totals(user_rows, movie_rows, ratings, shape))
+            neighbours, _ = top_k_neighbours(matrix, args.neighbours)
+            fit = f"{time.perf_counter() - start:>8.1f}"
+        else:
+            neighbours = rng.integers(0, n_users, size=(n_users, args.neighbours)).astype(np.int32)
+            fit = f"{'-':>8}"
+        index_bytes = neighbours.nbytes + sum(
+            matrix.indptr.nbytes + matrix.indices.nbytes + matrix.data.nbytes
+            for matrix in (liked_matrix, watched_matrix)
+        )
+
+        users = rng.integers(0, n_users, size=args.requests)
+        timings = []
+        for user in users:
+            start = time.perf_counter()
+            rows, counts = neighbour_counts(neighbours[user], liked_matrix, watched_matrix, user)
+            rows[top_k_indices(counts, 10)]
+            timings.append(time.perf_counter() - start)
+        timings = np.array(timings) * 1e6
+
+        legacy = '-'
+        if n_users <= args.legacy_max_users:
+            legacy_timings = legacy_latency(user_rows, movie_rows, ratings, neighbours, users[:100]) * 1e6
+            legacy = f"{np.percentile(legacy_timings, 50):.0f}"
+        print(f"{n_users:>8} {fit} {index_bytes / 2 ** 20:>10.1f} {np.percentile(timings, 50):>8.0f} "
+              f"{np.percentile(timings, 99):>8.0f} {legacy:>14}")
+
+
+if __name__ == '__main__':
+    main()
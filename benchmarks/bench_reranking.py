@@ -0,0 +1,47 @@
+"""
+Measure the latency of re-ranking recommendations by extended profile and
+session preferences, against the previous per-request Python loops.
+
+Run from the repository root:
+    python -m benchmarks.bench_reranking
+"""
+import time
+import argparse
+import numpy as np
+from app.quantum.reranking import Reranker
+from app.quantum.synthetic import GENRES, random_request
+from tests.reranking_reference import legacy_rerank
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--movies', type=int, default=20000)
+    parser.add_argument('--recs', type=int, nargs='+', default=[15, 100, 1000])
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    metadata = {
+        'movie_id': np.arange(1, args.movies + 1),
+        'title': np.array([f'Movie {i}' if i % 3 else f'Series {chr(65 + i % 26)}' for i in range(args.movies)], dtype=object),
+        'genre': rng.choice(GENRES, size=args.movies).astype(object),
+        'rating': np.round(rng.uniform(5, 9.5, size=args.movies), 1)
+    }
+    start = time.perf_counter()
+    reranker = Reranker(metadata)
+    print(f"{args.movies} movies, masks built in {1000 * (time.perf_counter() - start):.1f} ms")
+
+    print(f"{'recs':>6} {'vectorized ms':>14} {'legacy ms':>10} {'identical':>10}")
+    for n_recs in args.recs:
+        requests = [random_request(metadata, n_recs, rng) for _ in range(args.requests)]
+        start = time.perf_counter()
+        vectorized = [reranker.rerank(*request, top_n=n_recs) for request in requests]
+        vectorized_ms = 1000 * (time.perf_counter() - start) / len(requests)
+        start = time.perf_counter()
+        legacy = [legacy_rerank(*request, top_n=n_recs) for request in requests]
+        legacy_ms = 1000 * (time.perf_counter() - start) / len(requests)
+        print(f"{n_recs:>6} {vectorized_ms:>14.3f} {legacy_ms:>10.3f} {str(vectorized == legacy):>10}")
+
+
+if __name__ == '__main__':
+    main()
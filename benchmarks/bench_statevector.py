@@ -0,0 +1,65 @@
+"""
+Check the NumPy statevector kernel against the PennyLane QNode and compare
+their throughput.
+
+Run from the repository root:
+    python -m benchmarks.bench_statevector
+"""
+import os
+import time
+import argparse
+import numpy as np
+from app.quantum.recommender import QuantumRecommender
+from app.quantum.statevector import StatevectorSimulator
+
+
+def throughput(fn, features, repeats):
+    """Return embeddings per second of fn over the feature matrix."""
+    fn(features[:1])  # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(features)
+    return repeats * len(features) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--n-qubits', type=int, default=8)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 10000])
+    parser.add_argument('--max-qnode-batch', type=int, default=10000,
+                        help="Skip the QNode for larger batches")
+    args = parser.parse_args()
+
+    recommender = QuantumRecommender(
+        user_data_path=os.path.join(args.data_dir, 'user_viewing.csv'),
+        movie_data_path=os.path.join(args.data_dir, 'movies.csv'),
+        user_profile_path=os.path.join(args.data_dir, 'user_profiles.csv'),
+        n_qubits=args.n_qubits
+    )
+    simulator = StatevectorSimulator(args.n_qubits)
+    weights = recommender.weights
+    rng = np.random.default_rng(0)
+
+    # Equivalence with the PennyLane QNode, including feature wrap-around
+    for n_features in (args.n_qubits, args.n_qubits + 3):
+        features = rng.uniform(0, 1, size=(64, n_features))
+        expected = np.stack(recommender.circuit(features, weights), axis=-1)
+        error = np.max(np.abs(simulator.expectations(features, weights) - expected))
+        assert error < 1e-8, f"NumPy kernel differs from the QNode by {error}"
+        print(f"{n_features} features: max abs difference vs QNode {error:.2e}")
+
+    print(f"\n{'batch':>8} {'qnode/s':>12} {'numpy/s':>12} {'speedup':>8}")
+    for batch_size in args.batch_sizes:
+        features = rng.uniform(0, 1, size=(batch_size, args.n_qubits))
+        repeats = max(1, 1000 // batch_size)
+        numpy_rate = throughput(lambda x: simulator.expectations(x, weights), features, repeats)
+        if batch_size <= args.max_qnode_batch:
+            qnode_rate = throughput(lambda x: recommender.circuit(x, weights), features, repeats)
+            print(f"{batch_size:>8} {qnode_rate:>12.0f} {numpy_rate:>12.0f} {numpy_rate / qnode_rate:>7.1f}x")
+        else:
+            print(f"{batch_size:>8} {'-':>12} {numpy_rate:>12.0f} {'-':>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Measure signup latency end to end as the number of users grows: the
+POST /create_profile route with the store insert and the new recommender
+version, against the store insert alone and the previous rewrite of the
+profile and viewing CSV files.
+
+Run from the repository root:
+    python -m benchmarks.bench_store
+"""
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+import app as app_package
+from app import routes, create_app, ModelWarmup
+from app.quantum.store import ProfileStore, STORE_NAME
+from app.quantum.synthetic import write_synthetic_dataset
+
+PROFILE = {'age': 30, 'gender': 'F', 'country': 'US', 'preferred_genre': 'Drama', 'subscription_type': 'premium'}
+VIEWING = [{'movie_id': movie_id, 'rating': 5, 'completed': 1, 'date_watched': '2024-01-01'} for movie_id in (2, 6, 15)]
+FORM = {
+    'age': '30', 'gender': 'F', 'location': 'US', 'preferred_genre': 'Drama', 'favorites': ['2', '6', '15'],
+    'themes': ['deep_themes'], 'genre_drama': '5', 'watch_habit': 'binge', 'viewing_time': 'morning'
+}
+
+
+def csv_signup(directory, profiles_df, viewing_df):
+    """The signup before the store: concat to the full tables and rewrite both CSV files."""
+    user_id = int(profiles_df['user_id'].max()) + 1
+    profiles_df = pd.concat([profiles_df, pd.DataFrame([{'user_id': user_id, **PROFILE}])], ignore_index=True)
+    profiles_df.to_csv(os.path.join(directory, 'user_profiles.csv'), index=False)
+    viewing_df = pd.concat(
+        [viewing_df, pd.DataFrame([{'user_id': user_id, **record} for record in VIEWING])], ignore_index=True
+    )
+    viewing_df.to_csv(os.path.join(directory, 'user_viewing.csv'), index=False)
+    return profiles_df, viewing_df
+
+
+def milliseconds(fn, repeats):
+    """Median and 95th percentile latency of fn in milliseconds."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(1000 * (time.perf_counter() - start))
+    return np.median(times), np.percentile(times, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, nargs='+', default=[2000, 20000, 100000])
+    parser.add_argument('--movies', type=int, default=1000)
+    parser.add_argument('--per-user', type=int, default=20)
+    parser.add_argument('--signups', type=int, default=50)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'users':>8} {'csv ms':>8} {'insert ms':>10} {'signup ms':>10} {'p95 ms':>8}")
+    for n_users in args.users:
+        with tempfile.TemporaryDirectory() as directory:
+            write_synthetic_dataset(directory, n_users, args.movies, args.per_user, rng)
+
+            # The previous signup, on a copy of the CSV files
+            csv_dir = os.path.join(directory, 'csv')
+            os.makedirs(csv_dir)
+            profiles_df = pd.read_csv(os.path.join(directory, 'user_profiles.csv'))
+            viewing_df = pd.read_csv(os.path.join(directory, 'user_viewing.csv'))
+            tables = [profiles_df, viewing_df]
+
+            def rewrite_csv():
+                tables[:] = csv_signup(csv_dir, *tables)
+            csv_ms, _ = milliseconds(rewrite_csv, min(args.signups, 10))
+
+            # The store insert alone, on a separate database
+            store = ProfileStore.open(
+                os.path.join(csv_dir, STORE_NAME),
+                user_profile_path=os.path.join(directory, 'user_profiles.csv'),
+                user_data_path=os.path.join(directory, 'user_viewing.csv')
+            )
+            insert_ms, _ = milliseconds(lambda: store.add_user(PROFILE, VIEWING, {'themes': []}), args.signups)
+
+            # The signup route, serving a model over this dataset
+            model = ModelWarmup(directory)
+            routes.model = app_package.model = model
+            client = create_app(warm_up=False).test_client()
+            model.wait()
+
+            def signup():
+                response = client.post('/create_profile', data=FORM)
+                assert response.get_json()['success'], response.get_json()
+            signup_ms, signup_p95 = milliseconds(signup, args.signups)
+            print(f"{n_users:>8} {csv_ms:>8.2f} {insert_ms:>10.3f} {signup_ms:>10.2f} {signup_p95:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from app.quantum.synthetic import write_synthetic_dataset
+
+
+@pytest.fixture(scope='module')
+def synthetic_data(tmp_path_factory):
+    """
+    A small synthetic dataset whose viewing records are split into a prefix
+    and later batches.
+
+    Returns:
+        Dict with the 'movies', 'profiles' and 'viewing' paths of the full
+        dataset, 'prefix', the path of a viewing file with the first 60% of
+        the records, and 'batches', the remaining records as DataFrames of
+        100 records
+    """
+    directory = tmp_path_factory.mktemp('data')
+    rng = np.random.default_rng(0)
+    write_synthetic_dataset(str(directory), 150, 120, 12, rng)
+
+    viewing_path = os.path.join(directory, 'user_viewing.csv')
+    viewing_df = pd.read_csv(viewing_path).sample(frac=1, random_state=0).reset_index(drop=True)
+    viewing_df.to_csv(viewing_path, index=False)
+    n_prefix = int(len(viewing_df) * 0.6)
+    prefix_path = os.path.join(directory, 'user_viewing_prefix.csv')
+    viewing_df[:n_prefix].to_csv(prefix_path, index=False)
+    return {
+        'movies': os.path.join(directory, 'movies.csv'),
+        'profiles': os.path.join(directory, 'user_profiles.csv'),
+        'viewing': viewing_path,
+        'prefix': prefix_path,
+        'batches': [viewing_df[start:start + 100] for start in range(n_prefix, len(viewing_df), 100)]
+    }
@@ -0,0 +1,47 @@
+"""The re-ranking loops of the /recommendations route before app.quantum.reranking, as a reference."""
+from app.quantum.reranking import THEME_GENRES
+
+
+def legacy_rerank(recs_df, extended_profile, viewing_time, watch_habit, top_n=10):
+    """The previous re-ranking loops of the /recommendations route."""
+    recommendations = []
+    for _, row in recs_df.iterrows():
+        rec = {'id': int(row['movie_id']), 'title': row['title'], 'genre': row['genre'], 'rating': float(row['rating'])}
+        if 'similarity' in row:
+            rec['similarity'] = float(row['similarity'])
+        elif 'rec_count' in row:
+            rec['rec_count'] = int(row['rec_count'])
+        recommendations.append(rec)
+
+    if extended_profile.get('themes'):
+        for rec in recommendations:
+            theme_match_score = 0
+            for theme in extended_profile['themes']:
+                if theme in THEME_GENRES and rec['genre'] in THEME_GENRES[theme]:
+                    theme_match_score += 0.1
+            if 'similarity' in rec:
+                rec['similarity'] = min(1.0, rec['similarity'] + theme_match_score)
+            elif 'rec_count' in rec:
+                rec['similarity'] = min(1.0, (rec['rec_count'] / 5) + theme_match_score)
+    if extended_profile.get('genre_ratings'):
+        for rec in recommendations:
+            genre_lower = rec['genre'].lower()
+            for genre, rating in extended_profile['genre_ratings'].items():
+                if genre in genre_lower or (genre == 'scifi' and 'sci-fi' in genre_lower):
+                    if 'similarity' in rec:
+                        rec['similarity'] = max(0, min(1.0, rec['similarity'] + (rating - 3) * 0.05))
+
+    if recommendations and 'similarity' in recommendations[0]:
+        recommendations.sort(key=lambda x: x['similarity'], reverse=True)
+    if viewing_time == 'morning':
+        heavy = ['Drama', 'Crime', 'Thriller', 'Horror']
+        recommendations = ([rec for rec in recommendations if rec['genre'] not in heavy] +
+                           [rec for rec in recommendations if rec['genre'] in heavy])
+    elif viewing_time == 'late-night':
+        night = ['Sci-Fi', 'Thriller', 'Horror']
+        recommendations = ([rec for rec in recommendations if rec['genre'] in night] +
+                           [rec for rec in recommendations if rec['genre'] not in night])
+    if watch_habit == 'binge':
+        series_first = [rec for rec in recommendations if ' ' in rec['title'] and any(char.isdigit() for char in rec['title'])]
+        recommendations = series_first + [rec for rec in recommendations if rec not in series_first]
+    return recommendations[:top_n]
@@ -0,0 +1,21 @@
+import numpy as np
+from app.quantum.recommender import QuantumRecommender
+
+
+def test_small_blocks_match_single_user_recommendations(synthetic_data, tmp_path):
+    recommender = QuantumRecommender(
+        synthetic_data['viewing'], synthetic_data['movies'], synthetic_data['profiles'], backend='numpy',
+        weights_dir=str(tmp_path / 'weights'), embedding_cache_dir=str(tmp_path / 'cache')
+    )
+    user_ids = recommender.user_ids[:40]
+
+    # Three users per block at most
+    n_movies = len(recommender.movie_ids)
+    recs_df = recommender.generate_recommendations_batch(user_ids, top_n=10, max_block_entries=3 * n_movies)
+    assert recs_df['similarity'].dtype == np.float32
+    for user_id in user_ids:
+        expected = recommender.generate_recommendations(user_id, top_n=10)
+        result = recs_df[recs_df['user_id'] == user_id]
+        np.testing.assert_array_equal(result['movie_id'].to_numpy(), expected['movie_id'].to_numpy())
+        np.testing.assert_allclose(result['similarity'].to_numpy(), expected['similarity'].to_numpy(), atol=1e-5)
+        assert not np.isin(result['movie_id'], recommender.movie_ids[recommender.watched.rows(user_id)]).any()
@@ -0,0 +1,31 @@
+import threading
+import numpy as np
+from app.quantum.candidates import CandidateGenerator
+from app.quantum.item_index import ItemNeighbourIndex
+
+
+def test_metrics_count_every_request_across_threads():
+    rng = np.random.default_rng(0)
+    n_movies = 300
+    movie_features = rng.uniform(size=(n_movies, 8))
+    generator = CandidateGenerator(
+        movie_features, rng.integers(0, 5, n_movies), rng.uniform(size=n_movies),
+        ItemNeighbourIndex.build(n_movies, embeddings=movie_features), n_candidates=20
+    )
+
+    def serve():
+        for _ in range(500):
+            rows = generator.generate(rng.integers(0, n_movies, 5), movie_features[0], preferred_genre=1)
+            generator.record_recall(rows, rows[:10])
+
+    threads = [threading.Thread(target=serve) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = generator.summary()
+    assert summary['requests'] == 4000
+    assert summary['mean_candidates'] == 20
+    assert summary['recall'] == 1.0
+    assert generator.metrics['recall_users'] == 4000
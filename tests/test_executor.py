@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from app.quantum.recommender import QuantumRecommender
+
+
+@pytest.fixture(scope='module')
+def recommenders(synthetic_data, tmp_path_factory):
+    """The same recommender computed in this process and across two worker processes."""
+    def build(n_workers):
+        directory = tmp_path_factory.mktemp('model')
+        return QuantumRecommender(
+            synthetic_data['viewing'], synthetic_data['movies'], synthetic_data['profiles'], backend='numpy',
+            n_workers=n_workers, chunk_size=16,
+            weights_dir=str(directory / 'weights'), embedding_cache_dir=str(directory / 'cache')
+        )
+
+    local, sharded = build(1), build(2)
+    yield local, sharded
+    sharded.close()
+
+
+def test_sharded_embeddings_match_local(recommenders):
+    local, sharded = recommenders
+    assert local.scorer is None
+    np.testing.assert_allclose(sharded.movie_embeddings, local.movie_embeddings, atol=1e-10)
+
+
+def test_unbatched_scoring_uses_the_recommenders_pool(recommenders):
+    local, sharded = recommenders
+    scorer = sharded.scorer
+    for user_id in (1, 2, 3):
+        expected = local.generate_recommendations(user_id, top_n=10, batched=True)
+        result = sharded.generate_recommendations(user_id, top_n=10, batched=False)
+        np.testing.assert_array_equal(result['movie_id'].to_numpy(), expected['movie_id'].to_numpy())
+        np.testing.assert_allclose(result['similarity'].to_numpy(), expected['similarity'].to_numpy(), atol=1e-8)
+
+    # Versions made for new records keep using the same worker processes
+    assert sharded.scorer is scorer
+    assert sharded.copy().scorer is scorer
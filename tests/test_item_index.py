@@ -0,0 +1,96 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+from app.quantum.item_index import ItemNeighbourIndex
+from app.quantum.recommender import QuantumRecommender, ClassicalRecommender
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def assert_same_index(index, full, embeddings=None, coviewing=None):
+    """
+    An index equal to a full build up to the order of tied movies: the
+    similarities match and every listed movie has its listed similarity.
+    """
+    np.testing.assert_allclose(index.similarities, full.similarities, rtol=1e-5, atol=1e-6)
+    n_movies = len(index.neighbours)
+    every = ItemNeighbourIndex.build(n_movies, k=n_movies, embeddings=embeddings, coviewing=coviewing)
+    similarities = np.zeros((n_movies, n_movies))
+    rows, columns = np.nonzero(every.neighbours >= 0)
+    similarities[rows, every.neighbours[rows, columns]] = every.similarities[rows, columns]
+    for row, (neighbours, neighbour_similarities) in enumerate(zip(index.neighbours, index.similarities)):
+        found = neighbours >= 0
+        np.testing.assert_allclose(similarities[row, neighbours[found]], neighbour_similarities[found],
+                                   rtol=1e-5, atol=1e-6)
+
+
+def test_classical_update_refreshes_similar_movies(synthetic_data):
+    recommender = ClassicalRecommender(synthetic_data['prefix'], synthetic_data['movies'], synthetic_data['profiles'])
+    before = recommender.item_index.neighbours.copy()
+    for batch in synthetic_data['batches']:
+        recommender.update(batch)
+    # Similar movies are refreshed when the recommender is compacted
+    assert np.array_equal(recommender.item_index.neighbours, before)
+    recommender = recommender.compacted()
+    full = ClassicalRecommender(synthetic_data['viewing'], synthetic_data['movies'], synthetic_data['profiles'])
+
+    assert not np.array_equal(before, full.item_index.neighbours)
+    assert_same_index(recommender.item_index, full.item_index, coviewing=full.watched.matrix)
+
+
+def test_quantum_update_refreshes_similar_movies(synthetic_data, tmp_path):
+    def build(viewing_path):
+        return QuantumRecommender(
+            viewing_path, synthetic_data['movies'], synthetic_data['profiles'], backend='numpy',
+            weights_dir=str(tmp_path / 'weights'), embedding_cache_dir=str(tmp_path / 'cache')
+        )
+
+    recommender = build(synthetic_data['prefix'])
+    served = recommender.copy()
+    for batch in synthetic_data['batches']:
+        recommender = recommender.copy()
+        recommender.update(batch)
+    recommender = recommender.compacted()
+    full = build(synthetic_data['viewing'])
+
+    assert_same_index(recommender.item_index, full.item_index, full.movie_embeddings, full.watched.matrix)
+    assert recommender.candidate_generator.item_index is recommender.item_index
+    # The version being served keeps its own index
+    assert served.candidate_generator.item_index is served.item_index
+    assert not np.array_equal(served.item_index.neighbours, full.item_index.neighbours)
+
+
+@pytest.mark.parametrize('records', [
+    [(3, 1)],
+    [(3, 1), (3, 12)],
+    [(5, 2), (1, 30), (7, 44)],
+])
+@pytest.mark.parametrize('quantum', [False, True])
+def test_small_update_matches_full_build(tmp_path, records, quantum):
+    # Only a few movies gain a viewer, so most rows of the index are kept
+    for name in ('movies.csv', 'user_viewing.csv', 'user_profiles.csv'):
+        shutil.copy(os.path.join(DATA_DIR, name), tmp_path)
+    new_rows = pd.DataFrame([
+        {'user_id': user_id, 'movie_id': movie_id, 'watch_duration': 60.0, 'rating': 5, 'completed': 1,
+         'date_watched': '2024-01-01'}
+        for user_id, movie_id in records
+    ])
+
+    def build(viewing_path):
+        paths = (viewing_path, str(tmp_path / 'movies.csv'), str(tmp_path / 'user_profiles.csv'))
+        if quantum:
+            return QuantumRecommender(*paths, backend='numpy', weights_dir=str(tmp_path / 'weights'),
+                                      embedding_cache_dir=str(tmp_path / 'cache'))
+        return ClassicalRecommender(*paths)
+
+    recommender = build(str(tmp_path / 'user_viewing.csv'))
+    recommender.update(new_rows)
+    recommender = recommender.compacted()
+    viewing_df = pd.read_csv(tmp_path / 'user_viewing.csv')
+    pd.concat([viewing_df, new_rows], ignore_index=True).to_csv(tmp_path / 'user_viewing_full.csv', index=False)
+    full = build(str(tmp_path / 'user_viewing_full.csv'))
+
+    embeddings = full.movie_embeddings if quantum else None
+    assert_same_index(recommender.item_index, full.item_index, embeddings, full.watched.matrix)
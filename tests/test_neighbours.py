@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse import random as sparse_random
+from app.quantum.arrays import lookup_rows
+from app.quantum.neighbours import top_k_neighbours, update_neighbours, normalize_rows
+from app.quantum.recommender import ClassicalRecommender
+
+
+def assert_same_neighbours(matrix, neighbours, similarities, expected_similarities):
+    """
+    Neighbour lists equal to a full fit up to the order of tied users: the
+    similarities match and every listed neighbour has its listed similarity.
+    """
+    np.testing.assert_allclose(similarities, expected_similarities, rtol=1e-6)
+    normalized = normalize_rows(matrix)
+    for row, (neighbour_rows, neighbour_similarities) in enumerate(zip(neighbours, similarities)):
+        found = neighbour_rows >= 0
+        actual = (normalized[neighbour_rows[found]] @ normalized[row].T).toarray().ravel()
+        np.testing.assert_allclose(actual, neighbour_similarities[found], rtol=1e-6)
+        assert len(set(neighbour_rows[found])) == found.sum()
+
+
+def random_ratings(rng, density=0.05):
+    return sparse_random(300, 80, density=density, format='csr', random_state=rng,
+                         data_rvs=lambda n: rng.integers(1, 6, n))
+
+
+def test_update_neighbours_matches_full_fit():
+    rng = np.random.default_rng(0)
+    matrix = random_ratings(rng)
+    neighbours, similarities = top_k_neighbours(matrix, 5)
+
+    # Some users rate more movies in each batch
+    for _ in range(3):
+        changed = rng.choice(matrix.shape[0], size=10, replace=False)
+        in_batch = np.zeros(matrix.shape[0])
+        in_batch[changed] = 1
+        matrix = (matrix + random_ratings(rng).multiply(in_batch[:, None])).tocsr()
+        neighbours, similarities = update_neighbours(matrix, neighbours, similarities, changed, block_size=64)
+
+        _, expected_similarities = top_k_neighbours(matrix, 5)
+        assert_same_neighbours(matrix, neighbours, similarities, expected_similarities)
+
+
+def assert_same_as_full_fit(recommender, full, user_ids):
+    """Neighbour lists of the given users equal to those of a full fit, compared by user id."""
+    rows = lookup_rows(recommender.user_index, user_ids)
+    full_rows = lookup_rows(full.user_index, user_ids)
+    neighbour_ids = np.where(recommender.neighbours[rows] >= 0, recommender.user_ids[recommender.neighbours[rows]], -1)
+    neighbours, similarities = full.neighbours.copy(), full.neighbour_similarities.copy()
+    neighbours[full_rows] = np.where(neighbour_ids >= 0, lookup_rows(full.user_index, neighbour_ids), -1)
+    similarities[full_rows] = recommender.neighbour_similarities[rows]
+    assert_same_neighbours(full.user_movie_matrix, neighbours, similarities, full.neighbour_similarities)
+
+
+def test_classical_update_matches_full_fit(synthetic_data):
+    recommender = ClassicalRecommender(synthetic_data['prefix'], synthetic_data['movies'], synthetic_data['profiles'])
+    for batch in synthetic_data['batches']:
+        recommender.update(batch)
+    recommender = recommender.compacted()
+    full = ClassicalRecommender(synthetic_data['viewing'], synthetic_data['movies'], synthetic_data['profiles'])
+
+    assert set(recommender.user_ids) == set(full.user_ids)
+    assert_same_as_full_fit(recommender, full, full.user_ids)
+
+
+def test_new_users_get_neighbours_before_compaction(synthetic_data, tmp_path):
+    viewing_df = pd.read_csv(synthetic_data['viewing'])
+    new_ids = np.unique(viewing_df['user_id'])[-20:]
+    viewing_df[~viewing_df['user_id'].isin(new_ids)].to_csv(tmp_path / 'user_viewing.csv', index=False)
+    recommender = ClassicalRecommender(
+        str(tmp_path / 'user_viewing.csv'), synthetic_data['movies'], synthetic_data['profiles']
+    )
+    served = recommender
+    for user_id in new_ids:
+        recommender = recommender.copy()
+        recommender.update(viewing_df[viewing_df['user_id'] == user_id])
+    full = ClassicalRecommender(synthetic_data['viewing'], synthetic_data['movies'], synthetic_data['profiles'])
+
+    # The signups appended rows, the earlier version is unchanged
+    assert len(served.user_ids) == len(full.user_ids) - len(new_ids)
+    assert served.user_movie_matrix.shape[0] == len(served.user_ids)
+    assert len(served.user_viewing_df) == len(viewing_df) - viewing_df['user_id'].isin(new_ids).sum()
+    assert len(recommender.user_viewing_df) == len(viewing_df)
+
+    # The latest user's list is complete right away, those of earlier users
+    # can gain later users as neighbours when the recommender is compacted
+    assert_same_as_full_fit(recommender, full, new_ids[-1:])
+    assert_same_as_full_fit(recommender.compacted(), full, full.user_ids)
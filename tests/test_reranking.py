@@ -0,0 +1,46 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from app.quantum.recommender import movie_metadata
+from app.quantum.reranking import Reranker
+from app.quantum.synthetic import GENRES, random_request
+from tests.reranking_reference import legacy_rerank
+
+
+@pytest.fixture(scope='module')
+def metadata():
+    rng = np.random.default_rng(0)
+    n_movies = 500
+    return {
+        'movie_id': np.arange(1, n_movies + 1),
+        'title': np.array([f'Movie {i}' if i % 3 else f'Series {chr(65 + i % 26)}' for i in range(n_movies)],
+                          dtype=object),
+        'genre': rng.choice(GENRES, size=n_movies).astype(object),
+        'rating': np.round(rng.uniform(5, 9.5, size=n_movies), 1)
+    }
+
+
+@pytest.mark.parametrize('n_recs, top_n', [(1, 10), (15, 10), (15, 15), (100, 25)])
+def test_rerank_matches_legacy_loops(metadata, n_recs, top_n):
+    reranker = Reranker(metadata)
+    rng = np.random.default_rng(n_recs + top_n)
+    for _ in range(200):
+        request = random_request(metadata, n_recs, rng)
+        assert reranker.rerank(*request, top_n=top_n) == legacy_rerank(*request, top_n=top_n)
+
+
+def test_rerank_without_profile_or_session(metadata):
+    reranker = Reranker(metadata)
+    recs_df, _, _, _ = random_request(metadata, 15, np.random.default_rng(1))
+    assert reranker.rerank(recs_df, {}, None, None) == legacy_rerank(recs_df, {}, None, None)
+
+
+def test_rerank_matches_legacy_loops_on_sample_catalog():
+    movies_df = pd.read_csv(os.path.join(os.path.dirname(__file__), '..', 'data', 'movies.csv'))
+    metadata = movie_metadata(movies_df)
+    reranker = Reranker(metadata)
+    rng = np.random.default_rng(2)
+    for _ in range(200):
+        request = random_request(metadata, 15, rng)
+        assert reranker.rerank(*request) == legacy_rerank(*request)
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from app.quantum.recommender import ClassicalRecommender
+from app.quantum.snapshot import write_snapshot, open_snapshot
+from app.quantum.store import ProfileStore, STORE_NAME
+
+
+def test_snapshot_replays_signups_made_after_it(synthetic_data, tmp_path):
+    store_path = str(tmp_path / STORE_NAME)
+    store = ProfileStore.open(store_path, synthetic_data['profiles'], synthetic_data['viewing'])
+    paths = dict(user_data_path=store_path, movie_data_path=synthetic_data['movies'], user_profile_path=store_path)
+    snapshot_path = str(tmp_path / 'snapshot.npz')
+    write_snapshot(ClassicalRecommender(**paths), snapshot_path)
+
+    # New users copy the profiles and viewing records of existing ones
+    profiles_df = pd.read_csv(synthetic_data['profiles'])
+    viewing_df = pd.read_csv(synthetic_data['viewing'])
+    for _, profile in profiles_df[:5].iterrows():
+        records = viewing_df[viewing_df['user_id'] == profile['user_id']].drop(columns='user_id')
+        store.add_user(profile.drop('user_id').to_dict(), records.to_dict('records'))
+
+    recommender = open_snapshot(snapshot_path, **paths)
+    full = ClassicalRecommender(**paths)
+    assert recommender is not None
+    assert np.array_equal(recommender.user_ids, full.user_ids)
+    assert (recommender.user_movie_matrix != full.user_movie_matrix).nnz == 0
+    np.testing.assert_allclose(recommender.neighbour_similarities, full.neighbour_similarities, rtol=1e-6)
+    assert len(recommender.user_viewing_df) == len(full.user_viewing_df)
+
+
+def test_snapshot_of_another_store_is_stale(synthetic_data, tmp_path):
+    paths = {}
+    for name in ('first', 'second'):
+        store_path = str(tmp_path / f'{name}.db')
+        ProfileStore.open(store_path, synthetic_data['profiles'], synthetic_data['viewing'])
+        paths[name] = dict(user_data_path=store_path, movie_data_path=synthetic_data['movies'],
+                           user_profile_path=store_path)
+    snapshot_path = str(tmp_path / 'snapshot.npz')
+    write_snapshot(ClassicalRecommender(**paths['first']), snapshot_path)
+
+    assert open_snapshot(snapshot_path, **paths['first']) is not None
+    assert open_snapshot(snapshot_path, **paths['second']) is None
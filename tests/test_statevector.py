@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from app.quantum.recommender import QuantumRecommender
+from app.quantum.statevector import StatevectorSimulator
+from app.quantum.mps import MPSSimulator
+
+N_QUBITS = 8
+
+
+@pytest.fixture(scope='module')
+def recommender(synthetic_data, tmp_path_factory):
+    """Recommender whose PennyLane QNode is the reference circuit."""
+    directory = tmp_path_factory.mktemp('model')
+    return QuantumRecommender(
+        synthetic_data['viewing'], synthetic_data['movies'], synthetic_data['profiles'], n_qubits=N_QUBITS,
+        weights_dir=str(directory / 'weights'), embedding_cache_dir=str(directory / 'cache')
+    )
+
+
+def qnode_expectations(recommender, features, weights):
+    return np.stack(recommender.circuit(features, weights), axis=-1)
+
+
+@pytest.mark.parametrize('batch_size', [1, 17])
+@pytest.mark.parametrize('n_features', [N_QUBITS, N_QUBITS + 3])
+@pytest.mark.parametrize('max_dense_qubits', [10, 0])
+def test_statevector_matches_qnode(recommender, batch_size, n_features, max_dense_qubits):
+    rng = np.random.default_rng(batch_size * n_features)
+    weights = rng.uniform(0, 2 * np.pi, size=(2, N_QUBITS, 3))
+    features = rng.uniform(0, 1, size=(batch_size, n_features))
+    simulator = StatevectorSimulator(N_QUBITS, chunk_size=8, max_dense_qubits=max_dense_qubits)
+
+    expectations = simulator.expectations(features, weights)
+    assert expectations.shape == (batch_size, N_QUBITS)
+    np.testing.assert_allclose(expectations, qnode_expectations(recommender, features, weights), atol=1e-8)
+
+
+def test_statevector_single_feature_vector(recommender):
+    rng = np.random.default_rng(1)
+    weights = rng.uniform(0, 2 * np.pi, size=(2, N_QUBITS, 3))
+    features = rng.uniform(0, 1, size=N_QUBITS)
+
+    expectations = StatevectorSimulator(N_QUBITS).expectations(features, weights)
+    assert expectations.shape == (N_QUBITS,)
+    np.testing.assert_allclose(expectations, recommender.circuit(features, weights), atol=1e-8)
+
+
+@pytest.mark.parametrize('batch_size', [1, 17])
+@pytest.mark.parametrize('n_qubits', [2, 5, 8])
+def test_mps_with_full_bond_dimension_matches_statevector(batch_size, n_qubits):
+    rng = np.random.default_rng(batch_size * n_qubits)
+    weights = rng.uniform(0, 2 * np.pi, size=(2, n_qubits, 3))
+    features = rng.uniform(0, 1, size=(batch_size, n_qubits))
+    mps = MPSSimulator(n_qubits, bond_dim=2 ** (n_qubits // 2), chunk_size=8)
+
+    exact = StatevectorSimulator(n_qubits).expectations(features, weights)
+    np.testing.assert_allclose(mps.expectations(features, weights), exact, atol=1e-8)
+
+
+def test_mps_truncation_error_shrinks_with_bond_dimension():
+    rng = np.random.default_rng(0)
+    weights = rng.uniform(0, 2 * np.pi, size=(2, 10, 3))
+    features = rng.uniform(0, 1, size=(20, 10))
+    exact = StatevectorSimulator(10).expectations(features, weights)
+
+    errors = [
+        np.max(np.abs(MPSSimulator(10, bond_dim=chi).expectations(features, weights) - exact))
+        for chi in (2, 8, 32)
+    ]
+    assert errors[0] > errors[2]
+    assert errors[2] < 1e-8
@@ -0,0 +1,33 @@
+import threading
+from app.quantum.store import ProfileStore, ExtendedProfileCache, STORE_NAME
+
+PROFILE = {'age': 30, 'gender': 'F', 'location': 'US', 'preferred_genre': 'Drama', 'subscription_type': 'premium'}
+
+
+def test_read_started_before_a_write_is_not_cached_over_it():
+    cache = ExtendedProfileCache()
+    cache.apply_changes([], 0)
+    seen = cache.state()
+
+    # A miss read the old profile, then a write stored the new one first
+    cache.put(1, {'themes': ['new']}, 10)
+    cache.put(1, {'themes': ['old']}, 10, seen=seen)
+    assert cache.get(1) == {'themes': ['new']}
+
+
+def test_extended_profile_returns_the_latest_write_across_threads(tmp_path):
+    store = ProfileStore.open(str(tmp_path / STORE_NAME))
+    user_id, _ = store.add_user(PROFILE, extended_profile={'step': 0})
+
+    def read():
+        for _ in range(300):
+            store.extended_profile(user_id)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for step in range(1, 301):
+        store.update_extended_profile(user_id, {'step': step})
+    for reader in readers:
+        reader.join()
+    assert store.extended_profile(user_id) == {'step': 300}
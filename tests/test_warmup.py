@@ -0,0 +1,103 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+from app import ModelWarmup, Recommender
+from app.quantum.weights import WeightRegistry
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+@pytest.fixture
+def warmup(tmp_path):
+    """A ready ModelWarmup over a copy of the sample data."""
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    for name in ModelWarmup.DATA_FILES:
+        shutil.copy(os.path.join(DATA_DIR, name), data_dir)
+    shutil.copytree(os.path.join(DATA_DIR, 'profiles'), data_dir / 'profiles')
+    warmup = ModelWarmup(str(data_dir))
+    assert warmup.wait(timeout=120)
+    return warmup
+
+
+def test_reload_picks_up_new_weights_version(warmup):
+    model = warmup.recommender.recommender
+    if not hasattr(model, 'weights_version'):
+        pytest.skip("classical recommender has no circuit weights")
+    assert not warmup.reload()
+
+    registry = WeightRegistry(os.path.join(warmup.data_dir, 'weights'))
+    version = registry.save(np.random.default_rng(0).uniform(0, 2 * np.pi, size=model.weights.shape))
+    assert warmup.reload()
+    assert warmup.recommender.version == 2
+    assert warmup.recommender.recommender.weights_version == version
+    assert not warmup.reload()
+
+
+def test_new_weights_version_clears_cached_responses(warmup):
+    model = warmup.recommender.recommender
+    if not hasattr(model, 'weights_version'):
+        pytest.skip("classical recommender has no circuit weights")
+    key = (1, 'evening', 'casual', '{}', warmup.recommender.version)
+    warmup.responses.put(key, {'recommendations': []})
+
+    WeightRegistry(os.path.join(warmup.data_dir, 'weights')).save(np.zeros(model.weights.shape))
+    assert warmup.reload()
+    assert warmup.responses.info()['entries'] == 0
+    assert warmup.recommender.version != key[-1]
+
+
+def test_csv_files_imported_into_the_store_are_not_watched(warmup):
+    assert not warmup.reload()
+    with open(os.path.join(warmup.data_dir, 'user_profiles.csv'), 'a') as f:
+        f.write('\n')
+    assert not warmup.reload()
+    assert warmup.recommender.version == 1
+
+    os.utime(os.path.join(warmup.data_dir, 'movies.csv'), ns=(0, 0))
+    assert warmup.reload()
+
+
+def add_user(warmup, movie_ids):
+    """Add a user to the store and the served recommender, like the signup route."""
+    profile = {'age': 30, 'gender': 'F', 'country': 'US', 'preferred_genre': 'Drama', 'subscription_type': 'premium'}
+    viewing = [{'movie_id': movie_id, 'rating': 5, 'completed': 1, 'date_watched': '2024-01-01'}
+               for movie_id in movie_ids]
+    with warmup.write_lock:
+        user_id, revision = warmup.store.add_user(profile, viewing, {})
+        warmup.update(
+            new_viewing_rows=pd.DataFrame([{'user_id': user_id, **record} for record in viewing]),
+            new_profile_rows=pd.DataFrame([{'user_id': user_id, **profile}]),
+            revision=revision
+        )
+    return user_id
+
+
+def test_compaction_keeps_users_added_while_it_runs(warmup, monkeypatch):
+    assert not warmup.compact()
+    first = add_user(warmup, [2, 6, 15])
+    source = warmup.recommender
+    added = []
+
+    # Another signup while the first compacted version is built
+    compacted = Recommender.compacted
+    def compacted_during_signup(recommender):
+        recommender = compacted(recommender)
+        if not added:
+            added.append(add_user(warmup, [3, 7]))
+        return recommender
+    monkeypatch.setattr(Recommender, 'compacted', compacted_during_signup)
+
+    assert warmup.compact()
+    recommender = warmup.recommender
+    assert recommender.version == 4
+    assert recommender.has_profile(first) and recommender.has_profile(added[0])
+    assert recommender.user_profiles_df['user_id'].isin([first, added[0]]).sum() == 2
+    assert len(recommender.user_viewing_df) == len(source.user_viewing_df) + 2
+
+    # The replayed signup is compacted next time, then nothing is left to do
+    assert warmup.compact()
+    assert not warmup.compact()
+    assert not warmup.reload()